@@ -1,7 +1,11 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from backend.config import get_settings
-from backend.rag.qdrant_client import search_all_collections
+from backend.rag.qdrant_client import COLLECTIONS, asearch_collections_batch
+from backend.rag.lexical_index import lexical_index
+from backend.rag.hydration import hydrate, unconfirmed
+from backend.rag.local_index import payload_matches
+from backend.agents.llm import ainvoke_llm, astream_llm, get_llm
+from backend.agents.prompting import PromptBudget, format_context, format_history
 import logging
 import json
 import re
@@ -11,18 +15,50 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Hits below this are not worth showing; applied by the vector store
+MIN_SCORE = 0.25
+EXACT_MATCH_SCORE = 0.7
+RESULT_LIMIT = 5
+# Searches over-fetch so hits dropped by the stock filter leave enough behind
+SEARCH_LIMIT = RESULT_LIMIT * 2
 
-def get_llm():
-    return ChatGoogleGenerativeAI(
-        model=settings.GEMINI_MODEL,
-        google_api_key=settings.GEMINI_API_KEY,
-        temperature=0.3,
-    )
+# Applied after hydration (stock is live, not in the vector payload): only offer tyres we can sell
+LIVE_FILTERS = {"tyres": {"stock": {"gt": 0}}}
+
+# Part of the prompt budget left after the fixed parts that history may use; search results get the rest
+HISTORY_SHARE = 0.4
+
+PROMPT_TEMPLATE = """Recent conversation context:
+{history}
+
+Search results from our database (ranked by relevance):
+{context}
+
+Customer's new message: {message}
+
+IMPORTANT INSTRUCTIONS:
+- Read the conversation context carefully to understand what the customer is referring to
+- If they mention "first one", "second one", or similar, look at previous messages to understand what sizes/options were offered
+- Use the search results above to provide accurate information
+- If you see "Similar match" for car models, suggest them as alternatives
+- If a tyre's price or stock is marked unconfirmed, say so and that we'll confirm it before the order is placed
+- When customer selects a tyre size, search for and recommend specific tyres in that exact size
+
+Respond following the conversation flow rules. Be natural and helpful!"""
+
+
+def filter_results(results: dict[str, list[dict]], filters: dict[str, dict]) -> dict[str, list[dict]]:
+    """Apply filter specs to hits that did not come from a filtered search
+    (lexical hits, prefetched results)."""
+    return {
+        collection: [h for h in hits if payload_matches(h["payload"], filters.get(collection, {}))]
+        for collection, hits in results.items()
+    }
 
 
 class CustomerAgent:
     def __init__(self):
-        self.llm = get_llm()
+        self.llm = get_llm("customer")
         self.system_prompt = """You are a helpful and friendly tyre specialist at Matrax Tyres. 
 
 CONVERSATION FLOW:
@@ -52,101 +88,136 @@ Example: **Michelin Pilot Sport** - 225/50R17 | Performance | £149.99 | In stoc
 
 Keep it friendly and helpful!"""
 
-    async def process_message(self, user_message: str, chat_history: list[dict] = None) -> dict:
-        logger.info(f"\n{'='*80}")
-        logger.info(f"[CUSTOMER AGENT] Processing message: '{user_message}'")
-        logger.info(f"[CUSTOMER AGENT] Chat history length: {len(chat_history) if chat_history else 0}")
-        
-        # Build context from last 6 messages for better understanding
-        context_messages = []
-        context_for_search = []
-        if chat_history:
-            recent_msgs = chat_history[-6:]  # Last 6 messages
-            for msg in recent_msgs:
-                role = "Customer" if msg.get('sender') == 'user' else "Agent"
-                text = msg.get('text', '')
-                context_messages.append(f"{role}: {text}")
-                # Extract any tyre sizes or important data for search context
-                context_for_search.append(text)
-            logger.info(f"[CUSTOMER AGENT] Context from last {len(recent_msgs)} messages included")
-        
+    def build_search_query(self, user_message: str, chat_history: list[dict] = None) -> str:
         # Build intelligent search query: combine user message with recent context
         # This helps when user says vague things like "first one" or "yes"
         if len(user_message.split()) <= 3:  # Short messages likely need context
             # Combine with recent context for better search
+            context_for_search = [msg.get('text', '') for msg in (chat_history or [])[-6:]]
             search_query = f"{user_message} {' '.join(context_for_search[-2:])}"  # Last 2 messages as context
             logger.info(f"[CUSTOMER AGENT] Short message detected, enhanced search: '{search_query[:100]}...'")
         else:
             search_query = user_message
-        
-        rag_results = search_all_collections(search_query, limit=5)
-        logger.info(f"[CUSTOMER AGENT] RAG search completed")
+        return search_query
+
+    async def retrieve(self, user_message: str, chat_history: list[dict] = None,
+                       filters: dict[str, dict] = None) -> dict[str, list[dict]]:
+        """RAG search for a turn. Safe to start before the turn is classified.
+
+        Exact catalog tokens in the message ("225/45R17", "Pirelli", "CR-V") are
+        resolved by the lexical index; if they explain the whole message, no
+        embedding or Qdrant call is made. Otherwise lexical and vector hits are
+        fused. ``filters`` (per collection, see ``qdrant_client.build_filter``)
+        are pushed down to the vector store together with ``MIN_SCORE``. Up to
+        ``SEARCH_LIMIT`` hits per collection are returned, without live stock
+        and price; ``_prepare`` hydrates and trims them.
+        """
+        filters = filters or {}
+        lexical = None
+        if settings.LEXICAL_SEARCH_ENABLED:
+            try:
+                lexical = await lexical_index.search(user_message, limit=SEARCH_LIMIT)
+                lexical["results"] = filter_results(lexical["results"], filters)
+            except Exception as e:
+                logger.error(f"[CUSTOMER AGENT] Lexical search failed: {e}")
+            if lexical and lexical["covered"] and any(lexical["results"].values()):
+                logger.info(f"[CUSTOMER AGENT] Lexical short-circuit for '{user_message}'")
+                return lexical["results"]
+
+        search_query = self.build_search_query(user_message, chat_history)
+        try:
+            batch = await asearch_collections_batch(
+                [search_query], limit=SEARCH_LIMIT, filters=filters, score_threshold=MIN_SCORE,
+            )
+        except Exception as e:
+            logger.error(f"[CUSTOMER AGENT] RAG search failed: {e}")
+            return lexical["results"] if lexical else {collection: [] for collection in COLLECTIONS}
+        logger.info(f"[CUSTOMER AGENT] RAG search completed: {batch['timings']}")
+        if lexical and any(lexical["results"].values()):
+            return lexical_index.fuse(lexical["results"], batch["results"][0], limit=SEARCH_LIMIT)
+        return batch["results"][0]
+
+    async def _prepare(self, user_message: str, chat_history: list[dict] = None,
+                       rag_results: dict = None, filters: dict[str, dict] = None) -> tuple[list, dict, dict]:
+        """Run RAG (unless already prefetched) and build the LLM messages.
+
+        Returns (messages, extracted_info, rag_results).
+        """
+        logger.info(f"\n{'='*80}")
+        logger.info(f"[CUSTOMER AGENT] Processing message: '{user_message}'")
+        logger.info(f"[CUSTOMER AGENT] Chat history length: {len(chat_history) if chat_history else 0}")
+
+        if rag_results is None:
+            rag_results = await self.retrieve(user_message, chat_history, filters)
+        else:
+            # Prefetch ran before the intent (and so its filters) was known
+            logger.info(f"[CUSTOMER AGENT] Using prefetched RAG results")
+            rag_results = filter_results(rag_results, filters or {})
+
+        try:
+            rag_results = filter_results(await hydrate(rag_results), LIVE_FILTERS)
+        except Exception as e:
+            # Keep the tyres; the prompt marks their price and stock unconfirmed
+            logger.error(f"[CUSTOMER AGENT] Stock/price lookup failed, offering tyres unconfirmed: {e}")
+            rag_results = unconfirmed(rag_results)
+        rag_results = {collection: hits[:RESULT_LIMIT] for collection, hits in rag_results.items()}
 
-        context_parts = []
         extracted_info = {
             "car_brands": [],
             "car_models": [],
             "tyre_brands": [],
             "tyres": [],
         }
-
         for collection, results in rag_results.items():
             if results:
                 logger.info(f"[CUSTOMER AGENT] {collection}: Found {len(results)} results")
-                context_parts.append(f"\n{collection.upper()}:")
-                for r in results:
-                    # Show results with score > 0.25 to catch similar matches
-                    if r["score"] > 0.25:
-                        payload = r["payload"]
-                        extracted_info[collection].append(payload)
-                        
-                        # Include similarity indicator for the agent
-                        match_type = "Exact match" if r["score"] > 0.7 else "Similar match"
-                        
-                        logger.info(f"[CUSTOMER AGENT]   - Score: {r['score']:.3f} | {match_type} | {payload.get('name', payload.get('model', 'Unknown'))}")
-                        
-                        if collection == "car_models":
-                            context_parts.append(f"  • [{match_type}] {payload.get('brand_name')} {payload.get('name')} {payload.get('year')} - Compatible sizes: {', '.join(payload.get('tyre_sizes', []))}")
-                        elif collection == "tyres":
-                            context_parts.append(f"  • [{match_type}] {payload.get('brand_name')} {payload.get('model')} - {payload.get('size')} | {payload.get('type')} | £{payload.get('price')} | Stock: {payload.get('stock')}")
-                        elif collection == "car_brands":
-                            context_parts.append(f"  • [{match_type}] {payload.get('name')} (from {payload.get('country')})")
-                        elif collection == "tyre_brands":
-                            context_parts.append(f"  • [{match_type}] {payload.get('name')}")
-                    else:
-                        logger.info(f"[CUSTOMER AGENT]   - Score: {r['score']:.3f} | FILTERED (too low) | {r.get('payload', {}).get('name', r.get('payload', {}).get('model', 'Unknown'))}")
-
-        context = "\n".join(context_parts) if context_parts else "No relevant matches found."
-
-        # Use last 6 messages for context (already built above)
-        history_text = "\n".join(context_messages) if context_messages else "First message in this conversation."
-
-        prompt_content = f"""Recent conversation context:
-{history_text}
-
-Search results from our database (ranked by relevance):
-{context}
-
-Customer's new message: {user_message}
-
-IMPORTANT INSTRUCTIONS:
-- Read the conversation context carefully to understand what the customer is referring to
-- If they mention "first one", "second one", or similar, look at previous messages to understand what sizes/options were offered
-- Use the search results above to provide accurate information
-- If you see "Similar match" for car models, suggest them as alternatives
-- When customer selects a tyre size, search for and recommend specific tyres in that exact size
-
-Respond following the conversation flow rules. Be natural and helpful!"""
+            for r in results:
+                extracted_info[collection].append(r["payload"])
+                logger.info(f"[CUSTOMER AGENT]   - Score: {r['score']:.3f} | "
+                            f"{r['payload'].get('name', r['payload'].get('model', 'Unknown'))}")
+
+        # Fixed parts first; history gets a share of the rest and the best search results fill what's left
+        budget = PromptBudget().spend(self.system_prompt, PROMPT_TEMPLATE, user_message)
+        history_text = format_history(chat_history, budget.share(HISTORY_SHARE), budget)
+        context = format_context(rag_results, budget.remaining, self._render_hit, budget)
+        budget.done()
+
+        prompt_content = PROMPT_TEMPLATE.format(
+            history=history_text or "First message in this conversation.",
+            context=context or "No relevant matches found.",
+            message=user_message,
+        )
 
         messages = [
             SystemMessage(content=self.system_prompt),
             HumanMessage(content=prompt_content),
         ]
 
+        logger.info(f"[CUSTOMER AGENT] Extracted info counts: {', '.join([f'{k}: {len(v)}' for k, v in extracted_info.items() if v])}")
+        return messages, extracted_info, rag_results
+
+    @staticmethod
+    def _render_hit(collection: str, hit: dict) -> str:
+        payload = hit["payload"]
+        # Include similarity indicator for the agent
+        match_type = "Exact match" if hit["score"] > EXACT_MATCH_SCORE else "Similar match"
+        if collection == "car_models":
+            return f"  • [{match_type}] {payload.get('brand_name')} {payload.get('name')} {payload.get('year')} - Compatible sizes: {', '.join(payload.get('tyre_sizes', []))}"
+        if collection == "tyres":
+            if payload.get("live") is False:
+                return f"  • [{match_type}] {payload.get('brand_name')} {payload.get('model')} - {payload.get('size')} | {payload.get('type')} | Price: unconfirmed | Stock: unconfirmed"
+            return f"  • [{match_type}] {payload.get('brand_name')} {payload.get('model')} - {payload.get('size')} | {payload.get('type')} | £{payload.get('price')} | Stock: {payload.get('stock')}"
+        if collection == "car_brands":
+            return f"  • [{match_type}] {payload.get('name')} (from {payload.get('country')})"
+        return f"  • [{match_type}] {payload.get('name')}"
+
+    async def process_message(self, user_message: str, chat_history: list[dict] = None,
+                              rag_results: dict = None, filters: dict[str, dict] = None) -> dict:
+        messages, extracted_info, rag_results = await self._prepare(user_message, chat_history, rag_results, filters)
+
         logger.info(f"[CUSTOMER AGENT] Sending prompt to LLM...")
-        response = self.llm.invoke(messages)
+        response = await ainvoke_llm(self.llm, messages, role="customer")
         logger.info(f"[CUSTOMER AGENT] LLM Response: {response.content[:200]}...")
-        logger.info(f"[CUSTOMER AGENT] Extracted info counts: {', '.join([f'{k}: {len(v)}' for k, v in extracted_info.items() if v])}")
         logger.info(f"{'='*80}\n")
         
         return {
@@ -154,3 +225,12 @@ Respond following the conversation flow rules. Be natural and helpful!"""
             "extracted_info": extracted_info,
             "rag_results": rag_results,
         }
+
+    async def stream_message(self, user_message: str, chat_history: list[dict] = None,
+                             rag_results: dict = None, filters: dict[str, dict] = None):
+        """Same as process_message, but yields the response text as it is generated."""
+        messages, _, _ = await self._prepare(user_message, chat_history, rag_results, filters)
+
+        logger.info(f"[CUSTOMER AGENT] Streaming prompt to LLM...")
+        async for chunk in astream_llm(self.llm, messages, role="customer"):
+            yield chunk
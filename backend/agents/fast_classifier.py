@@ -0,0 +1,172 @@
+import logging
+import re
+from backend.config import get_settings
+from backend.rag.text import TYRE_SIZE_RE, normalize_size
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ORDER_CODE_RE = re.compile(r'(?:MTX|mts|MTS|mtx)[\-\s]?(\d+)')
+
+GREETING_WORDS = {"hi", "hello", "hey", "hiya", "howdy", "yo", "greetings"}
+# Allowed after a greeting word ("hi there", "good morning all"), never on their own
+GREETING_FILLER = {"there", "all", "everyone", "good", "morning", "afternoon", "evening", "team"}
+TIME_GREETINGS = {("good", "morning"), ("good", "afternoon"), ("good", "evening")}
+
+# Words a bare size message may carry ("225/45R17 please", "size is 225/45 R17");
+# anything else (a brand, a quantity, "I'd like 4") needs the LLM to pull it out.
+SIZE_FILLER = {"size", "sizes", "is", "it's", "its", "my", "the", "a", "tyre", "tyres", "tire", "tires",
+               "in", "for", "please", "pls", "thanks", "ok", "okay", "yes", "that", "one", "i", "have", "need"}
+MAX_SIZE_FILLER = 5
+
+ORDINALS = {
+    "first": 0, "1st": 0, "one": 0, "1": 0,
+    "second": 1, "2nd": 1, "two": 1, "2": 1,
+    "third": 2, "3rd": 2, "three": 2, "3": 2,
+    "fourth": 3, "4th": 3, "four": 3, "4": 3,
+    "last": -1,
+}
+SELECTION_FILLER = {"the", "a", "one", "size", "option", "please", "pls", "i'll", "go", "with", "for", "me", "number"}
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _empty_intent(state: str) -> dict:
+    return {
+        "state": state,
+        "car_brand": None,
+        "car_model": None,
+        "car_year": None,
+        "selected_size": None,
+        "selected_tyre_brand": None,
+        "selected_tyre_model": None,
+        "quantity": None,
+        "customer_name": None,
+        "wants_order": False,
+    }
+
+
+class FastIntentClassifier:
+    """Deterministic rules for turns whose state is obvious from the text alone.
+
+    Returns an intent dict in the same shape as the LLM classifier plus a
+    ``confidence`` field, or ``None`` when no rule applies.
+    """
+
+    def __init__(self):
+        self.stats = {
+            "calls": 0,
+            "hits": 0,
+            "misses": 0,
+            "low_confidence": 0,
+            "shadow_compared": 0,
+            "shadow_disagreements": 0,
+            "hits_by_rule": {},
+        }
+
+    def classify(self, user_message: str, chat_history: list[dict]) -> dict | None:
+        self.stats["calls"] += 1
+        result = (
+            self._order_code(user_message)
+            or self._tyre_size(user_message)
+            or self._greeting(user_message, chat_history)
+            or self._size_ordinal(user_message, chat_history)
+        )
+
+        if result is None:
+            self.stats["misses"] += 1
+            return None
+        if result["confidence"] < settings.FAST_CLASSIFIER_MIN_CONFIDENCE:
+            self.stats["low_confidence"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        rule = result["rule"]
+        self.stats["hits_by_rule"][rule] = self.stats["hits_by_rule"].get(rule, 0) + 1
+        return result
+
+    def record_shadow(self, fast: dict, llm: dict):
+        """Compare a fast-path result with the LLM's answer for the same turn."""
+        self.stats["shadow_compared"] += 1
+        same_state = fast.get("state") == llm.get("state")
+        same_size = fast.get("selected_size") is None or fast.get("selected_size") == llm.get("selected_size")
+        if not (same_state and same_size):
+            self.stats["shadow_disagreements"] += 1
+            logger.warning(
+                f"[FAST CLASSIFIER] Shadow disagreement ({fast.get('rule')}): "
+                f"fast={fast.get('state')}/{fast.get('selected_size')} "
+                f"llm={llm.get('state')}/{llm.get('selected_size')}"
+            )
+
+    def get_stats(self) -> dict:
+        calls = self.stats["calls"] or 1
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / calls, 4)}
+
+    # ---- Rules ----
+
+    def _order_code(self, message: str) -> dict | None:
+        match = ORDER_CODE_RE.search(message)
+        if not match:
+            return None
+        intent = _empty_intent("order_status")
+        intent["selected_tyre_model"] = f"MTX-{int(match.group(1)):05d}"
+        intent.update(rule="order_code", confidence=0.95)
+        return intent
+
+    def _tyre_size(self, message: str) -> dict | None:
+        sizes = {normalize_size(*m) for m in TYRE_SIZE_RE.findall(message)}
+        if len(sizes) != 1:
+            return None
+        # Only a bare size: "225/45R17, I'd like 4 Michelin" carries a quantity and brand the rule can't extract
+        words = _words(TYRE_SIZE_RE.sub(" ", message))
+        if len(words) > MAX_SIZE_FILLER or any(w not in SIZE_FILLER for w in words):
+            return None
+        intent = _empty_intent("size_selection")
+        intent["selected_size"] = sizes.pop()
+        intent.update(rule="tyre_size", confidence=0.9)
+        return intent
+
+    def _greeting(self, message: str, chat_history: list[dict]) -> dict | None:
+        words = _words(message)
+        if not words or len(words) > 4:
+            return None
+        if words[0] not in GREETING_WORDS and tuple(words[:2]) not in TIME_GREETINGS:
+            return None
+        if not all(w in GREETING_WORDS or w in GREETING_FILLER for w in words):
+            return None
+        intent = _empty_intent("greeting")
+        intent.update(rule="greeting", confidence=0.9 if not chat_history or len(chat_history) <= 1 else 0.8)
+        return intent
+
+    def _size_ordinal(self, message: str, chat_history: list[dict]) -> dict | None:
+        last_agent = next(
+            (m.get("text", "") for m in reversed(chat_history or []) if m.get("sender") != "user"),
+            None,
+        )
+        if not last_agent:
+            return None
+
+        offered = []
+        for m in TYRE_SIZE_RE.findall(last_agent):
+            size = normalize_size(*m)
+            if size not in offered:
+                offered.append(size)
+        if len(offered) < 2:
+            return None
+
+        words = _words(message)
+        picks = [ORDINALS[w] for w in words if w in ORDINALS]
+        rest = [w for w in words if w not in ORDINALS and w not in SELECTION_FILLER]
+        if not picks or rest or len(words) > 5:
+            return None
+
+        # "second one" yields picks [1, 0]; the first ordinal word is the real choice.
+        index = picks[0]
+        if index >= len(offered):
+            return None
+        intent = _empty_intent("size_selection")
+        intent["selected_size"] = offered[index]
+        intent.update(rule="size_ordinal", confidence=0.85)
+        return intent
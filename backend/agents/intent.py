@@ -0,0 +1,143 @@
+"""Schema-constrained LLM intent classification.
+
+The classifier LLM is bound to the ``TurnIntent`` tool, so Gemini returns
+typed arguments instead of free-text JSON. When the arguments don't validate
+(or no tool call comes back), the raw text is first repaired locally; only if
+that fails is the model asked again, once per remaining attempt and only while
+the tokens spent on this turn are under ``CLASSIFIER_TOKEN_BUDGET``.
+"""
+import json
+import logging
+import re
+from typing import Literal, Optional
+from langchain.schema import HumanMessage
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from backend.config import get_settings
+from backend.agents.llm import ainvoke_llm
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_NULLS = {"", "null", "none", "unknown", "n/a"}
+JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class TurnIntent(BaseModel):
+    """Classify the customer's new message in a tyre shop conversation and extract the details it gives."""
+
+    state: Literal[
+        "greeting", "car_identification", "size_selection", "order_intent", "order_placement", "order_status",
+        "general",
+    ] = Field(description="Conversation state after this message (see the state rules)")
+    car_brand: Optional[str] = Field(None, description="Car brand, e.g. Honda")
+    car_model: Optional[str] = Field(None, description="Car model, e.g. Civic")
+    car_year: Optional[str] = Field(None, description="Car year, e.g. 2019")
+    selected_size: Optional[str] = Field(None, description="Tyre size like 225/45R17")
+    selected_tyre_brand: Optional[str] = Field(None, description="Tyre brand the customer chose")
+    selected_tyre_model: Optional[str] = Field(
+        None, description="Tyre model the customer chose; for order_status, the order code (MTX-00001)",
+    )
+    quantity: Optional[int] = Field(None, description="Number of tyres wanted")
+    customer_name: Optional[str] = Field(None, description="Customer's full name")
+    wants_order: bool = Field(False, description="The customer wants to buy")
+
+    @field_validator(
+        "car_brand", "car_model", "car_year", "selected_size", "selected_tyre_brand", "selected_tyre_model",
+        "customer_name", "quantity", mode="before",
+    )
+    @classmethod
+    def _blank_to_none(cls, value):
+        if isinstance(value, str) and value.strip().lower() in _NULLS:
+            return None
+        return value
+
+    @field_validator("car_year", mode="before")
+    @classmethod
+    def _year_to_text(cls, value):
+        return str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+
+
+def _repair(raw) -> TurnIntent | None:
+    """Recover an intent from a reply that didn't come back as a valid tool call
+    (e.g. JSON in the text, possibly wrapped in code fences)."""
+    text = raw.content if isinstance(raw.content, str) else ""
+    match = JSON_OBJECT_RE.search(text)
+    if not match:
+        return None
+    try:
+        return TurnIntent.model_validate(json.loads(match.group(0)))
+    except (ValueError, ValidationError):
+        return None
+
+
+def _describe(raw) -> str:
+    if getattr(raw, "tool_calls", None):
+        return json.dumps(raw.tool_calls[0].get("args", {}))[:500]
+    return str(raw.content)[:500]
+
+
+def _tokens(raw) -> int:
+    usage = getattr(raw, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+class LLMIntentClassifier:
+    def __init__(self, llm):
+        self.llm = llm.with_structured_output(TurnIntent, include_raw=True)
+        self.stats = {
+            "calls": 0,
+            "first_try": 0,
+            "repaired": 0,
+            "retries": 0,
+            "retry_successes": 0,
+            "parse_failures": 0,
+            "api_errors": 0,
+            "fallbacks": 0,
+            "tokens": 0,
+        }
+
+    async def classify(self, messages: list) -> dict | None:
+        """The intent as a dict, or None when every attempt failed (the caller falls back)."""
+        self.stats["calls"] += 1
+        spent = 0
+        for attempt in range(1, settings.CLASSIFIER_MAX_ATTEMPTS + 1):
+            try:
+                output = await ainvoke_llm(self.llm, messages, role="classifier")
+            except Exception as e:
+                self.stats["api_errors"] += 1
+                logger.error(f"[INTENT] Classifier call failed: {e}")
+                break
+            raw = output["raw"]
+            spent += _tokens(raw)
+
+            intent = output["parsed"]
+            if intent is None:
+                intent = _repair(raw)
+                if intent is not None:
+                    self.stats["repaired"] += 1
+            if intent is not None:
+                if attempt == 1:
+                    self.stats["first_try"] += 1
+                else:
+                    self.stats["retry_successes"] += 1
+                self.stats["tokens"] += spent
+                return intent.model_dump()
+
+            self.stats["parse_failures"] += 1
+            error = output.get("parsing_error") or "no TurnIntent call"
+            logger.warning(f"[INTENT] Unusable classification (attempt {attempt}): {error}; got {_describe(raw)}")
+            if attempt == settings.CLASSIFIER_MAX_ATTEMPTS or spent >= settings.CLASSIFIER_TOKEN_BUDGET:
+                break
+            self.stats["retries"] += 1
+            messages = [*messages, HumanMessage(content=(
+                f"Your previous answer could not be used ({str(error)[:300]}). "
+                f"Call {TurnIntent.__name__} again with arguments that match its schema."
+            ))]
+
+        self.stats["tokens"] += spent
+        self.stats["fallbacks"] += 1
+        return None
+
+    def get_stats(self) -> dict:
+        calls = self.stats["calls"] or 1
+        return {**self.stats, "fallback_rate": round(self.stats["fallbacks"] / calls, 4)}
@@ -0,0 +1,241 @@
+"""Shared LLM clients and the gateway every Gemini call goes through.
+
+Agents ask for a client by role (``get_llm("classifier")``); roles map to a
+model via ``LLM_ROLE_MODELS`` (``GEMINI_MODEL`` otherwise), and roles with the
+same model and temperature share one client and its connection.
+
+``ainvoke_llm`` and ``astream_llm`` admit calls through ``LLMGateway``: at most
+``LLM_MAX_IN_FLIGHT`` calls run at once and input plus reserved output tokens
+stay under ``LLM_TOKENS_PER_MINUTE``. Waiting calls are admitted first come,
+first served, so a large prompt waiting for tokens isn't overtaken by a stream
+of small ones. Queue time, latency and tokens are recorded per role.
+"""
+import asyncio
+import functools
+import logging
+import time
+from langchain_google_genai import ChatGoogleGenerativeAI
+from backend.blocking import run_blocking
+from backend.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Temperature per role; roles not listed use DEFAULT_TEMPERATURE
+ROLE_TEMPERATURES = {
+    "classifier": 0.0,
+    "summarizer": 0.0,
+    "customer": 0.3,
+    "recommendation": 0.3,
+    "response": 0.3,
+}
+DEFAULT_TEMPERATURE = 0.3
+
+def _role_models() -> dict[str, str]:
+    """``LLM_ROLE_MODELS`` ("classifier=gemini-2.5-flash-lite,recommendation=gemini-2.5-pro") as a dict."""
+    models = {}
+    for pair in settings.LLM_ROLE_MODELS.split(","):
+        role, _, model = pair.partition("=")
+        if role.strip() and model.strip():
+            models[role.strip()] = model.strip()
+    return models
+
+
+def model_for(role: str) -> str:
+    return _role_models().get(role, settings.GEMINI_MODEL)
+
+
+@functools.lru_cache(maxsize=None)
+def _client(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    logger.info(f"[LLM] Client for {model} (temperature {temperature})")
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=settings.GEMINI_API_KEY,
+        temperature=temperature,
+    )
+
+
+def get_llm(role: str) -> ChatGoogleGenerativeAI:
+    """The shared chat model for ``role``."""
+    return _client(model_for(role), ROLE_TEMPERATURES.get(role, DEFAULT_TEMPERATURE))
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _input_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(m.content if isinstance(m.content, str) else str(m.content)) for m in messages)
+
+
+def _usage_tokens(output) -> int | None:
+    """Total tokens Gemini reports for a response (structured output returns ``{"raw": ...}``)."""
+    if isinstance(output, dict):
+        output = output.get("raw")
+    usage = getattr(output, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class _Admission:
+    """One admitted call: holds an in-flight slot and its token reservation until ``finish``."""
+
+    def __init__(self, gateway: "LLMGateway", role: str, reserved: int, queued_ms: float):
+        self.gateway = gateway
+        self.role = role
+        self.reserved = reserved
+        self.queued_ms = queued_ms
+        self.started = time.perf_counter()
+
+    def finish(self, tokens: int | None, error: bool = False):
+        self.gateway._finish(self, tokens, error)
+
+
+class LLMGateway:
+    """Global in-flight and tokens-per-minute limits for LLM calls, with FIFO admission."""
+
+    def __init__(self, max_in_flight: int, tokens_per_minute: int):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # asyncio.Lock wakes waiters in arrival order; only the head of the queue waits for capacity
+        self._admission = asyncio.Lock()
+        self._tokens = float(tokens_per_minute)
+        self._refilled = time.monotonic()
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats: dict[str, dict] = {}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.tokens_per_minute, self._tokens + (now - self._refilled) * self.tokens_per_minute / 60,
+        )
+        self._refilled = now
+
+    async def _take_tokens(self, tokens: int):
+        if not self.tokens_per_minute:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self._tokens) * 60 / self.tokens_per_minute)
+
+    async def admit(self, role: str, messages) -> _Admission:
+        """Wait for an in-flight slot and token capacity for one call."""
+        start = time.perf_counter()
+        # A prompt bigger than a whole minute's budget would never fit; let it through alone
+        reserved = min(_input_tokens(messages) + settings.LLM_OUTPUT_TOKEN_RESERVE, self.tokens_per_minute)
+        self.waiting += 1
+        try:
+            async with self._admission:
+                await self._take_tokens(reserved)
+                await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return _Admission(self, role, reserved, (time.perf_counter() - start) * 1000)
+
+    def _finish(self, admission: _Admission, tokens: int | None, error: bool):
+        self.in_flight -= 1
+        self._slots.release()
+        if tokens is not None and self.tokens_per_minute:
+            # Settle the reservation against what the call actually used
+            self._tokens += admission.reserved - tokens
+
+        role = self.stats.setdefault(admission.role, {
+            "calls": 0, "errors": 0, "tokens": 0, "queue_ms_total": 0.0, "queue_ms_max": 0.0,
+            "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+        })
+        latency_ms = (time.perf_counter() - admission.started) * 1000
+        role["calls"] += 1
+        role["errors"] += int(error)
+        role["tokens"] += tokens if tokens is not None else admission.reserved
+        role["queue_ms_total"] += admission.queued_ms
+        role["queue_ms_max"] = max(role["queue_ms_max"], admission.queued_ms)
+        role["latency_ms_total"] += latency_ms
+        role["latency_ms_max"] = max(role["latency_ms_max"], latency_ms)
+
+    def get_stats(self) -> dict:
+        self._refill()
+        roles = {}
+        for name, role in self.stats.items():
+            calls = role["calls"] or 1
+            roles[name] = {
+                "model": model_for(name),
+                "calls": role["calls"],
+                "errors": role["errors"],
+                "tokens": role["tokens"],
+                "avg_queue_ms": round(role["queue_ms_total"] / calls, 2),
+                "max_queue_ms": round(role["queue_ms_max"], 2),
+                "avg_latency_ms": round(role["latency_ms_total"] / calls, 2),
+                "max_latency_ms": round(role["latency_ms_max"], 2),
+            }
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_available": int(self._tokens) if self.tokens_per_minute else None,
+            "clients": _client.cache_info().currsize,
+            "roles": roles,
+        }
+
+
+llm_gateway = LLMGateway(settings.LLM_MAX_IN_FLIGHT, settings.LLM_TOKENS_PER_MINUTE)
+
+
+async def ainvoke_llm(llm, messages, role: str = "default"):
+    """Invoke a LangChain chat model without blocking the event loop.
+
+    The call waits for the gateway first, then uses the model's native async
+    client when ``LLM_ASYNC_MODE`` is ``native`` and falls back to the bounded
+    executor otherwise (or if the model has no async implementation).
+    """
+    admission = await llm_gateway.admit(role, messages)
+    try:
+        output = await _ainvoke(llm, messages)
+    except BaseException:
+        admission.finish(None, error=True)
+        raise
+    admission.finish(_usage_tokens(output))
+    return output
+
+
+async def _ainvoke(llm, messages):
+    # Models without a native async path (e.g. Gemini's async client unavailable) don't raise:
+    # LangChain runs their sync call on the loop's default executor, which is the bounded
+    # pool once use_as_default_executor() has run (see backend/main.py)
+    if settings.LLM_ASYNC_MODE == "native":
+        return await llm.ainvoke(messages)
+    return await run_blocking(llm.invoke, messages)
+
+
+async def astream_llm(llm, messages, role: str = "default"):
+    """Yield response text chunks as the model generates them.
+
+    The in-flight slot is held until the stream ends. In executor mode the
+    whole response arrives as a single chunk.
+    """
+    admission = await llm_gateway.admit(role, messages)
+    tokens, error = None, True
+    try:
+        if settings.LLM_ASYNC_MODE == "native":
+            async for chunk in llm.astream(messages):
+                used = _usage_tokens(chunk)  # chunks report the tokens since the previous chunk
+                if used is not None:
+                    tokens = (tokens or 0) + used
+                if chunk.content:
+                    yield chunk.content
+        else:
+            response = await run_blocking(llm.invoke, messages)
+            tokens = _usage_tokens(response)
+            yield response.content
+        error = False
+    finally:
+        admission.finish(tokens, error)
@@ -0,0 +1,105 @@
+"""Numbered tyre offers shown to a session, and resolving a customer's pick.
+
+When the RecommendationAgent presents in-stock tyres they are numbered in the
+prompt and stored with their ``tyre_id`` in ``chat_session_states.offers``.
+Later turns such as "option 2", "four of the first one" or "the Michelin"
+resolve against that short list, so order placement gets an exact id instead
+of searching the catalog by name.
+"""
+import re
+
+ORDINAL_WORDS = {
+    "first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3,
+    "fourth": 4, "4th": 4, "fifth": 5, "5th": 5, "last": -1,
+}
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+
+# "option 2", "number two", "no. 3", "#1": always a pick from the list
+NUMBERED_RE = re.compile(r"(?:\b(?:option|number|no\.?|choice|pick)|#)\s*(\d{1,2}|one|two|three|four|five)\b")
+# "the first one", "second please", "the last": only when the list was just shown ("last name", "first time" aren't picks)
+ORDINAL_RE = re.compile(
+    r"\b(" + "|".join(ORDINAL_WORDS) + r")\b(?=\s*(?:one|option|tyre|tire|choice|pick|please|thanks|$|[.!,]))"
+)
+BARE_NUMBER_RE = re.compile(r"^\s*(\d{1,2})\s*[.!]?\s*$")
+
+
+def _words(text: str) -> str:
+    return " " + " ".join(re.findall(r"[a-z0-9]+", (text or "").lower())) + " "
+
+
+def make_offers(inventory: list[dict]) -> list[dict]:
+    """Offer list for tyres from ``InventoryAgent.check_stock_by_size``, numbered from 1."""
+    return [
+        {"n": n, "tyre_id": t["tyre_id"], "brand": t["brand"], "model": t["model"], "size": t["size"],
+         "price": t["price"]}
+        for n, t in enumerate(inventory, start=1)
+    ]
+
+
+def bare_number(message: str) -> int | None:
+    """The number when the whole message is one ("4"): a pick right after the list, a quantity after that."""
+    match = BARE_NUMBER_RE.match(message or "")
+    return int(match.group(1)) if match else None
+
+
+def _nth(offers: list[dict], n: int) -> dict | None:
+    if n == -1:
+        return offers[-1]
+    return offers[n - 1] if 1 <= n <= len(offers) else None
+
+
+def _by_number(message: str, offers: list[dict]) -> dict | None:
+    """An explicitly numbered pick: "option 2", "#1"."""
+    picks = {NUMBER_WORDS.get(m) or int(m) for m in NUMBERED_RE.findall(message.lower())}
+    return _nth(offers, picks.pop()) if len(picks) == 1 else None
+
+
+def _by_position(message: str, offers: list[dict]) -> dict | None:
+    """A bare number or ordinal: "2", "the first one", "last please"."""
+    picks = {ORDINAL_WORDS[m] for m in ORDINAL_RE.findall(message.lower())}
+    number = bare_number(message)
+    if number is not None:
+        picks.add(number)
+    return _nth(offers, picks.pop()) if len(picks) == 1 else None
+
+
+def _distinctive_words(offer: dict, offers: list[dict]) -> set[str]:
+    """Model words that name only this offer ("turanza" for "Turanza T005")."""
+    others = {w for o in offers if o["tyre_id"] != offer["tyre_id"] for w in _words(o["model"]).split()}
+    return {w for w in _words(offer["model"]).split() if len(w) >= 3 and not w.isdigit() and w not in others}
+
+
+def _by_name(texts: list[str], offers: list[dict]) -> dict | None:
+    """The single offer whose model (or, failing that, brand) is named in ``texts``."""
+    text = " ".join(_words(t) for t in texts if t)
+    words = set(text.split())
+    by_model = [
+        o for o in offers
+        if (_words(o["model"]).strip() and _words(o["model"]) in text) or _distinctive_words(o, offers) & words
+    ]
+    if len({o["tyre_id"] for o in by_model}) == 1:
+        return by_model[0]
+    by_brand = [o for o in (by_model or offers) if _words(o["brand"]).strip() and _words(o["brand"]) in text]
+    if len({o["tyre_id"] for o in by_brand}) == 1:
+        return by_brand[0]
+    return None
+
+
+def resolve_offer(message: str, intent: dict, offers: list[dict], selected: int = None,
+                  just_offered: bool = False) -> dict | None:
+    """The offer a turn refers to, else the one chosen on an earlier turn.
+
+    A tyre named in the message or the classified intent wins, then an explicit
+    "option 2". Bare numbers and ordinals only pick when the list was shown on
+    the previous turn (``just_offered``) and nothing is chosen yet; after that
+    "4" is a quantity and "last name Smith" is not a pick.
+    """
+    if not offers:
+        return None
+    current = next((o for o in offers if o["n"] == selected), None) if selected is not None else None
+    offer = _by_name(
+        [message, intent.get("selected_tyre_brand"), intent.get("selected_tyre_model")], offers,
+    ) or _by_number(message, offers)
+    if offer is None and just_offered and current is None:
+        offer = _by_position(message, offers)
+    return offer or current
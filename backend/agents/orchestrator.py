@@ -1,7 +1,6 @@
+import asyncio
 import logging
 import json
-import re
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -10,13 +9,66 @@ from backend.agents.customer_agent import CustomerAgent
 from backend.agents.inventory_agent import InventoryAgent
 from backend.agents.recommendation_agent import RecommendationAgent
 from backend.agents.order_agent import OrderAgent
+from backend.agents.fast_classifier import FastIntentClassifier
+from backend.agents.intent import LLMIntentClassifier
+from backend.agents.llm import ainvoke_llm, astream_llm, get_llm
+from backend.agents.offers import bare_number, make_offers, resolve_offer
+from backend.agents.prompting import PromptBudget, clip, format_history
+from backend.agents.slots import after_turn, merge_slots, with_slots
 from backend.models.tyre import Tyre
 from backend.models.tyre_brand import TyreBrand
+from backend.rag.lexical_index import compact, lexical_index
+from backend.rag.text import TYRE_SIZE_RE, normalize_size
 
 settings = get_settings()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PREFETCH_STATES = {s.strip() for s in settings.RAG_PREFETCH_STATES.split(",") if s.strip()}
+
+# Previous states that mean the conversation is mid-order; the next turn almost
+# never lands in a prefetch state, so the speculative search isn't started.
+ORDER_FLOW_STATES = {"order_intent", "order_placement", "order_status"}
+
+
+class _RagPrefetch:
+    """A speculative CustomerAgent RAG search started alongside LLM classification."""
+
+    def __init__(self, task: asyncio.Task, stats: dict):
+        self.task = task
+        self.stats = stats
+        self.settled = False
+        stats["launched"] += 1
+
+    async def take(self, state: str) -> dict | None:
+        """Results for the CustomerAgent, or None if prefetch is off for this state or failed."""
+        if state not in PREFETCH_STATES:
+            return None
+        self.settled = True
+        try:
+            results = await self.task
+        except Exception as e:
+            self._count("failed", state)
+            logger.warning(f"[ORCHESTRATOR] RAG prefetch failed, searching again: {e}")
+            return None
+        self._count("used", state)
+        return results
+
+    def discard(self, state: str):
+        """Cancel the prefetch if the turn didn't use it."""
+        if self.settled:
+            return
+        self.settled = True
+        if self.task.done() and not self.task.cancelled() and self.task.exception():
+            self._count("failed", state)
+            return
+        self.task.cancel()
+        self._count("wasted", state)
+        logger.info(f"[ORCHESTRATOR] RAG prefetch discarded (state={state})")
+
+    def _count(self, outcome: str, state: str):
+        self.stats[outcome][state] = self.stats[outcome].get(state, 0) + 1
+
 
 class AgentOrchestrator:
     def __init__(self):
@@ -24,114 +76,283 @@ class AgentOrchestrator:
         self.inventory_agent = InventoryAgent()
         self.recommendation_agent = RecommendationAgent()
         self.order_agent = OrderAgent()
-        self.classifier = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.0,
-        )
-        self.response_llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.3,
-        )
+        self.fast_classifier = FastIntentClassifier()
+        self.prefetch_stats = {"launched": 0, "skipped": 0, "used": {}, "wasted": {}, "failed": {}}
+        self.classifier = get_llm("classifier")
+        self.llm_classifier = LLMIntentClassifier(self.classifier)
+        self.response_llm = get_llm("response")
+
+    async def classify_intent(self, user_message: str, chat_history: list[dict], session_state: dict = None) -> dict:
+        """Classify with local rules first; only ask the LLM when no rule is confident."""
+        intent, _ = await self._classify(user_message, chat_history, session_state, prefetch=False)
+        return intent
+
+    async def _classify(self, user_message: str, chat_history: list[dict], session_state: dict = None,
+                        prefetch: bool = True) -> tuple[dict, "_RagPrefetch | None"]:
+        """Classify a turn. When the LLM has to be asked, optionally start the
+        CustomerAgent's RAG search alongside it, since it doesn't depend on the state."""
+        fast = None
+        if settings.FAST_CLASSIFIER_ENABLED:
+            fast = self.fast_classifier.classify(user_message, chat_history)
+
+        if fast and not settings.FAST_CLASSIFIER_SHADOW:
+            logger.info(f"[ORCHESTRATOR] Fast-path classified: state={fast['state']}, size={fast.get('selected_size')} "
+                       f"(rule={fast['rule']}, confidence={fast['confidence']})")
+            return fast, None
+
+        rag_prefetch = None
+        if prefetch and PREFETCH_STATES and self._in_order_flow(session_state):
+            self.prefetch_stats["skipped"] += 1
+        elif prefetch and PREFETCH_STATES:
+            rag_prefetch = _RagPrefetch(
+                asyncio.create_task(self.customer_agent.retrieve(user_message, chat_history)),
+                self.prefetch_stats,
+            )
 
-    async def classify_intent(self, user_message: str, chat_history: list[dict]) -> dict:
-        """Use LLM to classify conversation state and extract key info."""
-        history_text = "\n".join([
-            f"{'Customer' if m.get('sender') == 'user' else 'Agent'}: {m.get('text', '')}"
-            for m in (chat_history or [])[-8:]
-        ])
+        result = await self._classify_with_llm(user_message, chat_history, session_state)
+        if fast:
+            self.fast_classifier.record_shadow(fast, result)
+        return result, rag_prefetch
+
+    @staticmethod
+    def _in_order_flow(session_state: dict | None) -> bool:
+        """Whether the session is mid-order: an order state last turn, or a tyre already picked."""
+        session_state = session_state or {}
+        slots = session_state.get("slots") or {}
+        return (session_state.get("last_state") in ORDER_FLOW_STATES
+                or slots.get("selected_offer") is not None
+                or bool(slots.get("selected_tyre_brand")))
+
+    def get_stats(self) -> dict:
+        return {
+            "fast_classifier": self.fast_classifier.get_stats(),
+            "llm_classifier": self.llm_classifier.get_stats(),
+            "rag_prefetch": self.prefetch_stats,
+        }
+
+    async def _classify_with_llm(self, user_message: str, chat_history: list[dict], session_state: dict = None) -> dict:
+        """Use LLM to classify conversation state and extract key info.
+
+        The prompt carries the session's slots and the agent's last reply rather
+        than the transcript; slots the new message doesn't mention are kept by
+        ``merge_slots``."""
+        session_state = session_state or {}
+        known = {k: v for k, v in (session_state.get("slots") or {}).items() if v is not None}
+        last_agent = next(
+            (m.get("text", "") for m in reversed(chat_history or []) if m.get("sender") != "user"),
+            "",
+        )
 
         prompt = f"""Analyze this tyre shop conversation and classify the current state.
 
-CONVERSATION:
-{history_text}
-Customer: {user_message}
+KNOWN DETAILS (from earlier turns):
+{json.dumps(known) if known else "none yet"}
+PREVIOUS STATE: {session_state.get("last_state") or "none (first message)"}
+
+AGENT'S LAST MESSAGE:
+{{last_agent}}
 
-Respond ONLY with valid JSON. No markdown, no code blocks, no extra text.
-{{
-  "state": "greeting|car_identification|size_selection|order_intent|order_placement|order_status|general",
-  "car_brand": "brand or null",
-  "car_model": "model or null",
-  "car_year": "year or null",
-  "selected_size": "tyre size like 225/45R17 or null",
-  "selected_tyre_brand": "tyre brand if customer chose one or null",
-  "selected_tyre_model": "tyre model if customer chose one or null",
-  "quantity": null,
-  "customer_name": "name or null",
-  "wants_order": false
-}}
+CUSTOMER'S NEW MESSAGE:
+{user_message}
+
+Call TurnIntent. Fill a field only when the new message (or a choice from the agent's last message) gives it; leave it null otherwise.
+Known details are kept automatically, but take them into account when choosing the state.
 
 STATE RULES:
 - "greeting": First message or general hello
 - "car_identification": Customer mentions a car, agent needs to find it and show tyre sizes
 - "size_selection": Customer is choosing/has chosen a tyre size from options (e.g. "first one", "1", "225/45R17", "the first size"). IMPORTANT: You MUST extract the actual tyre size value into selected_size by looking at what sizes the agent listed.
-- "order_intent": Customer wants to buy/order tyres. Extract tyre details, quantity, and customer name if available. If ALL of (customer_name, selected_tyre_brand, quantity) are known, use "order_placement" instead.
+- "order_intent": Customer wants to buy/order tyres. Extract tyre details, quantity, and customer name if available. If ALL of (customer_name, selected_tyre_brand, quantity) are known (from the new message or the known details), use "order_placement" instead.
 - "order_placement": We have customer_name AND selected_tyre_brand AND quantity - ready to place order.
 - "order_status": Customer is asking about order status or tracking. They may provide an order code like MTX-00001. Extract the code into selected_tyre_model field.
 - "general": Anything else
 
-CRITICAL: For "size_selection", look at the Agent's previous message to find the actual tyre sizes listed, and map the customer's choice (first/second/1/2) to the correct size string."""
+CRITICAL: For "size_selection", look at the agent's last message to find the actual tyre sizes listed, and map the customer's choice (first/second/1/2) to the correct size string."""
+
+        system = "You classify tyre shop conversations by calling the TurnIntent tool."
+        # Long markdown replies are clipped to what the budget leaves
+        budget = PromptBudget().spend(system, prompt)
+        last_agent = clip(last_agent, budget.remaining) if budget.remaining > 0 else ""
+        prompt = prompt.replace("{last_agent}", last_agent or "none", 1)
+        budget.spend(last_agent).done()
 
         messages = [
-            SystemMessage(content="You are a JSON-only classifier. Output raw JSON only. Never use markdown."),
+            SystemMessage(content=system),
             HumanMessage(content=prompt),
         ]
 
-        try:
-            response = self.classifier.invoke(messages)
-            text = response.content.strip()
-            if "```" in text:
-                text = re.sub(r'```(?:json)?\s*', '', text)
-                text = text.replace('```', '').strip()
-            result = json.loads(text)
-            logger.info(f"[ORCHESTRATOR] Classified: state={result.get('state')}, size={result.get('selected_size')}, "
-                       f"tyre={result.get('selected_tyre_brand')}, qty={result.get('quantity')}, name={result.get('customer_name')}")
-            return result
-        except Exception as e:
-            logger.error(f"[ORCHESTRATOR] Classification error: {e}")
+        result = await self.llm_classifier.classify(messages)
+        if result is None:
             return {"state": "general", "wants_order": False}
-
-    async def process(self, user_message: str, chat_history: list[dict], db: AsyncSession) -> dict:
-        """Main orchestration: classify → route → respond."""
+        logger.info(f"[ORCHESTRATOR] Classified: state={result.get('state')}, size={result.get('selected_size')}, "
+                   f"tyre={result.get('selected_tyre_brand')}, qty={result.get('quantity')}, name={result.get('customer_name')}")
+        return result
+
+    def _apply_slots(self, user_message: str, intent: dict, session_state: dict | None) -> tuple[dict, dict]:
+        """(intent with the session's slots filled in, the slots to store for the next turn).
+
+        A tyre picked from the session's offer list sets the tyre slots and
+        ``selected_tyre_id`` on the intent. Once a tyre is picked, a message that
+        is just a number ("4", the answer to "how many?") is the quantity."""
+        session_state = session_state or {}
+        slots = merge_slots(session_state.get("slots"), intent)
+        offer = None
+        if intent.get("state") != "order_status":
+            picked = slots.get("selected_offer")
+            offer = resolve_offer(user_message, intent, session_state.get("offers"), picked,
+                                  just_offered=session_state.get("just_offered", False))
+            quantity = bare_number(user_message)
+            if picked is not None and offer and offer["n"] == picked and quantity and not intent.get("quantity"):
+                slots["quantity"] = quantity
+        if offer:
+            slots.update(selected_offer=offer["n"], selected_tyre_brand=offer["brand"],
+                         selected_tyre_model=offer["model"], selected_size=offer["size"])
+            logger.info(f"[ORCHESTRATOR] Offer {offer['n']} selected: {offer['brand']} {offer['model']} "
+                        f"(tyre {offer['tyre_id']})")
+        intent = with_slots(intent, slots)
+        if offer:
+            intent["selected_tyre_id"] = offer["tyre_id"]
+        return intent, slots
+
+    async def process(self, user_message: str, chat_history: list[dict], db: AsyncSession,
+                      session_state: dict = None) -> dict:
+        """Main orchestration: classify → route → respond.
+
+        ``session_state`` is ``{"slots", "last_state", "offers", "just_offered"}`` from
+        the previous turn; the result carries the updated ``"slots"`` and ``"state"`` to store."""
         logger.info(f"\n{'='*80}")
         logger.info(f"[ORCHESTRATOR] Processing: '{user_message}'")
 
-        # Step 1: Classify intent
-        intent = await self.classify_intent(user_message, chat_history)
+        # Step 1: Classify intent (RAG may already be running alongside it)
+        intent, rag_prefetch = await self._classify(user_message, chat_history, session_state)
+        intent, slots = self._apply_slots(user_message, intent, session_state)
         state = intent.get("state", "general")
         logger.info(f"[ORCHESTRATOR] State: {state}")
 
         # Step 2: Route based on state
+        try:
+            result = await self._route(intent, user_message, chat_history, db, rag_prefetch=rag_prefetch)
+        finally:
+            if rag_prefetch:
+                rag_prefetch.discard(state)
+        return {**result, "state": state, "slots": after_turn(slots, result)}
+
+    async def process_stream(self, user_message: str, chat_history: list[dict], db: AsyncSession,
+                             session_state: dict = None):
+        """Streaming orchestration. Yields events as dicts:
+
+        - ``{"event": "meta", "state": ..., "agent": ...}`` as soon as the turn is classified, with the agent it is routed to
+        - ``{"event": "token", "text": ...}`` for each chunk of the response
+        - ``{"event": "done", "agent": ..., "state": ..., "slots": ...}`` with the agent that actually answered
+        """
+        logger.info(f"\n{'='*80}")
+        logger.info(f"[ORCHESTRATOR] Streaming: '{user_message}'")
+
+        intent, rag_prefetch = await self._classify(user_message, chat_history, session_state)
+        intent, slots = self._apply_slots(user_message, intent, session_state)
+        state = intent.get("state", "general")
+        logger.info(f"[ORCHESTRATOR] State: {state}")
+        yield {"event": "meta", "state": state, "agent": self._routed_agent(intent)}
+
+        try:
+            result = await self._route(intent, user_message, chat_history, db, stream=True, rag_prefetch=rag_prefetch)
+        finally:
+            if rag_prefetch:
+                rag_prefetch.discard(state)
+        if "stream" in result:
+            async for chunk in result.pop("stream"):
+                yield {"event": "token", "text": chunk}
+        else:
+            yield {"event": "token", "text": result.pop("response")}
+        yield {"event": "done", **result, "state": state, "slots": after_turn(slots, result)}
+
+    @staticmethod
+    def _order_complete(intent: dict) -> bool:
+        """Whether an order intent has everything needed to place the order."""
+        return bool(intent.get("customer_name") and (intent.get("selected_tyre_brand") or intent.get("selected_tyre_id"))
+                    and intent.get("quantity"))
+
+    def _routed_agent(self, intent: dict) -> str:
+        """The agent ``_route`` hands a classified turn to, known before any handler
+        runs. (A size with nothing in stock is answered by the InventoryAgent instead;
+        the ``done`` event carries the agent that actually answered.)"""
+        state = intent.get("state", "general")
+        if state == "size_selection":
+            return "recommendation" if intent.get("selected_size") else "customer"
+        if state == "order_intent":
+            return "order" if self._order_complete(intent) else "customer"
+        if state in ("order_placement", "order_status"):
+            return "order"
+        return "customer"
+
+    async def _route(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession,
+                     stream: bool = False, rag_prefetch: "_RagPrefetch | None" = None) -> dict:
+        """Dispatch a classified turn. With ``stream=True`` LLM-backed handlers return
+        ``{"stream": <async iterator of text>, "agent": ...}`` instead of ``"response"``."""
+        state = intent.get("state", "general")
+
         if state == "size_selection":
-            return await self._handle_size_selection(intent, user_message, chat_history, db)
+            return await self._handle_size_selection(intent, user_message, chat_history, db, stream, rag_prefetch)
 
         elif state == "order_intent":
-            return await self._handle_order_intent(intent, user_message, chat_history, db)
+            return await self._handle_order_intent(intent, user_message, chat_history, db, stream)
 
         elif state == "order_placement":
-            return await self._handle_order_placement(intent, user_message, chat_history, db)
+            return await self._handle_order_placement(intent, user_message, chat_history, db, stream)
 
         elif state == "order_status":
             return await self._handle_order_status(intent, user_message, chat_history, db)
 
         else:
             # greeting, car_identification, general → CustomerAgent
-            return await self._handle_customer(user_message, chat_history)
+            filters = await self._search_filters(intent)
+            return await self._handle_customer(user_message, chat_history, stream, rag_prefetch, state, filters)
 
-    async def _handle_customer(self, user_message: str, chat_history: list[dict]) -> dict:
+    async def _search_filters(self, intent: dict) -> dict[str, dict]:
+        """RAG filters implied by what the classifier already knows: the car
+        brand, the chosen tyre brand and the chosen size."""
+        filters: dict[str, dict] = {}
+        try:
+            if intent.get("car_brand"):
+                brand_id = await lexical_index.resolve("car_brands", intent["car_brand"])
+                if brand_id is not None:
+                    filters["car_models"] = {"brand_id": brand_id}
+            if intent.get("selected_tyre_brand"):
+                brand_id = await lexical_index.resolve("tyre_brands", intent["selected_tyre_brand"])
+                if brand_id is not None:
+                    filters.setdefault("tyres", {})["brand_id"] = brand_id
+        except Exception as e:
+            logger.warning(f"[ORCHESTRATOR] Could not resolve brand filters: {e}")
+        size_match = TYRE_SIZE_RE.search(intent.get("selected_size") or "")
+        if size_match:
+            filters.setdefault("tyres", {})["size"] = normalize_size(*size_match.groups())
+        if filters:
+            logger.info(f"[ORCHESTRATOR] RAG filters: {filters}")
+        return filters
+
+    async def _handle_customer(self, user_message: str, chat_history: list[dict], stream: bool = False,
+                               rag_prefetch: "_RagPrefetch | None" = None, state: str = "general",
+                               filters: dict[str, dict] = None) -> dict:
         """Default: CustomerAgent handles greeting, car ID, general conversation."""
         logger.info(f"[ORCHESTRATOR] → CustomerAgent")
-        result = await self.customer_agent.process_message(user_message, chat_history)
+        rag_results = await rag_prefetch.take(state) if rag_prefetch else None
+        if stream:
+            return {
+                "stream": self.customer_agent.stream_message(user_message, chat_history, rag_results, filters),
+                "agent": "customer",
+            }
+        result = await self.customer_agent.process_message(user_message, chat_history, rag_results, filters)
         return {"response": result["response"], "agent": "customer"}
 
-    async def _handle_size_selection(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession) -> dict:
+    async def _handle_size_selection(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession,
+                                     stream: bool = False, rag_prefetch: "_RagPrefetch | None" = None) -> dict:
         """Customer picked a size → InventoryAgent (DB) → RecommendationAgent (LLM)."""
         size = intent.get("selected_size")
 
         if not size:
             logger.warning(f"[ORCHESTRATOR] No size extracted, falling back to CustomerAgent")
-            return await self._handle_customer(user_message, chat_history)
+            filters = await self._search_filters(intent)
+            return await self._handle_customer(user_message, chat_history, stream, rag_prefetch, "size_selection", filters)
 
         # InventoryAgent: get REAL stock from PostgreSQL
         logger.info(f"[ORCHESTRATOR] → InventoryAgent: checking DB for size '{size}'")
@@ -155,13 +376,20 @@ CRITICAL: For "size_selection", look at the Agent's previous message to find the
             "size": size,
         }
 
+        # Numbered as the RecommendationAgent shows them, so later turns can pick by number or name
+        offers = make_offers(inventory)
+
         logger.info(f"[ORCHESTRATOR] → RecommendationAgent: ranking {len(inventory)} tyres")
+        if stream:
+            return {"stream": self.recommendation_agent.stream_recommend(car_info, inventory), "agent": "recommendation",
+                    "offers": offers}
         recommendation = await self.recommendation_agent.recommend(car_info, inventory)
         logger.info(f"[ORCHESTRATOR] ← RecommendationAgent: done")
 
-        return {"response": recommendation, "agent": "recommendation"}
+        return {"response": recommendation, "agent": "recommendation", "offers": offers}
 
-    async def _handle_order_intent(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession) -> dict:
+    async def _handle_order_intent(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession,
+                                   stream: bool = False) -> dict:
         """Customer wants to order but may be missing details."""
         customer_name = intent.get("customer_name")
         selected_tyre_brand = intent.get("selected_tyre_brand")
@@ -170,8 +398,8 @@ CRITICAL: For "size_selection", look at the Agent's previous message to find the
         logger.info(f"[ORCHESTRATOR] Order intent - name: {customer_name}, tyre: {selected_tyre_brand}, qty: {quantity}")
 
         # If we have everything, go straight to placement
-        if customer_name and selected_tyre_brand and quantity:
-            return await self._handle_order_placement(intent, user_message, chat_history, db)
+        if self._order_complete(intent):
+            return await self._handle_order_placement(intent, user_message, chat_history, db, stream)
 
         # Otherwise, ask for missing details
         missing = []
@@ -181,15 +409,11 @@ CRITICAL: For "size_selection", look at the Agent's previous message to find the
             missing.append("how many tyres you need")
 
         # Generate a response asking for missing details
-        history_text = "\n".join([
-            f"{'Customer' if m.get('sender') == 'user' else 'Agent'}: {m.get('text', '')}"
-            for m in (chat_history or [])[-6:]
-        ])
-
+        system = "You are a friendly tyre shop assistant. Be brief and warm."
         ask_prompt = f"""You are a friendly tyre specialist at Matrax Tyres. The customer wants to place an order.
 
 Conversation:
-{history_text}
+{{history}}
 Customer: {user_message}
 
 Known details:
@@ -202,12 +426,17 @@ We still need: {', '.join(missing) if missing else 'confirmation to proceed'}.
 
 Write a SHORT, friendly message asking for the missing details. If we have the tyre but not the name/quantity, ask for those.
 Keep it to 2-3 sentences max. Use emojis sparingly."""
+        budget = PromptBudget().spend(system, ask_prompt)
+        ask_prompt = ask_prompt.replace("{history}", format_history(chat_history, budget.remaining, budget), 1)
+        budget.done()
 
         messages = [
-            SystemMessage(content="You are a friendly tyre shop assistant. Be brief and warm."),
+            SystemMessage(content=system),
             HumanMessage(content=ask_prompt),
         ]
-        response = self.response_llm.invoke(messages)
+        if stream:
+            return {"stream": astream_llm(self.response_llm, messages, role="response"), "agent": "customer"}
+        response = await ainvoke_llm(self.response_llm, messages, role="response")
         return {"response": response.content, "agent": "customer"}
 
     async def _handle_order_status(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession) -> dict:
@@ -269,7 +498,26 @@ Keep it to 2-3 sentences max. Use emojis sparingly."""
         )
         return {"response": response, "agent": "order"}
 
-    async def _handle_order_placement(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession) -> dict:
+    async def _find_tyre(self, db: AsyncSession, intent: dict):
+        """(Tyre, brand name) for the tyre being ordered: by id when it was picked
+        from the offer list, otherwise by exact brand (and size) with the model
+        matched among that brand's tyres."""
+        query = select(Tyre, TyreBrand.name.label("brand_name")).join(TyreBrand, Tyre.brand_id == TyreBrand.id)
+        if intent.get("selected_tyre_id"):
+            return (await db.execute(query.where(Tyre.id == intent["selected_tyre_id"]))).first()
+
+        brand_id = await lexical_index.resolve("tyre_brands", intent["selected_tyre_brand"])
+        if brand_id is None:
+            return None
+        query = query.where(Tyre.brand_id == brand_id)
+        if intent.get("selected_size"):
+            query = query.where(Tyre.size == intent["selected_size"])
+        rows = (await db.execute(query.order_by(Tyre.id))).all()
+        wanted = compact(intent.get("selected_tyre_model") or "")
+        return next((row for row in rows if wanted in compact(row[0].model)), None)
+
+    async def _handle_order_placement(self, intent: dict, user_message: str, chat_history: list[dict], db: AsyncSession,
+                                      stream: bool = False) -> dict:
         """Place the actual order in the database."""
         customer_name = intent.get("customer_name")
         selected_tyre_brand = intent.get("selected_tyre_brand")
@@ -282,25 +530,12 @@ Keep it to 2-3 sentences max. Use emojis sparingly."""
         logger.info(f"[ORCHESTRATOR]   Tyre: {selected_tyre_brand} {selected_tyre_model}")
         logger.info(f"[ORCHESTRATOR]   Qty: {quantity}, Size: {selected_size}")
 
-        if not customer_name or not selected_tyre_brand:
+        if not customer_name or not (selected_tyre_brand or intent.get("selected_tyre_id")):
             # Missing critical info
-            return await self._handle_order_intent(intent, user_message, chat_history, db)
+            return await self._handle_order_intent(intent, user_message, chat_history, db, stream)
 
-        # Find the tyre in DB
         try:
-            query = (
-                select(Tyre, TyreBrand.name.label("brand_name"))
-                .join(TyreBrand, Tyre.brand_id == TyreBrand.id)
-                .where(TyreBrand.name.ilike(f"%{selected_tyre_brand}%"))
-            )
-            if selected_tyre_model:
-                query = query.where(Tyre.model.ilike(f"%{selected_tyre_model}%"))
-            if selected_size:
-                query = query.where(Tyre.size == selected_size)
-
-            result = await db.execute(query)
-            row = result.first()
-
+            row = await self._find_tyre(db, intent)
             if not row:
                 logger.warning(f"[ORCHESTRATOR] Tyre not found in DB: {selected_tyre_brand} {selected_tyre_model}")
                 return {
@@ -0,0 +1,178 @@
+"""Prompt assembly under a per-call token budget.
+
+Agents build prompts from three variable parts: conversation history, RAG
+context and the fixed instructions. ``PromptBudget`` reserves the fixed parts
+first; ``format_history`` then keeps the newest messages that fit (long agent
+replies are clipped) behind the session's rolling summary, and
+``format_context`` keeps the highest-scoring hits across all collections.
+
+Token counts are estimated (about four characters per token for English)
+rather than counted by the API, which is close enough for budgeting.
+
+Older turns are folded into a rolling summary per session
+(``chat_session_states.summary``). ``ConversationSummarizer`` only calls the
+LLM when at least ``CHAT_SUMMARY_STEP`` messages have moved out of the
+``CHAT_HISTORY_MESSAGES`` window, and runs after the reply has been sent.
+"""
+import logging
+from langchain.schema import HumanMessage, SystemMessage
+from backend.config import get_settings
+from backend.agents.llm import CHARS_PER_TOKEN, ainvoke_llm, estimate_tokens, get_llm
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+stats = {
+    "prompts": 0,
+    "prompt_tokens": 0,
+    "messages_dropped": 0,
+    "messages_clipped": 0,
+    "hits_dropped": 0,
+}
+
+
+class ChatHistory(list):
+    """Recent messages (oldest first) plus the rolling summary of everything before them."""
+
+    def __init__(self, messages=(), summary: str | None = None):
+        super().__init__(messages)
+        self.summary = summary
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """``text`` cut to about ``max_tokens`` at a word boundary."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+class PromptBudget:
+    """Token budget for one LLM call (``PROMPT_TOKEN_BUDGET`` by default)."""
+
+    def __init__(self, total: int = None):
+        self.total = total or settings.PROMPT_TOKEN_BUDGET
+        self.remaining = self.total
+
+    def spend(self, *texts: str) -> "PromptBudget":
+        self.remaining -= sum(estimate_tokens(t) for t in texts)
+        return self
+
+    def share(self, fraction: float) -> int:
+        return max(0, int(self.remaining * fraction))
+
+    def done(self):
+        """Record the size of the assembled prompt."""
+        stats["prompts"] += 1
+        stats["prompt_tokens"] += self.total - self.remaining
+
+
+def format_history(history: list[dict], max_tokens: int, budget: PromptBudget = None) -> str:
+    """The rolling summary (if any) and the newest messages that fit in ``max_tokens``."""
+    summary = getattr(history, "summary", None)
+    parts, used = [], 0
+    if summary:
+        summary_text = "Summary of earlier conversation: " + clip(summary, max(max_tokens // 3, 1))
+        used = estimate_tokens(summary_text)
+        parts.append(summary_text)
+
+    lines = []
+    messages = list(history or [])
+    for i, message in enumerate(reversed(messages)):
+        role = "Customer" if message.get("sender") == "user" else "Agent"
+        text = message.get("text", "")
+        clipped = clip(text, settings.PROMPT_MESSAGE_MAX_TOKENS)
+        line = f"{role}: {clipped}"
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            stats["messages_dropped"] += len(messages) - i
+            break
+        if clipped != text:
+            stats["messages_clipped"] += 1
+        lines.append(line)
+        used += cost
+
+    text = "\n".join(parts + lines[::-1])
+    if budget is not None:
+        budget.spend(text)
+    return text
+
+
+def format_context(results: dict[str, list[dict]], max_tokens: int, render, budget: PromptBudget = None) -> str:
+    """RAG hits rendered by ``render(collection, hit)``, best-scoring first across
+    collections until ``max_tokens`` is used, then grouped by collection."""
+    ranked = sorted(
+        ((hit["score"], collection, order, hit)
+         for collection, hits in results.items() for order, hit in enumerate(hits)),
+        key=lambda item: -item[0],
+    )
+    kept: dict[str, list[tuple[int, str]]] = {}
+    used = 0
+    for _, collection, order, hit in ranked:
+        line = render(collection, hit)
+        cost = estimate_tokens(line) + (0 if collection in kept else estimate_tokens(collection) + 1)
+        if used + cost > max_tokens:
+            stats["hits_dropped"] += 1
+            continue
+        kept.setdefault(collection, []).append((order, line))
+        used += cost
+
+    parts = []
+    for collection in results:
+        if collection in kept:
+            parts.append(f"\n{collection.upper()}:")
+            parts.extend(line for _, line in sorted(kept[collection]))
+    text = "\n".join(parts)
+    if budget is not None:
+        budget.spend(text)
+    return text
+
+
+class ConversationSummarizer:
+    def __init__(self):
+        self.llm = get_llm("summarizer")
+        self.stats = {"summaries": 0, "messages_summarized": 0, "errors": 0}
+
+    def due(self, unsummarized: int) -> int:
+        """How many of the oldest ``unsummarized`` messages to fold into the summary now (0 = not yet)."""
+        if not settings.CHAT_SUMMARY_ENABLED:
+            return 0
+        overflow = unsummarized - settings.CHAT_HISTORY_MESSAGES
+        return overflow if overflow >= settings.CHAT_SUMMARY_STEP else 0
+
+    async def summarize(self, previous: str | None, messages: list[dict]) -> str:
+        transcript = "\n".join(
+            f"{'Customer' if m.get('sender') == 'user' else 'Agent'}: "
+            f"{clip(m.get('text', ''), settings.PROMPT_MESSAGE_MAX_TOKENS)}"
+            for m in messages
+        )
+        response = await ainvoke_llm(self.llm, [
+            SystemMessage(content="You keep a short running summary of a tyre shop chat for the shop's assistant."),
+            HumanMessage(content=f"""Summary so far:
+{previous or "(none)"}
+
+Messages since then:
+{transcript}
+
+Rewrite the summary to include these messages in at most {settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.
+Keep facts the assistant needs later: the car, tyre sizes and tyres discussed or offered, choices made,
+quantities, the customer's name and any order codes. Plain text, no markdown."""),
+        ], role="summarizer")
+        self.stats["summaries"] += 1
+        self.stats["messages_summarized"] += len(messages)
+        return clip(response.content.strip(), settings.CHAT_SUMMARY_MAX_TOKENS)
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+summarizer = ConversationSummarizer()
+
+
+def get_stats() -> dict:
+    prompts = stats["prompts"] or 1
+    return {
+        **stats,
+        "avg_prompt_tokens": round(stats["prompt_tokens"] / prompts, 1),
+        "summarizer": summarizer.get_stats(),
+    }
@@ -1,7 +1,7 @@
 import logging
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from backend.config import get_settings
+from backend.agents.llm import ainvoke_llm, astream_llm, get_llm
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -9,11 +9,7 @@ logger = logging.getLogger(__name__)
 
 class RecommendationAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            google_api_key=settings.GEMINI_API_KEY,
-            temperature=0.3,
-        )
+        self.llm = get_llm("recommendation")
         self.system_prompt = """You are a tyre recommendation specialist at Matrax Tyres.
 
 YOUR TASK: Given a car and available tyres from our inventory, recommend the BEST tyre as your top pick and list the alternatives.
@@ -25,6 +21,7 @@ RESPONSE FORMAT (follow this exactly):
 4. Ask if they'd like to order
 
 FORMATTING RULES:
+- Every tyre in the list has a number: always show it before the tyre name (e.g. **2. Bridgestone Turanza T005**) so the customer can reply with it
 - Use bullet points (•) not asterisks
 - Show prices with £ symbol
 - Keep it SHORT (no walls of text)
@@ -35,28 +32,33 @@ FORMATTING RULES:
 EXAMPLE:
 Great choice for your BMW 320i 2023! Here are the available tyres in 225/45R17:
 
-⭐ **Top Pick: Michelin Pilot Sport 4** - £189.99
+⭐ **Top Pick: 1. Michelin Pilot Sport 4** - £189.99
 Performance tyre with excellent grip and handling. Perfect for your BMW!
 
 **Other options:**
-• **Bridgestone Turanza T005** - £165.99 | Comfort
-• **Toyo Celsius II** - £149.99 | All-Season
+• **2. Bridgestone Turanza T005** - £165.99 | Comfort
+• **3. Toyo Celsius II** - £149.99 | All-Season
 
-Would you like to order any of these? Just let me know which one and how many! 😊"""
-
-    async def recommend(self, car_info: dict, available_tyres: list[dict]) -> str:
-        logger.info(f"[RECOMMENDATION AGENT] Generating recommendation for {len(available_tyres)} tyres")
+Would you like to order any of these? Just let me know the number (or name) and how many! 😊"""
 
+    def _build_messages(self, car_info: dict, available_tyres: list[dict]) -> list:
+        # Numbered in the order the orchestrator stores them as the session's offers
         tyres_text = "\n".join([
-            f"- {t.get('brand', t.get('brand_name', ''))} {t.get('model', '')} | "
+            f"{n}. {t.get('brand', t.get('brand_name', ''))} {t.get('model', '')} | "
             f"Size: {t.get('size', '')} | Type: {t.get('type', '')} | "
             f"Price: £{t.get('price', 0):.2f}"
-            for t in available_tyres
+            for n, t in enumerate(available_tyres, start=1)
         ])
 
+        # Fast-path classified turns may not carry the car; don't make the LLM talk about "None None".
+        car_text = " ".join(
+            str(car_info[k]) for k in ("brand", "model", "year")
+            if car_info.get(k) and car_info.get(k) != "Unknown"
+        ) or "Not specified (don't mention the car)"
+
         messages = [
             SystemMessage(content=self.system_prompt),
-            HumanMessage(content=f"""Car: {car_info.get('brand', 'Unknown')} {car_info.get('model', 'Unknown')} {car_info.get('year', '')}
+            HumanMessage(content=f"""Car: {car_text}
 Selected size: {car_info.get('size', 'Unknown')}
 
 Available tyres from our inventory:
@@ -64,7 +66,19 @@ Available tyres from our inventory:
 
 Recommend the best tyre and list alternatives. Keep it concise!"""),
         ]
+        return messages
 
-        response = self.llm.invoke(messages)
+    async def recommend(self, car_info: dict, available_tyres: list[dict]) -> str:
+        logger.info(f"[RECOMMENDATION AGENT] Generating recommendation for {len(available_tyres)} tyres")
+        messages = self._build_messages(car_info, available_tyres)
+
+        response = await ainvoke_llm(self.llm, messages, role="recommendation")
         logger.info(f"[RECOMMENDATION AGENT] Response generated: {response.content[:100]}...")
         return response.content
+
+    async def stream_recommend(self, car_info: dict, available_tyres: list[dict]):
+        """Same as recommend, but yields the response text as it is generated."""
+        logger.info(f"[RECOMMENDATION AGENT] Streaming recommendation for {len(available_tyres)} tyres")
+        messages = self._build_messages(car_info, available_tyres)
+        async for chunk in astream_llm(self.llm, messages, role="recommendation"):
+            yield chunk
@@ -0,0 +1,79 @@
+"""Per-session conversation slots, carried from turn to turn.
+
+The classifier only reports what it sees in the new message (plus the stored
+slots it is shown); ``merge_slots`` folds that into the session's slots, so a
+car or tyre mentioned five turns ago stays known after the message that named
+it is no longer in the prompt. Slots are stored in ``chat_session_states``.
+"""
+
+SLOTS = (
+    "car_brand",
+    "car_model",
+    "car_year",
+    "selected_size",
+    "selected_tyre_brand",
+    "selected_tyre_model",
+    "quantity",
+    "customer_name",
+)
+
+# Changing a slot clears the slots chosen under it, unless the same turn set them too
+# (``selected_offer`` is the number of the offer picked from ``backend.agents.offers``;
+# the orchestrator sets it, the classifier never does)
+DEPENDENT_SLOTS = {
+    "car_brand": ("car_model", "car_year", "selected_size", "selected_tyre_brand", "selected_tyre_model",
+                  "selected_offer"),
+    "car_model": ("car_year", "selected_size", "selected_tyre_brand", "selected_tyre_model", "selected_offer"),
+    "selected_size": ("selected_tyre_brand", "selected_tyre_model", "selected_offer"),
+    "selected_tyre_brand": ("selected_tyre_model", "selected_offer"),
+    "selected_tyre_model": ("selected_offer",),
+}
+
+# Cleared once an order is placed, so the next "I'd like to order" starts a new order
+ORDER_SLOTS = ("selected_tyre_brand", "selected_tyre_model", "selected_offer", "quantity")
+
+_NULLS = {"", "null", "none", "unknown", "n/a"}
+
+
+def _value(value):
+    if isinstance(value, str) and value.strip().lower() in _NULLS:
+        return None
+    return value
+
+
+def empty_slots() -> dict:
+    return {slot: None for slot in SLOTS}
+
+
+def merge_slots(slots: dict | None, intent: dict) -> dict:
+    """Slots after a classified turn: values the turn supplied replace stored ones."""
+    merged = {**empty_slots(), **(slots or {})}
+    supplied = {slot: _value(intent.get(slot)) for slot in SLOTS}
+    if intent.get("state") == "order_status":
+        supplied["selected_tyre_model"] = None  # the classifier puts the order code there
+    supplied = {slot: value for slot, value in supplied.items() if value is not None}
+
+    for slot, value in supplied.items():
+        if merged[slot] is not None and str(merged[slot]).lower() != str(value).lower():
+            for dependent in DEPENDENT_SLOTS.get(slot, ()):
+                if dependent not in supplied:
+                    merged[dependent] = None
+    merged.update(supplied)
+    return merged
+
+
+def with_slots(intent: dict, slots: dict) -> dict:
+    """The classified intent with every slot taken from the merged ``slots``."""
+    filled = {**intent, **slots}
+    if intent.get("state") == "order_status":
+        filled["selected_tyre_model"] = intent.get("selected_tyre_model")
+    return filled
+
+
+def after_turn(slots: dict, result: dict) -> dict:
+    """Slots to store once the turn has been answered."""
+    if result.get("order_code"):
+        return {**slots, **{slot: None for slot in ORDER_SLOTS}}
+    if "offers" in result:
+        return {**slots, "selected_offer": None}  # numbers now refer to the new list
+    return slots
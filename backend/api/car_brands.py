@@ -5,7 +5,8 @@ from backend.database import get_db
 from backend.models.car_brand import CarBrand
 from backend.models.car_model import CarModel
 from backend.models.schemas import CarBrandCreate, CarBrandUpdate, CarBrandResponse
-from backend.rag.qdrant_client import upsert_record, delete_record
+from backend.rag.cascade import enqueue_cascade
+from backend.rag.outbox import enqueue, outbox_worker
 
 router = APIRouter(prefix="/car-brands", tags=["Car Brands"])
 
@@ -50,19 +51,12 @@ async def get_car_brand(brand_id: int, db: AsyncSession = Depends(get_db)):
 async def create_car_brand(data: CarBrandCreate, db: AsyncSession = Depends(get_db)):
     brand = CarBrand(name=data.name, country=data.country)
     db.add(brand)
+    await db.flush()
+    enqueue(db, "car_brands", brand.id)
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(brand)
 
-    try:
-        upsert_record(
-            "car_brands",
-            brand.id,
-            brand.name,
-            {"id": brand.id, "name": brand.name, "country": brand.country},
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return CarBrandResponse(id=brand.id, name=brand.name, country=brand.country, models_count=0)
 
 
@@ -72,30 +66,30 @@ async def update_car_brand(brand_id: int, data: CarBrandUpdate, db: AsyncSession
     if not brand:
         raise HTTPException(status_code=404, detail="Car brand not found")
 
+    renamed = data.name is not None and data.name != brand.name
     if data.name is not None:
         brand.name = data.name
     if data.country is not None:
         brand.country = data.country
 
+    if renamed:
+        # Dependents embed the brand name; they are queued with the rename so the reindex commits with it
+        reindex_job_id = await enqueue_cascade(db, "car_brands", brand.id)
+    else:
+        enqueue(db, "car_brands", brand.id)
+        reindex_job_id = None
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(brand)
 
-    try:
-        upsert_record(
-            "car_brands",
-            brand.id,
-            brand.name,
-            {"id": brand.id, "name": brand.name, "country": brand.country},
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     models_count_result = await db.execute(
         select(func.count(CarModel.id)).where(CarModel.brand_id == brand.id)
     )
     models_count = models_count_result.scalar() or 0
 
-    return CarBrandResponse(id=brand.id, name=brand.name, country=brand.country, models_count=models_count)
+    return CarBrandResponse(
+        id=brand.id, name=brand.name, country=brand.country, models_count=models_count, reindex_job_id=reindex_job_id,
+    )
 
 
 @router.delete("/{brand_id}")
@@ -104,12 +98,13 @@ async def delete_car_brand(brand_id: int, db: AsyncSession = Depends(get_db)):
     if not brand:
         raise HTTPException(status_code=404, detail="Car brand not found")
 
+    enqueue(db, "car_brands", brand_id, "delete")
+    # Its car models go with it (ON DELETE CASCADE)
+    child_ids = (await db.execute(select(CarModel.id).where(CarModel.brand_id == brand_id))).scalars().all()
+    for child_id in child_ids:
+        enqueue(db, "car_models", child_id, "delete")
     await db.delete(brand)
     await db.commit()
-
-    try:
-        delete_record("car_brands", brand_id)
-    except Exception as e:
-        print(f"Qdrant delete error: {e}")
+    outbox_worker.notify()
 
     return {"message": "Car brand deleted"}
@@ -5,7 +5,7 @@ from backend.database import get_db
 from backend.models.car_model import CarModel
 from backend.models.car_brand import CarBrand
 from backend.models.schemas import CarModelCreate, CarModelUpdate, CarModelResponse
-from backend.rag.qdrant_client import upsert_record, delete_record
+from backend.rag.outbox import enqueue, outbox_worker
 
 router = APIRouter(prefix="/car-models", tags=["Car Models"])
 
@@ -55,23 +55,12 @@ async def create_car_model(data: CarModelCreate, db: AsyncSession = Depends(get_
         year=data.year, tyre_sizes=data.tyre_sizes,
     )
     db.add(model)
+    await db.flush()
+    enqueue(db, "car_models", model.id)
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(model)
 
-    try:
-        upsert_record(
-            "car_models",
-            model.id,
-            f"{brand.name} {model.name} {model.year}",
-            {
-                "id": model.id, "brand_id": brand.id, "brand_name": brand.name,
-                "name": model.name, "year": model.year,
-                "tyre_sizes": model.tyre_sizes or [],
-            },
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return CarModelResponse(
         id=model.id, brand_id=model.brand_id, brand_name=brand.name,
         name=model.name, year=model.year, tyre_sizes=model.tyre_sizes or [],
@@ -96,25 +85,13 @@ async def update_car_model(model_id: int, data: CarModelUpdate, db: AsyncSession
     if data.tyre_sizes is not None:
         model.tyre_sizes = data.tyre_sizes
 
+    enqueue(db, "car_models", model.id)
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(model)
 
     brand = await db.get(CarBrand, model.brand_id)
 
-    try:
-        upsert_record(
-            "car_models",
-            model.id,
-            f"{brand.name} {model.name} {model.year}",
-            {
-                "id": model.id, "brand_id": brand.id, "brand_name": brand.name,
-                "name": model.name, "year": model.year,
-                "tyre_sizes": model.tyre_sizes or [],
-            },
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return CarModelResponse(
         id=model.id, brand_id=model.brand_id, brand_name=brand.name,
         name=model.name, year=model.year, tyre_sizes=model.tyre_sizes or [],
@@ -127,12 +104,9 @@ async def delete_car_model(model_id: int, db: AsyncSession = Depends(get_db)):
     if not model:
         raise HTTPException(status_code=404, detail="Car model not found")
 
+    enqueue(db, "car_models", model_id, "delete")
     await db.delete(model)
     await db.commit()
-
-    try:
-        delete_record("car_models", model_id)
-    except Exception as e:
-        print(f"Qdrant delete error: {e}")
+    outbox_worker.notify()
 
     return {"message": "Car model deleted"}
@@ -1,20 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from backend.database import get_db
-from backend.models.chat import ChatSession, ChatMessage
+from backend.database import get_db, async_session
+from backend.config import get_settings
+from backend.models.chat import ChatSession, ChatMessage, ChatSessionState
 from backend.models.schemas import ChatRequest, ChatResponse, ChatMessageResponse
+from backend.agents.llm import llm_gateway
 from backend.agents.orchestrator import AgentOrchestrator
+from backend.agents.prompting import ChatHistory, get_stats as get_prompting_stats, summarizer
+from backend.rag.embeddings import get_cache_stats
+from backend.rag.hydration import get_stats as get_hydration_stats
+from backend.rag.lexical_index import lexical_index
+from backend.rag.outbox import outbox_worker
+from backend.rag.search_cache import search_cache
+from backend.rag.versions import version_watcher
+import asyncio
+import json
 import logging
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 orchestrator = AgentOrchestrator()
 
+# Summary updates still running after their response was sent
+_background: set[asyncio.Task] = set()
 
-@router.post("", response_model=ChatResponse)
-async def chat(data: ChatRequest, db: AsyncSession = Depends(get_db)):
+ERROR_REPLY = "I'm sorry, I encountered an error processing your request. Please try again."
+
+
+def _message_response(msg: ChatMessage) -> ChatMessageResponse:
+    return ChatMessageResponse(
+        id=msg.id, sender=msg.sender, text=msg.text,
+        timestamp=msg.created_at.strftime("%I:%M %p") if msg.created_at else "",
+    )
+
+
+async def _start_turn(data: ChatRequest, db: AsyncSession) -> tuple[ChatSession, ChatMessage, ChatHistory, dict]:
+    """Resolve or create the session, store the user's message and load the
+    messages not yet in the rolling summary (about ``CHAT_HISTORY_MESSAGES``),
+    the summary and the session's slots."""
     if data.session_id:
         session = await db.get(ChatSession, data.session_id)
         if not session:
@@ -34,47 +61,174 @@ async def chat(data: ChatRequest, db: AsyncSession = Depends(get_db)):
     await db.commit()
     await db.refresh(user_msg)
 
+    state = await db.get(ChatSessionState, session.id)
+    query = select(ChatMessage).where(ChatMessage.session_id == session.id)
+    if state is not None and state.summary_upto is not None:
+        query = query.where(ChatMessage.id > state.summary_upto)
+    # The window plus the messages that will be summarized next (see ConversationSummarizer.due)
     history_result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.session_id == session.id)
-        .order_by(ChatMessage.created_at)
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(settings.CHAT_HISTORY_MESSAGES + settings.CHAT_SUMMARY_STEP)
     )
-    history = [
-        {"sender": msg.sender, "text": msg.text}
-        for msg in history_result.scalars().all()
-    ]
+    history = ChatHistory(
+        [{"sender": msg.sender, "text": msg.text} for msg in reversed(history_result.scalars().all())],
+        summary=state.summary if state else None,
+    )
+    session_state = {
+        "slots": state.slots,
+        "last_state": state.last_state,
+        "offers": state.offers,
+        "just_offered": state.offers_turn is not None and state.offers_turn == state.turns,
+    } if state else {}
+    return session, user_msg, history, session_state
 
-    try:
-        result = await orchestrator.process(data.message, history, db)
-        agent_text = result["response"]
-        active_agent = result.get("agent", "unknown")
-        logger.info(f"[CHAT] Response from: {active_agent}")
-    except Exception as e:
-        logger.error(f"[CHAT] Error: {e}", exc_info=True)
-        agent_text = f"I'm sorry, I encountered an error processing your request. Please try again."
 
+async def _save_agent_message(db: AsyncSession, session_id: int, text: str, result: dict = None) -> ChatMessage:
+    """Store the reply and, when the turn was classified, the updated slots (and any new offer list), in one commit."""
     agent_msg = ChatMessage(
-        session_id=session.id,
+        session_id=session_id,
         sender="agent",
-        text=agent_text,
+        text=text,
     )
     db.add(agent_msg)
+    if result and "slots" in result:
+        state = await db.get(ChatSessionState, session_id) or ChatSessionState(session_id=session_id, turns=0)
+        state.slots = result["slots"]
+        state.last_state = result.get("state")
+        state.turns += 1
+        if "offers" in result:
+            state.offers = result["offers"]
+            state.offers_turn = state.turns
+        db.add(state)
     await db.commit()
     await db.refresh(agent_msg)
+    return agent_msg
+
+
+async def _roll_summary(session_id: int):
+    """Fold the messages that left the history window into the session's summary."""
+    async with async_session() as db:
+        state = await db.get(ChatSessionState, session_id)
+        if state is None:
+            return
+        query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+        if state.summary_upto is not None:
+            query = query.where(ChatMessage.id > state.summary_upto)
+        messages = (await db.execute(query.order_by(ChatMessage.id))).scalars().all()
+        count = summarizer.due(len(messages))
+        if not count:
+            return
+        older = messages[:count]
+        try:
+            state.summary = await summarizer.summarize(
+                state.summary, [{"sender": m.sender, "text": m.text} for m in older],
+            )
+        except Exception as e:
+            summarizer.stats["errors"] += 1
+            logger.warning(f"[CHAT] Could not update summary for session {session_id}: {e}")
+            return
+        state.summary_upto = older[-1].id
+        await db.commit()
+
+
+def _after_turn(session_id: int, history: ChatHistory):
+    """Update the rolling summary in the background once enough messages left the window."""
+    if summarizer.due(len(history) + 1):  # + the agent reply just stored
+        task = asyncio.create_task(_roll_summary(session_id))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("", response_model=ChatResponse)
+async def chat(data: ChatRequest, db: AsyncSession = Depends(get_db)):
+    session, user_msg, history, session_state = await _start_turn(data, db)
+
+    result = None
+    try:
+        result = await orchestrator.process(data.message, history, db, session_state)
+        agent_text = result["response"]
+        active_agent = result.get("agent", "unknown")
+        logger.info(f"[CHAT] Response from: {active_agent}")
+    except Exception as e:
+        logger.error(f"[CHAT] Error: {e}", exc_info=True)
+        agent_text = ERROR_REPLY
+
+    agent_msg = await _save_agent_message(db, session.id, agent_text, result)
+    _after_turn(session.id, history)
 
     return ChatResponse(
         session_id=session.id,
-        message=ChatMessageResponse(
-            id=user_msg.id, sender=user_msg.sender, text=user_msg.text,
-            timestamp=user_msg.created_at.strftime("%I:%M %p") if user_msg.created_at else "",
-        ),
-        agent_response=ChatMessageResponse(
-            id=agent_msg.id, sender=agent_msg.sender, text=agent_msg.text,
-            timestamp=agent_msg.created_at.strftime("%I:%M %p") if agent_msg.created_at else "",
-        ),
+        message=_message_response(user_msg),
+        agent_response=_message_response(agent_msg),
     )
 
 
+@router.post("/stream")
+async def chat_stream(data: ChatRequest, db: AsyncSession = Depends(get_db)):
+    """Server-Sent Events variant of ``POST /chat``.
+
+    Events: ``session`` (ids of the stored user message), ``meta`` (state and the
+    agent it is routed to, sent once the turn is classified), ``token`` (response text chunks) and ``done``
+    (the persisted agent message).
+    """
+    session, user_msg, history, session_state = await _start_turn(data, db)
+    session_id = session.id
+
+    async def event_stream():
+        yield _sse("session", {"session_id": session_id, "message": _message_response(user_msg).model_dump()})
+
+        parts = []
+        done = {}
+        # The request-scoped session is released once the response starts, so the
+        # stream owns its own session for the orchestrator and the final write.
+        async with async_session() as stream_db:
+            try:
+                async for event in orchestrator.process_stream(data.message, history, stream_db, session_state):
+                    kind = event.pop("event")
+                    if kind == "token":
+                        parts.append(event["text"])
+                    elif kind == "done":
+                        done = event
+                        continue
+                    yield _sse(kind, event)
+                logger.info(f"[CHAT] Streamed response from: {done.get('agent', 'unknown')}")
+            except Exception as e:
+                logger.error(f"[CHAT] Stream error: {e}", exc_info=True)
+                if not parts:
+                    parts.append(ERROR_REPLY)
+                    yield _sse("token", {"text": ERROR_REPLY})
+
+            turn = {k: done.pop(k) for k in ("state", "slots", "offers") if k in done} if "slots" in done else None
+            agent_msg = await _save_agent_message(stream_db, session_id, "".join(parts), turn)
+        _after_turn(session_id, history)
+        yield _sse("done", {**done, "session_id": session_id, "agent_response": _message_response(agent_msg).model_dump()})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/metrics")
+async def get_chat_metrics():
+    return {
+        **orchestrator.get_stats(),
+        "embedding_cache": get_cache_stats(),
+        "lexical_index": lexical_index.get_stats(),
+        "search_cache": search_cache.get_stats(),
+        "hydration": get_hydration_stats(),
+        "prompting": get_prompting_stats(),
+        "llm": llm_gateway.get_stats(),
+        "index_version": version_watcher.get_stats(),
+        "outbox": await outbox_worker.get_stats(),
+    }
+
+
 @router.get("/sessions")
 async def get_sessions(db: AsyncSession = Depends(get_db)):
     result = await db.execute(
@@ -99,10 +253,4 @@ async def get_session_messages(session_id: int, db: AsyncSession = Depends(get_d
         .order_by(ChatMessage.created_at)
     )
     messages = result.scalars().all()
-    return [
-        ChatMessageResponse(
-            id=msg.id, sender=msg.sender, text=msg.text,
-            timestamp=msg.created_at.strftime("%I:%M %p") if msg.created_at else "",
-        )
-        for msg in messages
-    ]
+    return [_message_response(msg) for msg in messages]
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from backend.rag.cascade import get_job, list_jobs
+
+router = APIRouter(prefix="/reindex", tags=["Reindex"])
+
+
+@router.get("/jobs")
+async def get_reindex_jobs():
+    return await list_jobs()
+
+
+@router.get("/jobs/{job_id}")
+async def get_reindex_job(job_id: str):
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return job
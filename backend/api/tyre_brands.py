@@ -5,7 +5,8 @@ from backend.database import get_db
 from backend.models.tyre_brand import TyreBrand
 from backend.models.tyre import Tyre
 from backend.models.schemas import TyreBrandCreate, TyreBrandUpdate, TyreBrandResponse
-from backend.rag.qdrant_client import upsert_record, delete_record
+from backend.rag.cascade import enqueue_cascade
+from backend.rag.outbox import enqueue, outbox_worker
 
 router = APIRouter(prefix="/tyre-brands", tags=["Tyre Brands"])
 
@@ -50,19 +51,12 @@ async def get_tyre_brand(brand_id: int, db: AsyncSession = Depends(get_db)):
 async def create_tyre_brand(data: TyreBrandCreate, db: AsyncSession = Depends(get_db)):
     brand = TyreBrand(name=data.name, country=data.country)
     db.add(brand)
+    await db.flush()
+    enqueue(db, "tyre_brands", brand.id)
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(brand)
 
-    try:
-        upsert_record(
-            "tyre_brands",
-            brand.id,
-            brand.name,
-            {"id": brand.id, "name": brand.name, "country": brand.country},
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return TyreBrandResponse(id=brand.id, name=brand.name, country=brand.country, tyres_count=0)
 
 
@@ -72,30 +66,30 @@ async def update_tyre_brand(brand_id: int, data: TyreBrandUpdate, db: AsyncSessi
     if not brand:
         raise HTTPException(status_code=404, detail="Tyre brand not found")
 
+    renamed = data.name is not None and data.name != brand.name
     if data.name is not None:
         brand.name = data.name
     if data.country is not None:
         brand.country = data.country
 
+    if renamed:
+        # Dependents embed the brand name; they are queued with the rename so the reindex commits with it
+        reindex_job_id = await enqueue_cascade(db, "tyre_brands", brand.id)
+    else:
+        enqueue(db, "tyre_brands", brand.id)
+        reindex_job_id = None
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(brand)
 
-    try:
-        upsert_record(
-            "tyre_brands",
-            brand.id,
-            brand.name,
-            {"id": brand.id, "name": brand.name, "country": brand.country},
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     tyres_count_result = await db.execute(
         select(func.count(Tyre.id)).where(Tyre.brand_id == brand.id)
     )
     tyres_count = tyres_count_result.scalar() or 0
 
-    return TyreBrandResponse(id=brand.id, name=brand.name, country=brand.country, tyres_count=tyres_count)
+    return TyreBrandResponse(
+        id=brand.id, name=brand.name, country=brand.country, tyres_count=tyres_count, reindex_job_id=reindex_job_id,
+    )
 
 
 @router.delete("/{brand_id}")
@@ -104,12 +98,13 @@ async def delete_tyre_brand(brand_id: int, db: AsyncSession = Depends(get_db)):
     if not brand:
         raise HTTPException(status_code=404, detail="Tyre brand not found")
 
+    enqueue(db, "tyre_brands", brand_id, "delete")
+    # Its tyres go with it (ON DELETE CASCADE)
+    child_ids = (await db.execute(select(Tyre.id).where(Tyre.brand_id == brand_id))).scalars().all()
+    for child_id in child_ids:
+        enqueue(db, "tyres", child_id, "delete")
     await db.delete(brand)
     await db.commit()
-
-    try:
-        delete_record("tyre_brands", brand_id)
-    except Exception as e:
-        print(f"Qdrant delete error: {e}")
+    outbox_worker.notify()
 
     return {"message": "Tyre brand deleted"}
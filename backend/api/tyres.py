@@ -4,8 +4,8 @@ from sqlalchemy import select
 from backend.database import get_db
 from backend.models.tyre import Tyre
 from backend.models.tyre_brand import TyreBrand
-from backend.models.schemas import TyreCreate, TyreUpdate, TyreResponse, StockItemResponse, StockUpdate
-from backend.rag.qdrant_client import upsert_record, delete_record
+from backend.models.schemas import TyreCreate, TyreUpdate, TyreResponse, StockItemResponse, StockUpdate, BulkStockUpdate
+from backend.rag.outbox import enqueue, outbox_worker
 
 router = APIRouter(prefix="/tyres", tags=["Tyres"])
 
@@ -54,6 +54,23 @@ async def get_stock(db: AsyncSession = Depends(get_db)):
     return items
 
 
+@router.put("/stock")
+async def bulk_update_stock(data: BulkStockUpdate, db: AsyncSession = Depends(get_db)):
+    """Set stock for many tyres in one transaction. Stock is read live at
+    search time, so this does not touch the vector store."""
+    stock_by_id = {item.tyre_id: item.stock for item in data.items}
+    result = await db.execute(select(Tyre).where(Tyre.id.in_(stock_by_id)))
+    tyres = result.scalars().all()
+    missing = stock_by_id.keys() - {tyre.id for tyre in tyres}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tyres not found: {sorted(missing)}")
+
+    for tyre in tyres:
+        tyre.stock = stock_by_id[tyre.id]
+    await db.commit()
+    return {"updated": len(tyres)}
+
+
 @router.get("/{tyre_id}", response_model=TyreResponse)
 async def get_tyre(tyre_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(
@@ -85,23 +102,12 @@ async def create_tyre(data: TyreCreate, db: AsyncSession = Depends(get_db)):
         stock=data.stock, min_stock_level=data.min_stock_level,
     )
     db.add(tyre)
+    await db.flush()
+    enqueue(db, "tyres", tyre.id)
     await db.commit()
+    outbox_worker.notify()
     await db.refresh(tyre)
 
-    try:
-        upsert_record(
-            "tyres",
-            tyre.id,
-            f"{brand.name} {tyre.model} {tyre.size}",
-            {
-                "id": tyre.id, "brand_id": brand.id, "brand_name": brand.name,
-                "model": tyre.model, "size": tyre.size, "type": tyre.type,
-                "price": tyre.price, "stock": tyre.stock,
-            },
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return TyreResponse(
         id=tyre.id, brand_id=tyre.brand_id, brand_name=brand.name,
         model=tyre.model, size=tyre.size, type=tyre.type,
@@ -136,25 +142,17 @@ async def update_tyre(tyre_id: int, data: TyreUpdate, db: AsyncSession = Depends
     if data.min_stock_level is not None:
         tyre.min_stock_level = data.min_stock_level
 
+    # Price, cost and stock are read live at search time; only catalog fields reach the vector store
+    indexed = any(v is not None for v in (data.brand_id, data.model, data.size, data.type))
+    if indexed:
+        enqueue(db, "tyres", tyre.id)
     await db.commit()
+    if indexed:
+        outbox_worker.notify()
     await db.refresh(tyre)
 
     brand = await db.get(TyreBrand, tyre.brand_id)
 
-    try:
-        upsert_record(
-            "tyres",
-            tyre.id,
-            f"{brand.name} {tyre.model} {tyre.size}",
-            {
-                "id": tyre.id, "brand_id": brand.id, "brand_name": brand.name,
-                "model": tyre.model, "size": tyre.size, "type": tyre.type,
-                "price": tyre.price, "stock": tyre.stock,
-            },
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return TyreResponse(
         id=tyre.id, brand_id=tyre.brand_id, brand_name=brand.name,
         model=tyre.model, size=tyre.size, type=tyre.type,
@@ -175,20 +173,6 @@ async def update_stock(tyre_id: int, data: StockUpdate, db: AsyncSession = Depen
 
     brand = await db.get(TyreBrand, tyre.brand_id)
 
-    try:
-        upsert_record(
-            "tyres",
-            tyre.id,
-            f"{brand.name} {tyre.model} {tyre.size}",
-            {
-                "id": tyre.id, "brand_id": brand.id, "brand_name": brand.name,
-                "model": tyre.model, "size": tyre.size, "type": tyre.type,
-                "price": tyre.price, "stock": tyre.stock,
-            },
-        )
-    except Exception as e:
-        print(f"Qdrant upsert error: {e}")
-
     return TyreResponse(
         id=tyre.id, brand_id=tyre.brand_id, brand_name=brand.name,
         model=tyre.model, size=tyre.size, type=tyre.type,
@@ -203,12 +187,9 @@ async def delete_tyre(tyre_id: int, db: AsyncSession = Depends(get_db)):
     if not tyre:
         raise HTTPException(status_code=404, detail="Tyre not found")
 
+    enqueue(db, "tyres", tyre_id, "delete")
     await db.delete(tyre)
     await db.commit()
-
-    try:
-        delete_record("tyres", tyre_id)
-    except Exception as e:
-        print(f"Qdrant delete error: {e}")
+    outbox_worker.notify()
 
     return {"message": "Tyre deleted"}
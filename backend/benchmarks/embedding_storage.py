@@ -0,0 +1,147 @@
+"""Recall/latency/memory report for embedding dimension and Qdrant quantization.
+
+Embeds the real catalog (Postgres) and a set of typical customer queries once
+at ``EMBEDDING_DIMENSION``, then derives the smaller sizes by truncating and
+re-normalising (gemini-embedding-001 is Matryoshka-trained, so this matches
+what ``output_dimensionality`` returns). Every (dimension, quantization,
+rescore) combination gets throwaway collections; recall@k is measured against
+exact float32 search at the full dimension. Needs Postgres, Qdrant and a
+Gemini key (embeddings go through the cache, so reruns are free):
+
+    python -m backend.benchmarks.embedding_storage --dims 3072,1536,768 --limit 5
+    python -m backend.benchmarks.embedding_storage --queries-file my_queries.txt
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from qdrant_client.models import CollectionStatus, Distance, OptimizersConfigDiff, PointStruct, VectorParams
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.config import get_settings
+from backend.rag.documents import load_documents
+from backend.rag.embeddings import get_embeddings, get_query_embeddings
+from backend.rag.qdrant_client import get_qdrant_client, quantization_config, search_params
+
+settings = get_settings()
+PREFIX = "bench_storage_"
+
+# What customers actually type in the chat
+QUERIES = [
+    "toyota corolla 2020", "Toyota Camry", "honda cr-v", "CR-V 2019", "hyundai tucson",
+    "kia sportage 2021", "nissan x-trail", "bmw 3 series", "mercedes c class", "vw golf",
+    "225/45R17", "205/55 R16", "265/65r17", "195/65R15", "235/55R18",
+    "pirelli", "Michelin Pilot Sport", "bridgestone", "continental", "goodyear eagle",
+    "winter tyres for my rav4", "cheap tyres for a civic", "all season 215/60R16",
+    "performance tyres audi a4", "tyres for land cruiser",
+]
+
+# quantization -> rescore settings to try
+QUANTIZATIONS = {"none": [False], "scalar": [False, True], "binary": [False, True]}
+
+
+def _truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    cut = vectors[:, :dim]
+    return cut / np.maximum(np.linalg.norm(cut, axis=1, keepdims=True), 1e-12)
+
+
+def _bytes_per_point(dim: int, quantization: str) -> dict:
+    ram = {"none": dim * 4, "scalar": dim, "binary": dim // 8}[quantization]
+    return {"ram_bytes": ram, "disk_bytes": dim * 4 if quantization != "none" else 0}
+
+
+def _create(client, name: str, dim: int, quantization: str, ids: list[int], points: np.ndarray):
+    # A tiny indexing threshold makes Qdrant build HNSW and the quantized copy
+    # even for our small collections, as it would for a large catalog
+    client.create_collection(
+        name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=quantization != "none"),
+        quantization_config=quantization_config(quantization),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=1),
+    )
+    for start in range(0, len(ids), 256):
+        client.upsert(name, wait=True, points=[
+            PointStruct(id=point_id, vector=vector.tolist())
+            for point_id, vector in zip(ids[start:start + 256], points[start:start + 256])
+        ])
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        time.sleep(0.2)
+
+
+def load(queries_file: str | None) -> tuple[dict, np.ndarray]:
+    engine = create_engine(settings.DATABASE_URL_SYNC)
+    with Session(engine) as db:
+        documents = load_documents(db)
+    engine.dispose()
+
+    queries = QUERIES
+    if queries_file:
+        with open(queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    catalog = {}
+    for collection_name, docs in documents.items():
+        vectors = np.asarray(get_embeddings([d["text"] for d in docs]), dtype=np.float32)
+        catalog[collection_name] = ([d["id"] for d in docs], vectors)
+    return catalog, np.asarray(get_query_embeddings(queries), dtype=np.float32)
+
+
+def run(catalog: dict, query_vectors: np.ndarray, dims: list[int], limit: int) -> list[dict]:
+    client = get_qdrant_client()
+    rows = []
+    for collection_name, (ids, vectors) in catalog.items():
+        if not ids:
+            continue
+        full = _truncate(vectors, vectors.shape[1])
+        queries_full = _truncate(query_vectors, query_vectors.shape[1])
+        truth = [[ids[i] for i in np.argsort(-(full @ q))[:limit]] for q in queries_full]
+
+        for dim in dims:
+            points = _truncate(vectors, dim)
+            queries = _truncate(query_vectors, dim)
+            for quantization, rescores in QUANTIZATIONS.items():
+                name = f"{PREFIX}{collection_name}_{dim}_{quantization}"
+                if client.collection_exists(name):
+                    client.delete_collection(name)
+                try:
+                    _create(client, name, dim, quantization, ids, points)
+                    for rescore in rescores:
+                        samples, recalls = [], []
+                        for q, expected in zip(queries, truth):
+                            t0 = time.perf_counter()
+                            hits = client.search(name, query_vector=q.tolist(), limit=limit,
+                                                 search_params=search_params(quantization, rescore))
+                            samples.append(time.perf_counter() - t0)
+                            found = {h.id for h in hits}
+                            recalls.append(len(found & set(expected)) / len(expected))
+                        samples.sort()
+                        rows.append({
+                            "collection": collection_name, "dim": dim,
+                            "quantization": quantization + (" +rescore" if rescore else ""),
+                            "recall": round(statistics.mean(recalls), 3),
+                            "p50_ms": round(statistics.median(samples) * 1000, 2),
+                            "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 2),
+                            **_bytes_per_point(dim, quantization),
+                        })
+                finally:
+                    client.delete_collection(name)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", default="3072,1536,768")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--queries-file")
+    args = parser.parse_args()
+
+    dims = [int(d) for d in args.dims.split(",") if int(d) <= settings.EMBEDDING_DIMENSION]
+    catalog, query_vectors = load(args.queries_file)
+    rows = run(catalog, query_vectors, dims, args.limit)
+
+    print(f"\nrecall@{args.limit} vs exact float32 at {settings.EMBEDDING_DIMENSION} dims\n")
+    print(f"{'collection':<12} {'dim':>5} {'quantization':<16} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'RAM B/pt':>9} {'disk B/pt':>9}")
+    for r in rows:
+        print(f"{r['collection']:<12} {r['dim']:>5} {r['quantization']:<16} {r['recall']:>7} {r['p50_ms']:>7} "
+              f"{r['p95_ms']:>7} {r['ram_bytes']:>9} {r['disk_bytes']:>9}")
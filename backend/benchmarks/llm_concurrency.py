@@ -0,0 +1,101 @@
+"""Concurrency benchmark: sync `.invoke` on the event loop vs the non-blocking LLM path.
+
+Uses a fake chat model with a fixed latency so it runs without a Gemini key:
+
+    python -m backend.benchmarks.llm_concurrency --turns 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain.schema import HumanMessage
+from backend.agents.llm import ainvoke_llm
+from backend.config import get_settings
+
+settings = get_settings()
+
+
+class SlowChatModel(BaseChatModel):
+    """Stands in for Gemini: every call takes `latency` seconds."""
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+async def _turn_blocking(llm):
+    # What the agents used to do: classify, then respond, both with sync .invoke
+    llm.invoke([HumanMessage(content="classify")])
+    llm.invoke([HumanMessage(content="respond")])
+
+
+async def _turn_async(llm):
+    await ainvoke_llm(llm, [HumanMessage(content="classify")])
+    await ainvoke_llm(llm, [HumanMessage(content="respond")])
+
+
+async def _crud_probe(stop: asyncio.Event, samples: list[float]):
+    """Simulates GET /api/tyres: a tiny coroutine that should answer in ~0 ms."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+
+async def _run(label: str, turn, llm, turns: int) -> dict:
+    stop = asyncio.Event()
+    samples: list[float] = []
+    probe = asyncio.create_task(_crud_probe(stop, samples))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[turn(llm) for _ in range(turns)])
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await probe
+    return {
+        "mode": label,
+        "turns": turns,
+        "wall_s": round(wall, 2),
+        "turns_per_s": round(turns / wall, 2),
+        "crud_stall_p50_ms": round(statistics.median(samples) * 1000, 1) if samples else None,
+        "crud_stall_max_ms": round(max(samples) * 1000, 1) if samples else None,
+    }
+
+
+async def main(turns: int, latency: float):
+    llm = SlowChatModel(latency=latency)
+    results = [await _run("sync .invoke (before)", _turn_blocking, llm, turns)]
+
+    settings.LLM_ASYNC_MODE = "native"
+    results.append(await _run("native async (after)", _turn_async, llm, turns))
+
+    settings.LLM_ASYNC_MODE = "executor"
+    results.append(await _run(f"executor x{settings.BLOCKING_EXECUTOR_WORKERS} (fallback)", _turn_async, llm, turns))
+
+    print(f"{turns} concurrent chat turns, 2 LLM calls each, {latency}s per call\n")
+    print(f"{'mode':<28} {'wall s':>8} {'turns/s':>8} {'CRUD p50 ms':>12} {'CRUD max ms':>12}")
+    for r in results:
+        print(f"{r['mode']:<28} {r['wall_s']:>8} {r['turns_per_s']:>8} "
+              f"{r['crud_stall_p50_ms']!s:>12} {r['crud_stall_max_ms']!s:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.latency))
@@ -0,0 +1,133 @@
+"""Recall and latency of the in-process index (float16 / int8) against exact search.
+
+Against the live catalog (build the local index first with
+``python -m backend.rag.local_index build``), ground truth is Qdrant exact
+search and Qdrant's default HNSW search is timed alongside:
+
+    python -m backend.benchmarks.local_index --queries 200
+
+Without Qdrant, on random clustered vectors with float32 brute force as ground
+truth:
+
+    python -m backend.benchmarks.local_index --synthetic --points 5000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import numpy as np
+from backend.config import get_settings
+from backend.rag.local_index import LocalVectorIndex, get_local_index
+
+settings = get_settings()
+
+
+def _summary(label: str, samples: list[float], recalls: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "mode": label,
+        "recall": round(statistics.mean(recalls), 4) if recalls else None,
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def _recall(found: list, truth: list) -> float:
+    return len(set(found) & set(truth)) / len(truth) if truth else 1.0
+
+
+def _noisy_queries(vectors: np.ndarray, count: int, rng) -> np.ndarray:
+    """Queries near stored vectors, like a user typing a catalog name slightly off."""
+    picks = vectors[rng.integers(0, len(vectors), count)].astype(np.float32)
+    return picks + rng.normal(0, 0.02, picks.shape).astype(np.float32)
+
+
+def _time_local(index: LocalVectorIndex, queries: np.ndarray, truth: list[list], limit: int, label: str) -> dict:
+    samples, recalls = [], []
+    for query, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        hits = index.search(query, limit)
+        samples.append(time.perf_counter() - t0)
+        recalls.append(_recall([h["id"] for h in hits], expected))
+    return _summary(label, samples, recalls)
+
+
+def bench_synthetic(points: int, dim: int, queries: int, limit: int) -> list[dict]:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, points // 20), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), points)] + rng.normal(0, 0.3, (points, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = list(range(points))
+    payloads = [{"id": i} for i in ids]
+    query_vectors = _noisy_queries(vectors, queries, rng)
+
+    truth, samples = [], []
+    for query in query_vectors:
+        t0 = time.perf_counter()
+        scores = vectors @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores)[:limit]
+        samples.append(time.perf_counter() - t0)
+        truth.append(top.tolist())
+    results = [_summary("float32 brute force (truth)", samples, [1.0])]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for dtype in ("float16", "int8"):
+            index = LocalVectorIndex(f"bench_{dtype}", directory)
+            index.write(ids, vectors, payloads, dtype)
+            results.append(_time_local(index, query_vectors, truth, limit, f"local {dtype}"))
+    return results
+
+
+def bench_qdrant(queries: int, limit: int) -> list[dict]:
+    from qdrant_client.models import SearchParams
+    from backend.rag.qdrant_client import COLLECTIONS, get_qdrant_client
+
+    client = get_qdrant_client()
+    rng = np.random.default_rng(0)
+    results = []
+    for collection_name in COLLECTIONS:
+        index = get_local_index(collection_name)
+        if not len(index):
+            print(f"{collection_name}: local index is empty, skipping")
+            continue
+        stored = np.stack(list(index.vectors_by_id().values())).astype(np.float32)
+        query_vectors = _noisy_queries(stored, queries, rng)
+
+        truth, exact_samples, hnsw_samples, hnsw_recalls = [], [], [], []
+        for query in query_vectors:
+            t0 = time.perf_counter()
+            hits = client.search(collection_name, query_vector=query.tolist(), limit=limit,
+                                 search_params=SearchParams(exact=True))
+            exact_samples.append(time.perf_counter() - t0)
+            expected = [h.id for h in hits]
+            truth.append(expected)
+
+            t0 = time.perf_counter()
+            hits = client.search(collection_name, query_vector=query.tolist(), limit=limit)
+            hnsw_samples.append(time.perf_counter() - t0)
+            hnsw_recalls.append(_recall([h.id for h in hits], expected))
+
+        results.append(_summary(f"{collection_name}: qdrant exact (truth)", exact_samples, [1.0]))
+        results.append(_summary(f"{collection_name}: qdrant hnsw", hnsw_samples, hnsw_recalls))
+        results.append(_time_local(index, query_vectors, truth, limit, f"{collection_name}: local {index.dtype}"))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        print(f"{args.points} random vectors of dim {args.dim}, {args.queries} queries, top-{args.limit}\n")
+        rows = bench_synthetic(args.points, args.dim, args.queries, args.limit)
+    else:
+        rows = bench_qdrant(args.queries, args.limit)
+
+    print(f"{'mode':<40} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in rows:
+        print(f"{r['mode']:<40} {r['recall']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8}")
@@ -0,0 +1,140 @@
+"""Qdrant transport benchmark on our search workload: one chat turn = one search
+in each of the four collections.
+
+Compares the old fresh-client-per-call REST path with the pooled sync client,
+the async client, and gRPC (port 6334, as exposed by docker-compose). Uses
+random vectors in throwaway collections, so no Gemini key is needed:
+
+    python -m backend.benchmarks.qdrant_transports --points 2000 --turns 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, PointStruct, SearchRequest, VectorParams
+from backend.config import get_settings
+from backend.rag.qdrant_client import COLLECTIONS
+
+settings = get_settings()
+PREFIX = "bench_transport_"
+
+
+def _vector(dim: int) -> list[float]:
+    return [random.uniform(-1, 1) for _ in range(dim)]
+
+
+def _client(prefer_grpc: bool) -> QdrantClient:
+    return QdrantClient(
+        host=settings.QDRANT_HOST, port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT, prefer_grpc=prefer_grpc,
+    )
+
+
+def _async_client(prefer_grpc: bool) -> AsyncQdrantClient:
+    return AsyncQdrantClient(
+        host=settings.QDRANT_HOST, port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT, prefer_grpc=prefer_grpc,
+    )
+
+
+def setup(points: int, dim: int):
+    client = _client(prefer_grpc=False)
+    for name in COLLECTIONS:
+        collection = PREFIX + name
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(collection, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+        for start in range(0, points, 256):
+            client.upsert(collection, points=[
+                PointStruct(id=i, vector=_vector(dim), payload={"id": i})
+                for i in range(start, min(start + 256, points))
+            ])
+    client.close()
+
+
+def teardown():
+    client = _client(prefer_grpc=False)
+    for name in COLLECTIONS:
+        client.delete_collection(PREFIX + name)
+    client.close()
+
+
+def _summary(label: str, samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "mode": label,
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 2),
+        "turns_per_s": round(len(samples) / sum(samples), 1),
+    }
+
+
+def bench_fresh_client(queries: list[list[float]]) -> dict:
+    """Baseline: a new REST client per collection search, searched one after another."""
+    samples = []
+    for vector in queries:
+        start = time.perf_counter()
+        for name in COLLECTIONS:
+            client = _client(prefer_grpc=False)
+            client.search(PREFIX + name, query_vector=vector, limit=5)
+            client.close()
+        samples.append(time.perf_counter() - start)
+    return _summary("fresh REST client per call", samples)
+
+
+def bench_pooled(queries: list[list[float]], prefer_grpc: bool) -> dict:
+    client = _client(prefer_grpc)
+    samples = []
+    for vector in queries:
+        start = time.perf_counter()
+        for name in COLLECTIONS:
+            client.search_batch(PREFIX + name, requests=[SearchRequest(vector=vector, limit=5, with_payload=True)])
+        samples.append(time.perf_counter() - start)
+    client.close()
+    return _summary(f"pooled sync {'gRPC' if prefer_grpc else 'REST'}", samples)
+
+
+async def bench_async(queries: list[list[float]], prefer_grpc: bool) -> dict:
+    client = _async_client(prefer_grpc)
+    samples = []
+    for vector in queries:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client.search_batch(PREFIX + name, requests=[SearchRequest(vector=vector, limit=5, with_payload=True)])
+            for name in COLLECTIONS
+        ])
+        samples.append(time.perf_counter() - start)
+    await client.close()
+    return _summary(f"async {'gRPC' if prefer_grpc else 'REST'} (4 concurrent)", samples)
+
+
+def main(points: int, turns: int, dim: int):
+    print(f"Seeding {len(COLLECTIONS)} collections x {points} points of dim {dim}...")
+    setup(points, dim)
+    queries = [_vector(dim) for _ in range(turns)]
+    try:
+        results = [
+            bench_fresh_client(queries),
+            bench_pooled(queries, prefer_grpc=False),
+            bench_pooled(queries, prefer_grpc=True),
+            asyncio.run(bench_async(queries, prefer_grpc=False)),
+            asyncio.run(bench_async(queries, prefer_grpc=True)),
+        ]
+    finally:
+        teardown()
+
+    print(f"\n{turns} turns, each searching {len(COLLECTIONS)} collections\n")
+    print(f"{'mode':<34} {'p50 ms':>8} {'p95 ms':>8} {'turns/s':>8}")
+    for r in results:
+        print(f"{r['mode']:<34} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['turns_per_s']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIMENSION)
+    args = parser.parse_args()
+    main(args.points, args.turns, args.dim)
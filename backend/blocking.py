@@ -0,0 +1,27 @@
+"""Bounded thread pool for anything that still has to block: sync LLM clients
+when native async is unavailable, Gemini embeddings, the sync Qdrant client and
+embedding-cache disk I/O. Shared by the agents and the retrieval layer."""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from backend.config import get_settings
+
+settings = get_settings()
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="blocking-io",
+)
+
+
+def use_as_default_executor():
+    """Make the bounded pool the running loop's default executor, so library code that
+    calls ``run_in_executor(None, ...)`` (LangChain's sync fallbacks, ``asyncio.to_thread``)
+    shares the same ``BLOCKING_EXECUTOR_WORKERS`` limit."""
+    asyncio.get_running_loop().set_default_executor(_executor)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
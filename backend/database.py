@@ -20,6 +20,15 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def _create_missing_indexes(conn):
+    # create_all skips tables that already exist, so indexes added to a model
+    # later would never reach existing databases
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
@@ -1,17 +1,38 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from backend.blocking import use_as_default_executor
 from backend.database import init_db
+from backend.rag.qdrant_client import COLLECTIONS, get_async_qdrant_client, close_qdrant_clients, use_local_backend
+from backend.rag.local_index import get_local_index
+from backend.rag.outbox import outbox_worker
+from backend.rag.versions import version_watcher
 from backend.config import get_settings
-from backend.api import car_brands, car_models, tyre_brands, tyres, orders, chat, dashboard
+from backend.api import car_brands, car_models, tyre_brands, tyres, orders, chat, dashboard, reindex
 
 settings = get_settings()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    use_as_default_executor()
     await init_db()
+    if use_local_backend():
+        for collection_name in COLLECTIONS:
+            get_local_index(collection_name).load()  # rather than on the first chat turn
+    else:
+        get_async_qdrant_client()
+        try:
+            await version_watcher.refresh()  # before anything embeds or searches
+        except Exception as e:
+            print(f"Could not resolve the live index version, using the configured one: {e}")
+        version_watcher.start()
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
     yield
+    await outbox_worker.stop()
+    await version_watcher.stop()
+    await close_qdrant_clients()
 
 
 app = FastAPI(
@@ -42,6 +63,7 @@ app.include_router(tyre_brands.router, prefix="/api")
 app.include_router(tyres.router, prefix="/api")
 app.include_router(orders.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
+app.include_router(reindex.router, prefix="/api")
 
 
 @app.get("/api/health")
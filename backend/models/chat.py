@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.database import Base
@@ -13,6 +13,7 @@ class ChatSession(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
+    state = relationship("ChatSessionState", back_populates="session", uselist=False, cascade="all, delete-orphan")
 
 
 class ChatMessage(Base):
@@ -25,3 +26,26 @@ class ChatMessage(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     session = relationship("ChatSession", back_populates="messages")
+
+    # Each turn reads only the newest messages of one session
+    __table_args__ = (Index("ix_chat_messages_session_created", "session_id", "created_at"),)
+
+
+class ChatSessionState(Base):
+    """Slots known so far in a conversation (see ``backend.agents.slots``), updated after each turn."""
+    __tablename__ = "chat_session_states"
+
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), primary_key=True)
+    slots = Column(JSON, nullable=False, default=dict)
+    # Tyres last offered, numbered as shown: [{"n", "tyre_id", "brand", "model", "size", "price"}]
+    offers = Column(JSON, nullable=True)
+    # Value of ``turns`` when ``offers`` was shown; bare "2" / "the first one" only pick on the next turn
+    offers_turn = Column(Integer, nullable=True)
+    last_state = Column(String(30), nullable=True)
+    # Rolling summary of the messages up to and including summary_upto (a chat_messages id)
+    summary = Column(Text, nullable=True)
+    summary_upto = Column(Integer, nullable=True)
+    turns = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    session = relationship("ChatSession", back_populates="state")
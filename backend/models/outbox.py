@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from backend.database import Base
+
+
+class VectorOutbox(Base):
+    """Pending vector-store writes, added in the same transaction as the catalog change."""
+    __tablename__ = "vector_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection = Column(String(50), nullable=False)
+    record_id = Column(Integer, nullable=False)
+    operation = Column(String(20), nullable=False, default="upsert")  # 'upsert' or 'delete'
+    status = Column(String(20), nullable=False, default="pending")  # 'pending', 'processing', 'done' or 'dead'
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # For 'processing' rows: when the claim's lease runs out
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    # Cascade reindex job the row belongs to (backend/rag/cascade.py)
+    job_id = Column(String(32), nullable=True, index=True)
+
+    __table_args__ = (Index("ix_vector_outbox_pending", "status", "next_attempt_at"),)
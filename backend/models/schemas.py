@@ -17,6 +17,8 @@ class CarBrandResponse(BaseModel):
     name: str
     country: str
     models_count: int = 0
+    # Set when a rename started a cascade reindex (GET /api/reindex/jobs/{id})
+    reindex_job_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -61,6 +63,8 @@ class TyreBrandResponse(BaseModel):
     name: str
     country: str
     tyres_count: int = 0
+    # Set when a rename started a cascade reindex (GET /api/reindex/jobs/{id})
+    reindex_job_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -186,3 +190,12 @@ class StockItemResponse(BaseModel):
 
 class StockUpdate(BaseModel):
     stock: int
+
+
+class BulkStockItem(BaseModel):
+    tyre_id: int
+    stock: int
+
+
+class BulkStockUpdate(BaseModel):
+    items: list[BulkStockItem]
@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from backend.database import Base
+
+
+class VectorIndexVersion(Base):
+    """Blue/green embedding index versions built by ``python -m backend.rag.reindex``."""
+    __tablename__ = "vector_index_versions"
+
+    tag = Column(String(50), primary_key=True)
+    embedding_model = Column(String(100), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    # 'building', 'ready', 'validated', 'live', 'retired' or 'failed'
+    status = Column(String(20), nullable=False, default="building")
+    # Version that was live before this one was switched in ("" = unversioned collections)
+    previous_tag = Column(String(50), nullable=True)
+    documents = Column(Integer, nullable=True)
+    validation = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    switched_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class VectorIndexFollower(Base):
+    """The index version each running API process has activated, reported on every
+    ``VECTOR_VERSION_POLL_SECONDS`` poll so ``reindex switch`` can wait for all of them."""
+    __tablename__ = "vector_index_followers"
+
+    # "{hostname}:{pid}"
+    process_id = Column(String(100), primary_key=True)
+    tag = Column(String(50), nullable=False)
+    seen_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class VectorCollectionVersion(Base):
+    """Write counter per collection, shared by every process that writes to or
+    caches searches of the vector store (see ``backend.rag.search_cache``)."""
+    __tablename__ = "vector_collection_versions"
+
+    collection = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,130 @@
+"""Cascade reindex of dependent points when a brand is renamed.
+
+Car-model and tyre documents embed their brand name, so renaming a brand makes
+every child point stale. The rename handler calls ``enqueue_cascade`` before
+committing: the brand and all of its children go into the outbox in the same
+transaction, tagged with one job id. The work therefore commits (or rolls back)
+with the rename and survives crashes; the outbox worker re-embeds the records
+in batches and retries failures.
+
+A job is that group of outbox rows, and its progress is read from their status
+(``GET /api/reindex/jobs``) for as long as the rows are kept
+(``OUTBOX_RETENTION_HOURS``).
+"""
+import logging
+import uuid
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import async_session
+from backend.models.car_model import CarModel
+from backend.models.outbox import VectorOutbox
+from backend.models.tyre import Tyre
+from backend.rag.outbox import enqueue
+
+logger = logging.getLogger(__name__)
+
+# brand collection → (dependent collection, dependent model)
+DEPENDENTS = {
+    "car_brands": ("car_models", CarModel),
+    "tyre_brands": ("tyres", Tyre),
+}
+
+# Most recent jobs listed by GET /api/reindex/jobs
+MAX_LISTED_JOBS = 50
+
+
+async def enqueue_cascade(db: AsyncSession, brand_collection: str, brand_id: int) -> str:
+    """Queue a renamed brand and its dependents in the caller's transaction. Returns the job id."""
+    collection, model = DEPENDENTS[brand_collection]
+    job_id = uuid.uuid4().hex[:12]
+    enqueue(db, brand_collection, brand_id, job_id=job_id)
+    result = await db.execute(select(model.id).where(model.brand_id == brand_id).order_by(model.id))
+    dependent_ids = result.scalars().all()
+    for record_id in dependent_ids:
+        enqueue(db, collection, record_id, job_id=job_id)
+    logger.info(f"[CASCADE] Job {job_id}: queued {len(dependent_ids)} {collection} of {brand_collection}/{brand_id}")
+    return job_id
+
+
+def _job(job_id: str, groups: list) -> dict:
+    """A job's progress from its outbox rows grouped by (collection, status)."""
+    job = {
+        "id": job_id,
+        "brand_collection": None,
+        "brand_id": None,
+        "collection": None,
+        "status": "done",
+        "total": 0,
+        "done": 0,
+        "failed": 0,
+        "pending": 0,
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+    }
+    waiting = 0
+    for collection, status, count, brand_id, created_at, processed_at, error in groups:
+        if collection in DEPENDENTS:
+            job["brand_collection"], job["brand_id"] = collection, brand_id
+            job["collection"] = DEPENDENTS[collection][0]
+        else:
+            job["total"] += count
+            if status == "done":
+                job["done"] += count
+            elif status == "dead":
+                job["failed"] += count
+            else:
+                job["pending"] += count
+        if status in ("pending", "processing"):
+            waiting += count
+        if status == "dead" or (status == "pending" and error):
+            job["error"] = error
+        if created_at and (job["started_at"] is None or created_at < job["started_at"]):
+            job["started_at"] = created_at
+        if processed_at and (job["finished_at"] is None or processed_at > job["finished_at"]):
+            job["finished_at"] = processed_at
+
+    if waiting:
+        job["status"], job["finished_at"] = "running", None
+    elif job["failed"]:
+        job["status"] = "partial"
+    return job
+
+
+def _progress_query():
+    return select(
+        VectorOutbox.job_id,
+        VectorOutbox.collection,
+        VectorOutbox.status,
+        func.count(VectorOutbox.id),
+        func.min(VectorOutbox.record_id),
+        func.min(VectorOutbox.created_at),
+        func.max(VectorOutbox.processed_at),
+        func.max(VectorOutbox.last_error),
+    ).group_by(VectorOutbox.job_id, VectorOutbox.collection, VectorOutbox.status)
+
+
+async def get_job(job_id: str) -> dict | None:
+    async with async_session() as db:
+        rows = (await db.execute(_progress_query().where(VectorOutbox.job_id == job_id))).all()
+    return _job(job_id, [row[1:] for row in rows]) if rows else None
+
+
+async def list_jobs() -> list[dict]:
+    """The most recent jobs, newest first."""
+    async with async_session() as db:
+        recent = (
+            select(VectorOutbox.job_id)
+            .where(VectorOutbox.job_id.is_not(None))
+            .group_by(VectorOutbox.job_id)
+            .order_by(func.max(VectorOutbox.id).desc())
+            .limit(MAX_LISTED_JOBS)
+        )
+        job_ids = (await db.execute(recent)).scalars().all()
+        if not job_ids:
+            return []
+        rows = (await db.execute(_progress_query().where(VectorOutbox.job_id.in_(job_ids)))).all()
+    groups: dict[str, list] = {job_id: [] for job_id in job_ids}
+    for row in rows:
+        groups[row[0]].append(row[1:])
+    return [_job(job_id, groups[job_id]) for job_id in job_ids]
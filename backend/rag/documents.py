@@ -0,0 +1,85 @@
+"""What gets embedded for each catalog record, and the payload stored with it.
+
+Every writer to Qdrant (seed, CRUD APIs, indexer) builds points from these
+helpers so the embedded text and payload shape stay identical everywhere.
+A document is ``{"id": ..., "text": ..., "payload": {...}}``.
+
+Fast-changing fields (tyre stock and price) are deliberately left out of the
+payloads; search results get them from Postgres (``backend.rag.hydration``),
+so sales and restocks never touch the vector store.
+"""
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+
+def car_brand_document(id: int, name: str, country: str) -> dict:
+    return {
+        "id": id,
+        "text": name,
+        "payload": {"id": id, "name": name, "country": country},
+    }
+
+
+def car_model_document(id: int, brand_id: int, brand_name: str, name: str, year: int, tyre_sizes: list[str]) -> dict:
+    return {
+        "id": id,
+        "text": f"{brand_name} {name} {year}",
+        "payload": {
+            "id": id, "brand_id": brand_id, "brand_name": brand_name,
+            "name": name, "year": year,
+            "tyre_sizes": list(tyre_sizes) if tyre_sizes else [],
+        },
+    }
+
+
+def tyre_brand_document(id: int, name: str, country: str) -> dict:
+    return {
+        "id": id,
+        "text": name,
+        "payload": {"id": id, "name": name, "country": country},
+    }
+
+
+def tyre_document(id: int, brand_id: int, brand_name: str, model: str, size: str, type: str) -> dict:
+    return {
+        "id": id,
+        "text": f"{brand_name} {model} {size}",
+        "payload": {
+            "id": id, "brand_id": brand_id, "brand_name": brand_name,
+            "model": model, "size": size, "type": type,
+        },
+    }
+
+
+COLLECTION_QUERIES = {
+    "car_brands": ("SELECT id, name, country FROM car_brands", "id", car_brand_document),
+    "car_models": (
+        "SELECT cm.id, cm.brand_id, cb.name as brand_name, cm.name, cm.year, cm.tyre_sizes "
+        "FROM car_models cm JOIN car_brands cb ON cm.brand_id = cb.id",
+        "cm.id", car_model_document,
+    ),
+    "tyre_brands": ("SELECT id, name, country FROM tyre_brands", "id", tyre_brand_document),
+    "tyres": (
+        "SELECT t.id, t.brand_id, tb.name as brand_name, t.model, t.size, t.type "
+        "FROM tyres t JOIN tyre_brands tb ON t.brand_id = tb.id",
+        "t.id", tyre_document,
+    ),
+}
+
+
+def load_collection_documents(db: Session, collection_name: str, ids: list[int] = None) -> list[dict]:
+    """Documents for one collection, optionally only the given record ids (sync session)."""
+    sql, id_column, build = COLLECTION_QUERIES[collection_name]
+    if ids is None:
+        rows = db.execute(text(sql)).fetchall()
+    else:
+        if not ids:
+            return []
+        query = text(f"{sql} WHERE {id_column} IN :ids").bindparams(bindparam("ids", expanding=True))
+        rows = db.execute(query, {"ids": list(ids)}).fetchall()
+    return [build(*row) for row in rows]
+
+
+def load_documents(db: Session) -> dict[str, list[dict]]:
+    """Build documents for the whole catalog from Postgres (sync session)."""
+    return {name: load_collection_documents(db, name) for name in COLLECTION_QUERIES}
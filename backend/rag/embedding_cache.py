@@ -0,0 +1,247 @@
+"""Two-tier cache for Gemini embeddings.
+
+Memory tier: an LRU of float32 arrays. Disk tier: one append-only file per
+vector dimension made of fixed-size records (20-byte SHA-1 key followed by
+``dim`` little-endian float32 values), read through ``numpy.memmap``. The file
+is shared by the API and ``seed.py``, so writers take an ``flock`` and readers
+pick up rows appended by other processes.
+
+``_lock`` only guards the in-memory LRU and the key → row index; memmap reads,
+index rebuilds and writes (including waiting for the ``flock`` and compaction)
+happen outside it, so a slow writer doesn't stall readers.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from backend.rag.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 20
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def make_key(model: str, task_type: str, text: str) -> bytes:
+    return hashlib.sha1(f"{model}\x00{task_type}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, dimension: int, memory_entries: int = 2048, directory: str = "", disk_max_mb: int = 256):
+        self.dimension = dimension
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        # One writer per process at a time; the flock orders writers across processes
+        self._write_lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "disk_errors": 0,
+        }
+
+        self._dtype = np.dtype([("key", "u1", (KEY_BYTES,)), ("vec", "<f4", (dimension,))])
+        self._path = None
+        self._max_rows = 0
+        self._index: dict[bytes, int] = {}
+        self._rows = 0
+        self._inode = None
+        self._mmap = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self._path = os.path.join(directory, f"embeddings-{dimension}.bin")
+                self._max_rows = max(1, disk_max_mb * 1024 * 1024 // self._dtype.itemsize)
+                with self._file_lock():
+                    self._refresh()
+                logger.info(f"[EMBEDDING CACHE] Disk tier at {self._path} ({self._rows} vectors)")
+            except OSError as e:
+                logger.warning(f"[EMBEDDING CACHE] Disk tier disabled: {e}")
+                self._path = None
+
+    @property
+    def on_disk(self) -> bool:
+        return self._path is not None
+
+    def get(self, key: bytes) -> list[float] | None:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vector.tolist()
+
+        vector = self._disk_get(key)
+        with self._lock:
+            if vector is None:
+                self.stats["misses"] += 1
+                return None
+            self._remember(key, vector)
+            self.stats["disk_hits"] += 1
+        return vector.tolist()
+
+    def put(self, key: bytes, vector: list[float]):
+        if len(vector) != self.dimension:
+            return
+        array = np.asarray(vector, dtype="<f4")
+        with self._lock:
+            self._remember(key, array)
+        self._disk_put(key, array)
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._rows,
+            "disk_bytes": self._rows * self._dtype.itemsize,
+        }
+
+    # ---- Memory tier ----
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    # ---- Disk tier ----
+
+    def _file_lock(self):
+        return FileLock(self._path + ".lock")
+
+    def _disk_get(self, key: bytes) -> np.ndarray | None:
+        if not self._path:
+            return None
+        try:
+            # The second pass covers a file compacted underneath us
+            for _ in range(2):
+                with self._lock:
+                    row, mmap = self._index.get(key), self._mmap
+                if row is None:
+                    # Another process (e.g. seed.py) may have appended it
+                    self._refresh()
+                    with self._lock:
+                        row, mmap = self._index.get(key), self._mmap
+                    if row is None:
+                        return None
+                if mmap is None or row >= len(mmap):
+                    mmap = self._open_map()
+                    if mmap is None or row >= len(mmap):
+                        continue
+                record = mmap[row]
+                if bytes(record["key"]) == key:
+                    return np.array(record["vec"])
+                self._refresh(force=True)
+            return None
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self.stats["disk_errors"] += 1
+            logger.warning(f"[EMBEDDING CACHE] Disk read failed: {e}")
+            return None
+
+    def _disk_put(self, key: bytes, vector: np.ndarray):
+        if not self._path:
+            return
+        try:
+            with self._write_lock, self._file_lock():
+                self._refresh()
+                with self._lock:
+                    if key in self._index:
+                        return
+                    rows = self._rows
+                if os.path.exists(self._path) and os.path.getsize(self._path) != rows * self._dtype.itemsize:
+                    # Drop a partial record left by a crashed writer so rows stay aligned
+                    os.truncate(self._path, rows * self._dtype.itemsize)
+                if rows >= self._max_rows:
+                    self._compact(rows)
+                record = np.zeros(1, dtype=self._dtype)
+                record["key"][0] = np.frombuffer(key, dtype="u1")
+                record["vec"][0] = vector
+                with open(self._path, "ab") as f:
+                    f.write(record.tobytes())
+                self._refresh()
+        except OSError as e:
+            with self._lock:
+                self.stats["disk_errors"] += 1
+            logger.warning(f"[EMBEDDING CACHE] Disk write failed: {e}")
+
+    def _open_map(self) -> np.memmap | None:
+        """Map the rows the index knows about and share the map with other readers
+        (None if the file was replaced since the index was built)."""
+        with self._lock:
+            rows, inode = self._rows, self._inode
+        with open(self._path, "rb") as f:
+            if os.fstat(f.fileno()).st_ino != inode:
+                self._refresh()
+                return None
+            mmap = np.memmap(f, dtype=self._dtype, mode="r", shape=(rows,))
+        with self._lock:
+            if (self._rows, self._inode) == (rows, inode):
+                self._mmap = mmap
+        return mmap
+
+    def _refresh(self, force: bool = False):
+        """Bring the key → row index in line with the file on disk.
+
+        The file is scanned without holding ``_lock``; the result is only
+        installed if no other thread refreshed the index in the meantime."""
+        with self._lock:
+            known_rows, known_inode = self._rows, self._inode
+        try:
+            f = open(self._path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self._index, self._rows, self._inode, self._mmap = {}, 0, None, None
+            return
+
+        # Size and keys come from the same open file, even if compaction replaces the path meanwhile
+        with f:
+            st = os.fstat(f.fileno())
+            rows = st.st_size // self._dtype.itemsize
+            replaced = force or st.st_ino != known_inode or rows < known_rows
+            if not replaced and rows == known_rows:
+                return
+            start = 0 if replaced else known_rows
+            entries = {}
+            if rows > start:
+                keys = np.memmap(f, dtype=self._dtype, mode="r", shape=(rows,))["key"]
+                entries = {keys[row].tobytes(): row for row in range(start, rows)}
+                del keys
+
+        with self._lock:
+            if (self._rows, self._inode) != (known_rows, known_inode):
+                return
+            if replaced:
+                self._index = entries
+            else:
+                self._index.update(entries)
+            self._rows, self._inode, self._mmap = rows, st.st_ino, None
+
+    def _compact(self, rows: int):
+        """Size-based eviction: keep the newest half of the disk tier.
+
+        Runs under the file lock but not ``_lock``: readers keep using their old
+        map (the replaced file stays readable) until they refresh."""
+        keep_from = rows - self._max_rows // 2
+        data = np.memmap(self._path, dtype=self._dtype, mode="r", shape=(rows,))
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data[keep_from:].tobytes())
+        del data
+        os.replace(tmp_path, self._path)
+        with self._lock:
+            self.stats["disk_evictions"] += keep_from
+        self._refresh(force=True)
+        logger.info(f"[EMBEDDING CACHE] Evicted {keep_from} vectors from disk tier")
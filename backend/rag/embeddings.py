@@ -1,23 +1,177 @@
+import hashlib
+import math
+import threading
 import google.generativeai as genai
 from backend.config import get_settings
+from backend.blocking import run_blocking
+from backend.rag.embedding_cache import EmbeddingCache, make_key
 
 settings = get_settings()
+
+# Gemini accepts at most 100 texts per batch embedding request
+EMBED_BATCH_SIZE = 100
+
+# gemini-embedding-001 only returns unit vectors at its native size
+NATIVE_DIMENSION = 3072
+
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
+# Model and dimension used by this process. Defaults to the settings; a blue/green
+# index version with another model or size switches it (see backend/rag/versions.py)
+_config = {"model": settings.GEMINI_EMBEDDING_MODEL, "dimension": settings.EMBEDDING_DIMENSION}
+
+# One cache per dimension (the disk tier keeps one file per dimension anyway)
+_caches: dict[int, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def set_embedding_config(model: str, dimension: int):
+    _config.update(model=model, dimension=dimension)
+
+
+def embedding_config() -> dict:
+    return dict(_config)
+
+
+def _get_cache() -> EmbeddingCache | None:
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    dimension = _config["dimension"]
+    if dimension not in _caches:
+        with _caches_lock:
+            if dimension not in _caches:
+                _caches[dimension] = EmbeddingCache(
+                    dimension=dimension,
+                    memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+                    directory=settings.EMBEDDING_CACHE_DIR,
+                    disk_max_mb=settings.EMBEDDING_CACHE_DISK_MAX_MB,
+                )
+    return _caches[dimension]
+
+
+def _normalise(embedding: list[float]) -> list[float]:
+    if len(embedding) == NATIVE_DIMENSION:
+        return embedding
+    norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+    return [x / norm for x in embedding]
+
+
+def _embed(text: str, task_type: str) -> list[float]:
+    model, dimension = _config["model"], _config["dimension"]
+    cache = _get_cache()
+    key = None
+    if cache:
+        key = make_key(model, task_type, text)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-def get_embedding(text: str) -> list[float]:
     result = genai.embed_content(
-        model=settings.GEMINI_EMBEDDING_MODEL,
+        model=model,
         content=text,
-        task_type="retrieval_document",
+        task_type=task_type,
+        output_dimensionality=dimension,
     )
-    return result["embedding"]
+    embedding = _normalise(result["embedding"])
+    if cache:
+        cache.put(key, embedding)
+    return embedding
+
+
+def _lookup_many(cache: EmbeddingCache | None, model: str, texts: list[str],
+                 task_type: str) -> tuple[list, list, list[int]]:
+    """Cache lookups for a batch. Returns (embeddings, keys, indexes still missing)."""
+    embeddings: list[list[float] | None] = [None] * len(texts)
+    keys = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        if cache:
+            keys[i] = make_key(model, task_type, text)
+            embeddings[i] = cache.get(keys[i])
+        if embeddings[i] is None:
+            missing.append(i)
+    return embeddings, keys, missing
+
+
+def _fill(cache: EmbeddingCache | None, embeddings: list, keys: list, chunk: list[int], result: dict):
+    for i, embedding in zip(chunk, result["embedding"]):
+        embedding = _normalise(embedding)
+        embeddings[i] = embedding
+        if cache:
+            cache.put(keys[i], embedding)
+
+
+def _embed_many(texts: list[str], task_type: str) -> list[list[float]]:
+    """Embed many texts with batch requests, skipping the ones already cached."""
+    model, dimension = _config["model"], _config["dimension"]
+    cache = _get_cache()
+    embeddings, keys, missing = _lookup_many(cache, model, texts, task_type)
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        chunk = missing[start:start + EMBED_BATCH_SIZE]
+        result = genai.embed_content(
+            model=model,
+            content=[texts[i] for i in chunk],
+            task_type=task_type,
+            output_dimensionality=dimension,
+        )
+        _fill(cache, embeddings, keys, chunk, result)
+    return embeddings
+
+
+async def _aembed_many(texts: list[str], task_type: str) -> list[list[float]]:
+    """Async variant of _embed_many for the request path.
+
+    With a disk tier, cache lookups and put-backs can wait on memmap reads, the
+    cross-process file lock and compaction, so they run on the bounded executor;
+    a memory-only cache is cheap enough to use on the event loop."""
+    model, dimension = _config["model"], _config["dimension"]
+    cache = _get_cache()
+    blocking = cache is not None and cache.on_disk
+    if blocking:
+        embeddings, keys, missing = await run_blocking(_lookup_many, cache, model, texts, task_type)
+    else:
+        embeddings, keys, missing = _lookup_many(cache, model, texts, task_type)
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        chunk = missing[start:start + EMBED_BATCH_SIZE]
+        result = await genai.embed_content_async(
+            model=model,
+            content=[texts[i] for i in chunk],
+            task_type=task_type,
+            output_dimensionality=dimension,
+        )
+        if blocking:
+            await run_blocking(_fill, cache, embeddings, keys, chunk, result)
+        else:
+            _fill(cache, embeddings, keys, chunk, result)
+    return embeddings
+
+
+def get_embedding(text: str) -> list[float]:
+    return _embed(text, "retrieval_document")
 
 
 def get_query_embedding(text: str) -> list[float]:
-    result = genai.embed_content(
-        model=settings.GEMINI_EMBEDDING_MODEL,
-        content=text,
-        task_type="retrieval_query",
-    )
-    return result["embedding"]
+    return _embed(text, "retrieval_query")
+
+
+def get_embeddings(texts: list[str]) -> list[list[float]]:
+    return _embed_many(texts, "retrieval_document")
+
+
+def get_query_embeddings(texts: list[str]) -> list[list[float]]:
+    return _embed_many(texts, "retrieval_query")
+
+
+async def aget_query_embeddings(texts: list[str]) -> list[list[float]]:
+    return await _aembed_many(texts, "retrieval_query")
+
+
+def text_hash(text: str) -> str:
+    """Fingerprint of what a stored vector was computed from (text, model and dimension)."""
+    source = f"{_config['model']}|{_config['dimension']}|{text}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+
+def get_cache_stats() -> dict:
+    cache = _get_cache()
+    return cache.get_stats() if cache else {"enabled": False}
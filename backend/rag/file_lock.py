@@ -0,0 +1,23 @@
+"""Cross-process exclusive lock on a lock file (``fcntl.flock``).
+
+Used by the on-disk stores that the API and the CLI scripts write to at the
+same time: the embedding cache's disk tier and the local vector index.
+"""
+import fcntl
+import os
+
+
+class FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,55 @@
+"""Live stock and price for RAG hits.
+
+Stock and price change with every sale and restock, so they are not stored in
+the vector payloads (see ``backend.rag.documents``). Tyre hits are hydrated
+from Postgres at query time with one batched lookup by id; hits whose record
+no longer exists are dropped. If the lookup fails, ``unconfirmed`` keeps the
+hits without price and stock, flagged as such.
+"""
+import time
+from sqlalchemy import select
+from backend.database import async_session
+from backend.models.tyre import Tyre
+
+stats = {"lookups": 0, "hits_hydrated": 0, "hits_dropped": 0, "fallbacks": 0, "hydrate_ms_total": 0.0}
+
+
+async def _live_tyres(ids: set[int]) -> dict[int, dict]:
+    async with async_session() as db:
+        rows = (await db.execute(select(Tyre.id, Tyre.price, Tyre.stock).where(Tyre.id.in_(ids)))).all()
+    return {row.id: {"price": float(row.price), "stock": row.stock} for row in rows}
+
+
+async def hydrate(results: dict[str, list[dict]]) -> dict[str, list[dict]]:
+    """Copy of ``results`` with live price and stock merged into each tyre payload."""
+    ids = {hit["id"] for hit in results.get("tyres", [])}
+    if not ids:
+        return results
+    start = time.perf_counter()
+    live = await _live_tyres(ids)
+    # Hits can be shared with the lexical index, so build new dicts
+    tyres = [{**hit, "payload": {**hit["payload"], **live[hit["id"]], "live": True}}
+             for hit in results["tyres"] if hit["id"] in live]
+
+    stats["lookups"] += 1
+    stats["hits_hydrated"] += len(tyres)
+    stats["hits_dropped"] += len(results["tyres"]) - len(tyres)
+    stats["hydrate_ms_total"] += (time.perf_counter() - start) * 1000
+    return {**results, "tyres": tyres}
+
+
+def unconfirmed(results: dict[str, list[dict]]) -> dict[str, list[dict]]:
+    """Copy of ``results`` for when ``hydrate`` failed: tyre hits are kept, marked
+    ``"live": False`` with price and stock unknown (``None``)."""
+    tyres = [{**hit, "payload": {**hit["payload"], "price": None, "stock": None, "live": False}}
+             for hit in results.get("tyres", [])]
+    stats["fallbacks"] += 1
+    return {**results, "tyres": tyres}
+
+
+def get_stats() -> dict:
+    lookups = stats["lookups"]
+    return {
+        **{k: v for k, v in stats.items() if k != "hydrate_ms_total"},
+        "avg_hydrate_ms": round(stats["hydrate_ms_total"] / lookups, 2) if lookups else 0.0,
+    }
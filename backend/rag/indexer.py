@@ -0,0 +1,212 @@
+"""Bulk indexing: batch embedding plus batched upserts with bounded concurrency."""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from qdrant_client.models import PointStruct
+from backend.config import get_settings
+from backend.rag.embeddings import get_embeddings, text_hash
+from backend.rag.local_index import get_local_index
+from backend.rag.qdrant_client import get_qdrant_client, overwrite_payloads, physical_name, use_local_backend
+from backend.rag.search_cache import search_cache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def with_retry(func, *args, attempts: int = None, base_delay: float = 1.0, label: str = "call", **kwargs):
+    """Call ``func`` and retry on any exception with exponential backoff and jitter."""
+    attempts = attempts or settings.INDEX_MAX_RETRIES
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) * (0.5 + random.random())
+            logger.warning(f"[INDEXER] {label} failed (attempt {attempt}/{attempts}): {e}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _log_progress(collection_name: str, done: int, total: int):
+    logger.info(f"[INDEXER] {collection_name}: {done}/{total}")
+
+
+def _index_batch(collection_name: str, documents: list[dict]) -> int:
+    embeddings = with_retry(
+        get_embeddings, [d["text"] for d in documents],
+        label=f"embedding {len(documents)} {collection_name}",
+    )
+    points = [
+        PointStruct(id=doc["id"], vector=embedding, payload={**doc["payload"], "text_hash": text_hash(doc["text"])})
+        for doc, embedding in zip(documents, embeddings)
+    ]
+    try:
+        with_retry(
+            get_qdrant_client().upsert, collection_name=physical_name(collection_name), points=points, wait=True,
+            label=f"upserting {len(points)} {collection_name}",
+        )
+    finally:
+        search_cache.bump(collection_name)
+    return len(points)
+
+
+def index_documents(collection_name: str, documents: list[dict], batch_size: int = None,
+                    concurrency: int = None, progress=_log_progress) -> dict:
+    """Embed and upsert documents (see ``backend.rag.documents``) in batches.
+
+    Up to ``concurrency`` batches are in flight at once. ``progress`` is called
+    as ``progress(collection_name, done, total)`` after each batch. Returns
+    ``{"indexed": n, "failed": n, "seconds": s}``; a batch that still fails after
+    retries is logged and counted, and the rest carry on.
+    """
+    batch_size = batch_size or settings.INDEX_BATCH_SIZE
+    concurrency = concurrency or settings.INDEX_CONCURRENCY
+    start = time.perf_counter()
+    total = len(documents)
+    batches = [documents[i:i + batch_size] for i in range(0, total, batch_size)]
+
+    indexed = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="indexer") as pool:
+        futures = {pool.submit(_index_batch, collection_name, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                indexed += future.result()
+            except Exception as e:
+                failed += len(batch)
+                logger.error(f"[INDEXER] {collection_name}: batch of {len(batch)} failed: {e}")
+            if progress:
+                progress(collection_name, indexed + failed, total)
+
+    return {"indexed": indexed, "failed": failed, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def _existing_points(collection_name: str) -> dict[int, dict]:
+    """id → payload for every point in a collection (no vectors)."""
+    client = get_qdrant_client()
+    existing = {}
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=physical_name(collection_name), limit=1000, offset=offset,
+            with_payload=True, with_vectors=False,
+        )
+        for record in records:
+            existing[record.id] = record.payload or {}
+        if offset is None:
+            return existing
+
+
+def sync_collection(collection_name: str, documents: list[dict], progress=_log_progress) -> dict:
+    """Make a collection match ``documents`` while embedding as little as possible.
+
+    Each point stores the ``text_hash`` of the text it was embedded from. Only
+    documents that are new or whose hash changed are embedded; documents whose
+    text is unchanged but whose payload differs get a payload overwrite; points
+    with no matching document are deleted.
+    """
+    if use_local_backend():
+        return sync_local_collection(collection_name, documents, progress)
+
+    start = time.perf_counter()
+    existing = _existing_points(collection_name)
+
+    to_embed, to_overwrite = [], []
+    for doc in documents:
+        stored = existing.get(doc["id"])
+        doc_hash = text_hash(doc["text"])
+        if stored is None or stored.get("text_hash") != doc_hash:
+            to_embed.append(doc)
+        elif {k: v for k, v in stored.items() if k != "text_hash"} != doc["payload"]:
+            to_overwrite.append((doc["id"], {**doc["payload"], "text_hash": doc_hash}))
+
+    orphans = list(existing.keys() - {doc["id"] for doc in documents})
+
+    result = index_documents(collection_name, to_embed, progress=progress) if to_embed else {"indexed": 0, "failed": 0}
+
+    client = get_qdrant_client()
+    if to_overwrite:
+        with_retry(
+            overwrite_payloads, collection_name, dict(to_overwrite),
+            label=f"updating {len(to_overwrite)} {collection_name} payloads",
+        )
+    if orphans:
+        try:
+            with_retry(
+                client.delete, collection_name=physical_name(collection_name), points_selector=orphans,
+                label=f"deleting {len(orphans)} {collection_name}",
+            )
+        finally:
+            search_cache.bump(collection_name)
+
+    return {
+        "embedded": result["indexed"],
+        "failed": result["failed"],
+        "payload_updated": len(to_overwrite),
+        "deleted": len(orphans),
+        "unchanged": len(documents) - len(to_embed) - len(to_overwrite),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def sync_local_collection(collection_name: str, documents: list[dict], progress=_log_progress) -> dict:
+    """``sync_collection`` for the in-process index: reuse stored vectors whose
+    ``text_hash`` still matches, embed the rest, and rewrite the index once."""
+    start = time.perf_counter()
+    index = get_local_index(collection_name)
+    stored_payloads = index.payloads_by_id()
+    stored_vectors = index.vectors_by_id()
+    if index.dim != settings.EMBEDDING_DIMENSION:
+        stored_payloads, stored_vectors = {}, {}  # EMBEDDING_DIMENSION changed: rebuild from scratch
+
+    to_embed = [
+        doc for doc in documents
+        if stored_payloads.get(doc["id"], {}).get("text_hash") != text_hash(doc["text"])
+    ]
+    embedded, failed = {}, 0
+    batch_size = settings.INDEX_BATCH_SIZE
+    for i in range(0, len(to_embed), batch_size):
+        batch = to_embed[i:i + batch_size]
+        try:
+            vectors = with_retry(
+                get_embeddings, [d["text"] for d in batch],
+                label=f"embedding {len(batch)} {collection_name}",
+            )
+            embedded.update({doc["id"]: vector for doc, vector in zip(batch, vectors)})
+        except Exception as e:
+            failed += len(batch)
+            logger.error(f"[INDEXER] {collection_name}: batch of {len(batch)} failed: {e}")
+        if progress:
+            progress(collection_name, len(embedded) + failed, len(to_embed))
+
+    ids, vectors, payloads = [], [], []
+    payload_updated = 0
+    for doc in documents:
+        stored = stored_payloads.get(doc["id"])
+        if doc["id"] in embedded:
+            vector = embedded[doc["id"]]
+            payload = {**doc["payload"], "text_hash": text_hash(doc["text"])}
+        elif stored is None:
+            continue  # new record whose embedding failed; picked up on the next sync
+        elif stored.get("text_hash") != text_hash(doc["text"]):
+            vector, payload = stored_vectors[doc["id"]], stored  # keep the stale row so it is retried
+        else:
+            vector = stored_vectors[doc["id"]]
+            payload = {**doc["payload"], "text_hash": stored["text_hash"]}
+            if payload != stored:
+                payload_updated += 1
+        ids.append(doc["id"])
+        vectors.append(vector)
+        payloads.append(payload)
+
+    index.write(ids, vectors, payloads, index.dtype)
+    search_cache.bump(collection_name)
+    return {
+        "embedded": len(embedded),
+        "failed": failed,
+        "payload_updated": payload_updated,
+        "deleted": len(stored_payloads.keys() - {doc["id"] for doc in documents}),
+        "unchanged": len(documents) - len(to_embed) - payload_updated,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
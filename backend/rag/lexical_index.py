@@ -0,0 +1,251 @@
+"""Lexical index over catalog names for exact tokens such as "225/45R17",
+"Pirelli" or "CR-V".
+
+Keys are compacted (lowercase, alphanumerics only) brand names, model names,
+"brand model" pairs and tyre sizes, built from the same documents as Qdrant
+(``backend.rag.documents``). A message is matched greedily, longest n-gram
+first, with a prefix fallback for single words. When every meaningful word of
+the message matches a whole key, the lexical hits are returned without
+embedding (a prefix match such as "winter" → WinterContact is only a hint); otherwise they are merged with the vector hits by reciprocal rank
+fusion (``fuse``).
+
+Catalog writes call ``invalidate()``; the next search rebuilds from Postgres.
+The index is also rebuilt every ``LEXICAL_INDEX_TTL`` seconds to pick up
+out-of-band changes such as ``seed.py``.
+"""
+import asyncio
+import bisect
+import logging
+import re
+import time
+from backend.config import get_settings
+from backend.rag.documents import load_documents
+from backend.rag.text import TYRE_SIZE_RE, normalize_size
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:[-'/.][a-z0-9]+)*")
+YEAR_RE = re.compile(r"^(19|20)\d{2}$")
+MAX_NGRAM = 4
+MIN_PREFIX = 3
+RRF_K = 60
+
+# Scores given to lexical hits, on the same scale as cosine scores so the
+# CustomerAgent thresholds (> 0.25 shown, > 0.7 "Exact match") still apply
+EXACT_SCORE = 1.0
+OTHER_YEAR_SCORE = 0.65
+PREFIX_SCORE = 0.6
+# Children matched only through their brand ("honda" → Honda models)
+BRAND_CHILD_WEIGHT = 0.5
+
+STOPWORDS = {
+    "a", "an", "the", "i", "im", "i'm", "my", "me", "we", "our", "you", "your", "it", "its", "is", "are",
+    "for", "of", "on", "in", "to", "at", "with", "and", "or", "from", "by", "do", "does", "have", "has",
+    "got", "drive", "driving", "own", "need", "needs", "want", "looking", "look", "search", "find", "show",
+    "any", "some", "what", "which", "please", "pls", "thanks", "hi", "hello", "hey",
+    "car", "cars", "tyre", "tyres", "tire", "tires", "size", "sizes", "model", "models", "brand", "brands",
+}
+
+
+def compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def _document_keys(collection: str, payload: dict) -> list[tuple[str, float]]:
+    """(key, weight) pairs a document can be found under."""
+    if collection in ("car_brands", "tyre_brands"):
+        return [(compact(payload["name"]), 1.0)]
+    brand = payload.get("brand_name") or ""
+    if collection == "car_models":
+        name = payload["name"]
+        return [(compact(name), 1.0), (compact(brand + name), 1.0), (compact(brand), BRAND_CHILD_WEIGHT)]
+    if collection == "tyres":
+        model = payload["model"]
+        return [
+            (compact(model), 1.0), (compact(brand + model), 1.0),
+            (compact(payload["size"]), 1.0), (compact(brand), BRAND_CHILD_WEIGHT),
+        ]
+    return []
+
+
+class LexicalIndex:
+    def __init__(self):
+        self._keys: dict[str, list[tuple[str, int, float]]] = {}
+        self._sorted_keys: list[str] = []
+        self._payloads: dict[str, dict[int, dict]] = {}
+        self._dirty = True
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "searches": 0,
+            "short_circuits": 0,
+            "fused": 0,
+            "rebuilds": 0,
+            "last_build_ms": 0.0,
+            "lexical_ms_total": 0.0,
+        }
+
+    # ---- Building ----
+
+    def build(self, documents: dict[str, list[dict]]):
+        keys: dict[str, list[tuple[str, int, float]]] = {}
+        payloads: dict[str, dict[int, dict]] = {}
+        for collection, docs in documents.items():
+            payloads[collection] = {}
+            for doc in docs:
+                payloads[collection][doc["id"]] = doc["payload"]
+                for key, weight in _document_keys(collection, doc["payload"]):
+                    if key:
+                        keys.setdefault(key, []).append((collection, doc["id"], weight))
+        self._keys, self._payloads = keys, payloads
+        self._sorted_keys = sorted(keys)
+
+    def invalidate(self):
+        self._dirty = True
+
+    async def ensure_fresh(self):
+        if not self._dirty and time.monotonic() - self._built_at < settings.LEXICAL_INDEX_TTL:
+            return
+        async with self._lock:
+            if not self._dirty and time.monotonic() - self._built_at < settings.LEXICAL_INDEX_TTL:
+                return
+            start = time.perf_counter()
+            # Clear first so writes that land during the load mark it dirty again
+            self._dirty = False
+            # Imported here so scripts that only search Qdrant don't create the async engine
+            from backend.database import async_session
+            try:
+                async with async_session() as db:
+                    documents = await db.run_sync(load_documents)
+            except Exception:
+                self._dirty = True
+                raise
+            self.build(documents)
+            self._built_at = time.monotonic()
+            self.stats["rebuilds"] += 1
+            self.stats["last_build_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info(f"[LEXICAL] Rebuilt: {len(self._keys)} keys in {self.stats['last_build_ms']}ms")
+
+    # ---- Searching ----
+
+    async def resolve(self, collection: str, name: str) -> int | None:
+        """Id of the record in ``collection`` whose name matches ``name`` exactly
+        (ignoring case and punctuation), e.g. the brand named in an intent."""
+        await self.ensure_fresh()
+        for entry_collection, point_id, weight in self._keys.get(compact(name or ""), []):
+            if entry_collection == collection and weight == 1.0:
+                return point_id
+        return None
+
+    def _tokens(self, text: str) -> list[str]:
+        text = TYRE_SIZE_RE.sub(lambda m: " " + normalize_size(*m.groups()) + " ", text)
+        return WORD_RE.findall(text.lower())
+
+    def _prefix_entries(self, word: str) -> list[tuple[str, int, float]]:
+        entries = []
+        i = bisect.bisect_left(self._sorted_keys, word)
+        while i < len(self._sorted_keys) and self._sorted_keys[i].startswith(word):
+            entries.extend(self._keys[self._sorted_keys[i]])
+            i += 1
+        return entries
+
+    def match(self, text: str, limit: int = 5) -> dict:
+        """Match ``text`` against the index (no I/O).
+
+        Returns ``{"results": {collection: [hits]}, "covered": bool}`` where hits
+        have the Qdrant result shape and ``covered`` means every meaningful word
+        matched a whole key, so vector search can be skipped. Prefix matches add
+        hits but never make a message covered.
+        """
+        words = self._tokens(text)
+        best: dict[tuple[str, int], float] = {}
+        significant = covered = 0
+        years = set()
+
+        i = 0
+        while i < len(words):
+            for length in range(min(MAX_NGRAM, len(words) - i), 0, -1):
+                entries = self._keys.get(compact("".join(words[i:i + length])))
+                if entries:
+                    for collection, point_id, weight in entries:
+                        key = (collection, point_id)
+                        best[key] = max(best.get(key, 0.0), EXACT_SCORE * weight)
+                    span = [w for w in words[i:i + length] if w not in STOPWORDS]
+                    significant += len(span)
+                    covered += len(span)
+                    i += length
+                    break
+            else:
+                word = words[i]
+                i += 1
+                if word in STOPWORDS:
+                    continue
+                significant += 1
+                if YEAR_RE.match(word):
+                    years.add(int(word))
+                    continue
+                if len(word) < MIN_PREFIX or word.isdigit():
+                    continue
+                entries = self._prefix_entries(compact(word))
+                if entries:
+                    for collection, point_id, weight in entries:
+                        key = (collection, point_id)
+                        best[key] = max(best.get(key, 0.0), PREFIX_SCORE * weight)
+
+        results = {collection: [] for collection in self._payloads}
+        for (collection, point_id), score in best.items():
+            payload = self._payloads[collection][point_id]
+            if years and collection == "car_models" and payload.get("year") not in years:
+                score = min(score, OTHER_YEAR_SCORE)
+            results[collection].append({"id": point_id, "score": score, "payload": payload})
+        for collection, hits in results.items():
+            hits.sort(key=lambda h: -h["score"])
+            del hits[limit:]
+
+        # A year only counts as explained when it qualifies a matched car model
+        if years and any(h["payload"].get("year") in years for h in results.get("car_models", [])):
+            covered += len(years)
+        return {"results": results, "covered": bool(best) and significant > 0 and covered == significant}
+
+    async def search(self, text: str, limit: int = 5) -> dict:
+        await self.ensure_fresh()
+        start = time.perf_counter()
+        matched = self.match(text, limit)
+        self.stats["searches"] += 1
+        self.stats["lexical_ms_total"] += (time.perf_counter() - start) * 1000
+        if matched["covered"]:
+            self.stats["short_circuits"] += 1
+        return matched
+
+    def fuse(self, lexical: dict[str, list[dict]], vector: dict[str, list[dict]], limit: int = 5) -> dict[str, list[dict]]:
+        self.stats["fused"] += 1
+        return fuse(lexical, vector, limit)
+
+    def get_stats(self) -> dict:
+        searches = self.stats["searches"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "lexical_ms_total"},
+            "keys": len(self._keys),
+            "avg_lexical_ms": round(self.stats["lexical_ms_total"] / searches, 3) if searches else 0.0,
+        }
+
+
+def fuse(lexical: dict[str, list[dict]], vector: dict[str, list[dict]], limit: int = 5) -> dict[str, list[dict]]:
+    """Reciprocal rank fusion per collection. Each hit keeps the higher of its
+    lexical and vector scores so downstream score thresholds keep working."""
+    fused = {}
+    for collection in vector.keys() | lexical.keys():
+        ranked: dict[int, float] = {}
+        hits: dict[int, dict] = {}
+        for source in (lexical.get(collection, []), vector.get(collection, [])):
+            for rank, hit in enumerate(source):
+                ranked[hit["id"]] = ranked.get(hit["id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+                if hit["id"] not in hits or hit["score"] > hits[hit["id"]]["score"]:
+                    hits[hit["id"]] = hit
+        order = sorted(ranked, key=lambda point_id: -ranked[point_id])[:limit]
+        fused[collection] = [hits[point_id] for point_id in order]
+    return fused
+
+
+lexical_index = LexicalIndex()
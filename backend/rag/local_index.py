@@ -0,0 +1,397 @@
+"""In-process vector index for small catalogs (``VECTOR_BACKEND=local``).
+
+Each collection is two files in ``LOCAL_INDEX_DIR``:
+
+- ``{collection}.{generation}.vec``: an (n, dim) matrix of L2-normalised
+  vectors stored as float16 or int8 (``LOCAL_INDEX_DTYPE``; int8 rows carry
+  their own scale)
+- ``{collection}.json``: generation, dtype, dim, int8 row scales, point ids and
+  payloads, in row order
+
+A write puts the vectors in a new generation's file and then atomically
+replaces the ``.json``, which is the only commit point: a reader always pairs
+metadata with the vectors it was written with. Writers hold an ``flock`` on
+``{collection}.lock`` from reading the current state to that commit, so writes
+from different processes are applied one after another.
+
+The matrix stays in its compact type, read through ``numpy.memmap``. A search
+decodes it to float32 one block of rows at a time, so memory holds the compact
+matrix plus one block rather than a float32 copy; it is exact brute-force
+cosine, which for a few thousand vectors is cheaper than a network hop to
+Qdrant. Results have the same shape as ``qdrant_client.search_collection``.
+
+Build from the live Qdrant collections or straight from Postgres:
+
+    python -m backend.rag.local_index build --source qdrant
+    python -m backend.rag.local_index build --source postgres
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+import numpy as np
+from backend.config import get_settings
+from backend.rag.file_lock import FileLock
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+INT8_MAX = 127.0
+# Rows decoded to float32 at a time while scoring
+SCORE_BLOCK_ROWS = 4096
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def encode(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Normalise and quantise. Returns ``(encoded, scales)``; ``scales`` is the
+    per-row int8 step (None for float16)."""
+    vectors = _normalise(vectors)
+    if dtype == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / INT8_MAX
+        return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(np.float16), None
+
+
+def decode(encoded: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+    matrix = np.asarray(encoded, dtype=np.float32)
+    if scales is not None:
+        matrix *= np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
+
+
+def payload_matches(payload: dict, filters: dict) -> bool:
+    """Filter spec shared with the Qdrant path:
+
+    ``{"field": value}`` equality, ``{"field": [a, b]}`` any-of, and
+    ``{"field": {"gt"|"gte"|"lt"|"lte": x}}`` ranges.
+    """
+    for field, condition in filters.items():
+        value = payload.get(field)
+        if isinstance(condition, dict):
+            if value is None:
+                return False
+            if "gt" in condition and not value > condition["gt"]:
+                return False
+            if "gte" in condition and not value >= condition["gte"]:
+                return False
+            if "lt" in condition and not value < condition["lt"]:
+                return False
+            if "lte" in condition and not value <= condition["lte"]:
+                return False
+        elif isinstance(condition, (list, tuple, set)):
+            if value not in condition:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class LocalVectorIndex:
+    def __init__(self, collection_name: str, directory: str = None):
+        self.collection_name = collection_name
+        self.directory = directory or settings.LOCAL_INDEX_DIR
+        self.meta_path = os.path.join(self.directory, f"{collection_name}.json")
+        self.lock_path = os.path.join(self.directory, f"{collection_name}.lock")
+        self._lock = threading.RLock()
+        self._loaded_mtime = None
+        self.generation = None
+        self.dtype = settings.LOCAL_INDEX_DTYPE
+        self.dim = 0
+        self.ids: list[int] = []
+        self.payloads: list[dict] = []
+        self._rows: dict[int, int] = {}
+        self._encoded = None
+        self._scales = None
+
+    def _vec_path(self, generation: str | None) -> str:
+        # Files written before generations existed have no generation in their name
+        suffix = f".{generation}.vec" if generation else ".vec"
+        return os.path.join(self.directory, f"{self.collection_name}{suffix}")
+
+    # ---- Loading / saving ----
+
+    def _ensure_loaded(self):
+        """(Re)load when the files on disk are newer than what we have."""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        generation, dtype, dim, ids = meta.get("generation"), meta["dtype"], meta["dim"], meta["ids"]
+        if ids:
+            vec_path = self._vec_path(generation)
+            expected = len(ids) * dim * np.dtype(dtype).itemsize
+            actual = os.path.getsize(vec_path)
+            if actual != expected:
+                raise ValueError(f"{vec_path} is {actual} bytes, expected {expected} for generation {generation}")
+            encoded = np.memmap(vec_path, dtype=dtype, mode="r", shape=(len(ids), dim))
+        else:
+            encoded = np.zeros((0, dim), dtype=dtype)
+        self.generation, self.dtype, self.dim = generation, dtype, dim
+        self.ids, self.payloads = ids, meta["payloads"]
+        self._rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        self._encoded = encoded
+        self._scales = np.asarray(meta["scales"], dtype=np.float32) if meta.get("scales") is not None else None
+        self._loaded_mtime = mtime
+        logger.info(f"[LOCAL INDEX] Loaded {self.collection_name}: {len(self.ids)} x {self.dim} {self.dtype} "
+                    f"(generation {generation})")
+
+    @contextlib.contextmanager
+    def _writing(self):
+        """Hold this index for a read-modify-write: the thread lock, and an flock
+        so writers in other processes (``local_index build``, the API's outbox
+        worker) take turns. The files are re-read under it, so a change is
+        applied to what the previous writer left rather than overwriting it."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, FileLock(self.lock_path):
+            self._loaded_mtime = None
+            self._ensure_loaded()
+            yield
+
+    def write(self, ids: list[int], vectors: np.ndarray, payloads: list[dict], dtype: str = None):
+        """Replace the whole index with float32 ``vectors`` (need not be normalised)."""
+        with self._writing():
+            self._write(ids, vectors, payloads, dtype)
+
+    def _write(self, ids: list[int], vectors: np.ndarray, payloads: list[dict], dtype: str = None):
+        dtype = dtype or settings.LOCAL_INDEX_DTYPE
+        dim = len(vectors[0]) if len(ids) else (self.dim or settings.EMBEDDING_DIMENSION)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), dim)
+        encoded, scales = encode(vectors, dtype)
+        self._write_encoded(ids, encoded, scales, payloads, dtype)
+
+    def _write_encoded(self, ids: list[int], encoded: np.ndarray, scales: np.ndarray | None,
+                       payloads: list[dict], dtype: str):
+        """Write already-encoded rows as a new generation, then switch the metadata
+        to it. Callers hold ``_writing``."""
+        with self._lock:
+            previous = self.generation
+            generation = uuid.uuid4().hex[:12]
+            vec_path, tmp_meta = self._vec_path(generation), self.meta_path + ".tmp"
+            np.ascontiguousarray(encoded, dtype=dtype).tofile(vec_path)
+            with open(tmp_meta, "w") as f:
+                json.dump({
+                    "generation": generation, "dtype": dtype, "dim": encoded.shape[1],
+                    "scales": scales.tolist() if scales is not None else None,
+                    "ids": list(ids), "payloads": list(payloads),
+                }, f)
+            os.replace(tmp_meta, self.meta_path)
+            self._loaded_mtime = None
+            self._ensure_loaded()
+            self._remove_stale(keep={generation, previous})
+
+    def _remove_stale(self, keep: set):
+        """Delete vector files of older generations. The one just replaced is kept
+        until the next write, for readers that loaded its metadata a moment ago."""
+        pattern = re.compile(rf"{re.escape(self.collection_name)}(\.[0-9a-f]+)?\.vec")
+        keep_names = {os.path.basename(self._vec_path(g)) for g in keep if g}
+        for name in os.listdir(self.directory):
+            if pattern.fullmatch(name) and name not in keep_names:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def load(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    # ---- Reads ----
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self.ids)
+
+    def search(self, query_vector: list[float], limit: int = 5, filters: dict = None,
+               score_threshold: float = None) -> list[dict]:
+        with self._lock:
+            self._ensure_loaded()
+            if not self.ids:
+                return []
+            query = _normalise(np.asarray(query_vector, dtype=np.float32)[: self.dim])
+
+            candidates = None
+            if filters:
+                candidates = np.array([payload_matches(p, filters) for p in self.payloads], dtype=bool)
+                if not candidates.any():
+                    return []
+
+            scores = self._scores(query)
+            if candidates is not None:
+                scores[~candidates] = -np.inf
+            if score_threshold is not None:
+                scores[scores < score_threshold] = -np.inf
+
+            k = min(limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self.ids[i], "score": float(scores[i]), "payload": self.payloads[i]}
+                for i in top if np.isfinite(scores[i])
+            ]
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine scores against the compact matrix, decoding one block of rows at a time."""
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            end = start + SCORE_BLOCK_ROWS
+            scores[start:end] = np.asarray(self._encoded[start:end], dtype=np.float32) @ query
+        if self._scales is not None:
+            scores *= self._scales
+        return scores
+
+    def vectors_by_id(self) -> dict[int, np.ndarray]:
+        """Decoded (normalised float32) vectors."""
+        with self._lock:
+            self._ensure_loaded()
+            matrix = decode(self._encoded, self._scales)
+            return {point_id: matrix[row] for point_id, row in self._rows.items()}
+
+    def payloads_by_id(self) -> dict[int, dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return dict(zip(self.ids, self.payloads))
+
+    # ---- Writes (rewrite the files; fine for small catalogs) ----
+
+    # Untouched rows are copied in their encoded form, so they are not re-quantised.
+
+    def upsert(self, points: list[tuple[int, list[float], dict]]):
+        if not points:
+            return
+        with self._writing():
+            if not self.ids:
+                ids, vectors, payloads = zip(*points)
+                self._write(list(ids), np.asarray(vectors, dtype=np.float32), list(payloads), self.dtype)
+                return
+            ids, payloads = list(self.ids), list(self.payloads)
+            encoded = np.array(self._encoded)
+            scales = self._scales.copy() if self._scales is not None else None
+            new_ids, new_vectors, new_payloads = [], [], []
+            for point_id, vector, payload in points:
+                row = self._rows.get(point_id)
+                if row is None:
+                    new_ids.append(point_id)
+                    new_vectors.append(vector)
+                    new_payloads.append(payload)
+                    continue
+                row_encoded, row_scales = encode(np.asarray([vector], dtype=np.float32), self.dtype)
+                encoded[row] = row_encoded[0]
+                if scales is not None:
+                    scales[row] = row_scales[0]
+                payloads[row] = payload
+            if new_ids:
+                rows_encoded, rows_scales = encode(np.asarray(new_vectors, dtype=np.float32), self.dtype)
+                encoded = np.vstack([encoded, rows_encoded])
+                if scales is not None:
+                    scales = np.concatenate([scales, rows_scales])
+                ids += new_ids
+                payloads += new_payloads
+            self._write_encoded(ids, encoded, scales, payloads, self.dtype)
+
+    def set_payloads(self, payloads_by_id: dict[int, dict]):
+        with self._writing():
+            payloads = list(self.payloads)
+            for point_id, payload in payloads_by_id.items():
+                row = self._rows.get(point_id)
+                if row is not None:
+                    payloads[row] = payload
+            self._write_encoded(self.ids, self._encoded, self._scales, payloads, self.dtype)
+
+    def delete(self, point_ids: list[int]):
+        with self._writing():
+            drop = set(point_ids)
+            keep = [row for row, point_id in enumerate(self.ids) if point_id not in drop]
+            if len(keep) == len(self.ids):
+                return
+            self._write_encoded(
+                [self.ids[row] for row in keep],
+                self._encoded[keep],
+                self._scales[keep] if self._scales is not None else None,
+                [self.payloads[row] for row in keep],
+                self.dtype,
+            )
+
+
+_indexes: dict[str, LocalVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(collection_name: str) -> LocalVectorIndex:
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = LocalVectorIndex(collection_name)
+        return _indexes[collection_name]
+
+
+def build_from_qdrant(collection_names: list[str]) -> dict[str, int]:
+    """Copy vectors and payloads out of the active version's Qdrant collections."""
+    from backend.rag.qdrant_client import get_qdrant_client, physical_name
+
+    client = get_qdrant_client()
+    built = {}
+    for collection_name in collection_names:
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=physical_name(collection_name), limit=500, offset=offset,
+                with_payload=True, with_vectors=True,
+            )
+            for record in records:
+                ids.append(record.id)
+                vectors.append(record.vector)
+                payloads.append(record.payload or {})
+            if offset is None:
+                break
+        get_local_index(collection_name).write(ids, vectors, payloads)
+        built[collection_name] = len(ids)
+    return built
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from backend.rag.documents import load_documents
+    from backend.rag.qdrant_client import COLLECTIONS
+
+    parser = argparse.ArgumentParser(description="Build the in-process vector index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--source", choices=["qdrant", "postgres"], default="qdrant")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(settings.DATABASE_URL_SYNC)
+    if args.source == "qdrant":
+        from backend.rag.embeddings import embedding_config
+        from backend.rag.versions import activate_live_version
+
+        with Session(engine) as db:
+            activate_live_version(db)
+        engine.dispose()
+        config = embedding_config()
+        if (config["model"], config["dimension"]) != (settings.GEMINI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION):
+            logger.warning(f"[LOCAL INDEX] Live Qdrant version uses {config}; set GEMINI_EMBEDDING_MODEL and "
+                           f"EMBEDDING_DIMENSION to match before serving this index")
+        print(build_from_qdrant(COLLECTIONS))
+    else:
+        from backend.rag.indexer import sync_local_collection
+
+        with Session(engine) as db:
+            documents = load_documents(db)
+        engine.dispose()
+        for collection_name, docs in documents.items():
+            print(collection_name, sync_local_collection(collection_name, docs))
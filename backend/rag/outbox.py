@@ -0,0 +1,255 @@
+"""Transactional outbox for Postgres → vector store sync.
+
+CRUD handlers call ``enqueue`` before committing, so the outbox row commits
+(or rolls back) with the catalog change, then ``outbox_worker.notify()``. The
+worker drains pending rows in batches: rows for the same record collapse into
+one write, documents are rebuilt from the current Postgres state (a record
+that no longer exists becomes a delete), records whose embedded text did not
+change get a payload-only update, embeddings are requested in one batch per
+collection, and failures are retried with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS``, after which the row is marked ``dead``. When a
+collection's batch fails, its records are retried one at a time right away, so
+only the record that actually fails is backed off.
+
+Rows are claimed in a short transaction (``processing`` with a lease of
+``OUTBOX_LEASE_SECONDS`` in ``next_attempt_at``) and finished in another, so no
+transaction or row lock is held across embedding and vector-store calls. Rows
+whose lease expires (the process died mid-batch) are claimed again.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.blocking import run_blocking
+from backend.config import get_settings
+from backend.database import async_session
+from backend.models.outbox import VectorOutbox
+from backend.rag.documents import load_collection_documents
+from backend.rag.lexical_index import lexical_index
+from backend.rag.qdrant_client import delete_records, upsert_documents
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 300
+
+
+def enqueue(db: AsyncSession, collection: str, record_id: int, operation: str = "upsert", job_id: str = None):
+    """Add an outbox row to the caller's transaction (flush first for new records).
+    ``job_id`` groups the rows of a cascade reindex (``backend.rag.cascade``)."""
+    db.add(VectorOutbox(collection=collection, record_id=record_id, operation=operation, job_id=job_id))
+
+
+class OutboxWorker:
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_cleanup = 0.0
+        self.stats = {
+            "batches": 0,
+            "rows_processed": 0,
+            "rows_deduplicated": 0,
+            "records_embedded": 0,
+            "records_payload_only": 0,
+            "records_unchanged": 0,
+            "records_deleted": 0,
+            "failures": 0,
+            "batches_split": 0,
+            "last_batch_ms": 0.0,
+            "last_error": None,
+        }
+
+    def notify(self):
+        """Call after committing outbox rows; wakes the worker and the lexical index."""
+        lexical_index.invalidate()
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        logger.info("[OUTBOX] Worker started")
+        while True:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                processed = 0
+                self.stats["last_error"] = str(e)
+                logger.error(f"[OUTBOX] Drain failed: {e}")
+            if processed:
+                continue  # more may be waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Process one batch of due rows. Returns the number of rows handled."""
+        start = time.perf_counter()
+        rows = await self._claim()
+        if not rows:
+            async with async_session() as db:
+                await self._cleanup(db)
+            return 0
+
+        # Dedupe: only the latest operation per record matters
+        by_collection: dict[str, dict[int, list[VectorOutbox]]] = {}
+        for row in rows:
+            by_collection.setdefault(row.collection, {}).setdefault(row.record_id, []).append(row)
+
+        for collection, records in by_collection.items():
+            try:
+                await self._process(collection, records)
+            except Exception as e:
+                if len(records) == 1:
+                    await self._record_failure(collection, records, e)
+                    continue
+                # Find the record(s) at fault instead of backing off the whole batch
+                self.stats["batches_split"] += 1
+                logger.warning(f"[OUTBOX] {collection}: batch of {len(records)} records failed ({e}), "
+                               f"retrying them one at a time")
+                for record_id, group in records.items():
+                    try:
+                        await self._process(collection, {record_id: group})
+                    except Exception as e:
+                        await self._record_failure(collection, {record_id: group}, e)
+
+        self.stats["batches"] += 1
+        self.stats["rows_processed"] += len(rows)
+        self.stats["rows_deduplicated"] += len(rows) - sum(len(records) for records in by_collection.values())
+        self.stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"[OUTBOX] Processed {len(rows)} rows in {self.stats['last_batch_ms']}ms")
+        return len(rows)
+
+    async def _process(self, collection: str, records: dict[int, list[VectorOutbox]]):
+        """Apply ``records`` and mark their rows done; raises if the write failed."""
+        written, deleted = await self._apply(collection, records)
+        self.stats["records_embedded"] += written["embedded"]
+        self.stats["records_payload_only"] += written["payload_updated"]
+        self.stats["records_unchanged"] += written["unchanged"]
+        self.stats["records_deleted"] += deleted
+        await self._finish_done([row.id for group in records.values() for row in group])
+
+    async def _record_failure(self, collection: str, records: dict[int, list[VectorOutbox]], error: Exception):
+        self.stats["failures"] += 1
+        self.stats["last_error"] = str(error)
+        logger.warning(f"[OUTBOX] {collection}: {len(records)} records failed: {error}")
+        await self._finish_failed([row for group in records.values() for row in group], error)
+
+    async def _claim(self) -> list[VectorOutbox]:
+        """Mark a batch of due rows ``processing`` under a lease and commit right away."""
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            # SKIP LOCKED lets several API processes run a worker each
+            result = await db.execute(
+                select(VectorOutbox)
+                .where(
+                    or_(VectorOutbox.status == "pending", VectorOutbox.status == "processing"),
+                    VectorOutbox.next_attempt_at <= now,
+                )
+                .order_by(VectorOutbox.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            claimed = []
+            for row in rows:
+                if row.status == "processing":
+                    # The worker holding it died mid-batch; that counts as a failed attempt
+                    logger.warning(f"[OUTBOX] Lease expired for {row.collection}/{row.record_id}, claiming again")
+                    self._retry_later(row, RuntimeError("outbox lease expired"), now)
+                    if row.status == "dead":
+                        continue
+                row.status = "processing"
+                row.next_attempt_at = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+                claimed.append(row)
+            await db.commit()
+        return claimed
+
+    async def _finish_done(self, ids: list[int]):
+        async with async_session() as db:
+            await db.execute(
+                update(VectorOutbox)
+                .where(VectorOutbox.id.in_(ids), VectorOutbox.status == "processing")
+                .values(status="done", processed_at=datetime.now(timezone.utc), last_error=None)
+            )
+            await db.commit()
+
+    async def _finish_failed(self, rows: list[VectorOutbox], error: Exception):
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            for claimed in rows:
+                row = await db.get(VectorOutbox, claimed.id)
+                if row is not None and row.status == "processing":
+                    self._retry_later(row, error, now)
+            await db.commit()
+
+    async def _apply(self, collection: str, records: dict[int, list[VectorOutbox]]) -> tuple[dict, int]:
+        """Write the current Postgres state of ``records`` to the vector store.
+
+        Documents are read in their own short session; the embedding and
+        vector-store calls run outside any transaction. Records whose embedded
+        text is unchanged (stock, price) become a single payload overwrite for
+        the whole batch; see ``upsert_documents``.
+        """
+        wanted = [record_id for record_id, group in records.items() if group[-1].operation == "upsert"]
+        async with async_session() as db:
+            documents = await db.run_sync(lambda s: load_collection_documents(s, collection, wanted))
+        found = {doc["id"] for doc in documents}
+        to_delete = [record_id for record_id in records if record_id not in found]
+
+        written = await run_blocking(upsert_documents, collection, documents)
+        await run_blocking(delete_records, collection, to_delete)
+        return written, len(to_delete)
+
+    def _retry_later(self, row: VectorOutbox, error: Exception, now: datetime):
+        row.attempts += 1
+        row.last_error = str(error)[:2000]
+        if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            row.status = "dead"
+            logger.error(f"[OUTBOX] Giving up on {row.collection}/{row.record_id} after {row.attempts} attempts")
+        else:
+            row.status = "pending"
+            row.next_attempt_at = now + timedelta(seconds=min(2 ** row.attempts, MAX_BACKOFF_SECONDS))
+
+    async def _cleanup(self, db: AsyncSession):
+        """Delete processed rows past the retention window (at most once a minute)."""
+        if time.monotonic() - self._last_cleanup < 60:
+            return
+        self._last_cleanup = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        await db.execute(delete(VectorOutbox).where(VectorOutbox.status == "done", VectorOutbox.processed_at < cutoff))
+        await db.commit()
+
+    async def get_stats(self) -> dict:
+        """Worker counters plus lag: pending rows (including claimed ones), dead rows and age of the oldest."""
+        stats = {**self.stats, "running": self._task is not None and not self._task.done()}
+        try:
+            async with async_session() as db:
+                pending, oldest = (await db.execute(
+                    select(func.count(VectorOutbox.id), func.min(VectorOutbox.created_at))
+                    .where(or_(VectorOutbox.status == "pending", VectorOutbox.status == "processing"))
+                )).one()
+                dead = (await db.execute(
+                    select(func.count(VectorOutbox.id)).where(VectorOutbox.status == "dead")
+                )).scalar()
+        except Exception as e:
+            return {**stats, "error": str(e)}
+        lag = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+        return {**stats, "pending": pending, "dead": dead, "lag_seconds": round(lag, 1)}
+
+
+outbox_worker = OutboxWorker()
@@ -1,76 +1,522 @@
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
     Distance,
     VectorParams,
+    VectorParamsDiff,
     PointStruct,
     Filter,
     FieldCondition,
+    MatchAny,
     MatchValue,
+    OverwritePayloadOperation,
+    PayloadSchemaType,
+    Range,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
+    SetPayload,
 )
 from backend.config import get_settings
-from backend.rag.embeddings import get_embedding, get_query_embedding
+from backend.rag.embeddings import (
+    embedding_config, get_embeddings, get_query_embedding, get_query_embeddings, aget_query_embeddings, text_hash,
+)
+from backend.rag.lexical_index import lexical_index
+from backend.rag.local_index import get_local_index
+from backend.rag.search_cache import make_key, search_cache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import threading
+import time
 import uuid
 
 settings = get_settings()
 
-EMBEDDING_DIM = settings.EMBEDDING_DIMENSION  # gemini-embedding-001 dimension (3072)
-
 COLLECTIONS = ["car_brands", "car_models", "tyre_brands", "tyres"]
 
+# Blue/green index versions (see backend/rag/versions.py). A process reads and
+# writes one version at a time: "" is the original unversioned collections, any
+# other tag lives in "{collection}__{tag}". The "{collection}_live" alias points
+# at the live version's collection.
+_version = {"tag": ""}
+
+# Payload fields that searches filter on
+PAYLOAD_INDEXES = {
+    "car_brands": {"name": PayloadSchemaType.KEYWORD},
+    "car_models": {"brand_id": PayloadSchemaType.INTEGER, "year": PayloadSchemaType.INTEGER},
+    "tyre_brands": {"name": PayloadSchemaType.KEYWORD},
+    "tyres": {
+        "brand_id": PayloadSchemaType.INTEGER,
+        "size": PayloadSchemaType.KEYWORD,
+        "type": PayloadSchemaType.KEYWORD,
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+# One search per collection runs in parallel
+_search_pool = ThreadPoolExecutor(max_workers=len(COLLECTIONS) * 2, thread_name_prefix="qdrant-search")
+
+
+_client: QdrantClient | None = None
+_async_client: AsyncQdrantClient | None = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    return {
+        "host": settings.QDRANT_HOST,
+        "port": settings.QDRANT_PORT,
+        "grpc_port": settings.QDRANT_GRPC_PORT,
+        "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+        "timeout": settings.QDRANT_TIMEOUT,
+    }
+
 
 def get_qdrant_client() -> QdrantClient:
-    return QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+    """Shared sync client; its connection pool is reused across calls and threads."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = QdrantClient(**_client_options())
+    return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Shared async client for the request path. Create it from inside the event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(**_client_options())
+    return _async_client
+
+
+async def close_qdrant_clients():
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def use_local_backend() -> bool:
+    return settings.VECTOR_BACKEND == "local"
+
+
+def active_tag() -> str:
+    return _version["tag"]
+
+
+def set_active_tag(tag: str):
+    _version["tag"] = tag
+
+
+def physical_name(collection_name: str, tag: str = None) -> str:
+    """Qdrant collection holding ``collection_name`` for a version (default: the active one)."""
+    tag = _version["tag"] if tag is None else tag
+    return f"{collection_name}__{tag}" if tag else collection_name
+
+
+def alias_name(collection_name: str) -> str:
+    return f"{collection_name}_live"
+
+
+def tag_of(physical: str) -> str:
+    return physical.split("__", 1)[1] if "__" in physical else ""
+
+
+def quantization_config(mode: str = None):
+    """Qdrant quantization for ``QDRANT_QUANTIZATION`` (none | scalar | binary).
+
+    Quantized vectors stay in RAM; with ``QDRANT_ON_DISK`` the originals live
+    on disk and are only read when rescoring.
+    """
+    mode = mode or settings.QDRANT_QUANTIZATION
+    if mode == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def search_params(mode: str = None, rescore: bool = None) -> SearchParams | None:
+    mode = mode or settings.QDRANT_QUANTIZATION
+    if mode == "none":
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(
+        rescore=settings.QDRANT_RESCORE if rescore is None else rescore,
+        oversampling=settings.QDRANT_OVERSAMPLING,
+    ))
 
 
 def init_collections():
+    """Create missing collections and bring existing ones in line with the
+    configured dimension, quantization and on-disk settings.
+
+    Works on the active version's collections. A collection whose vector size
+    no longer matches the embedding dimension is recreated empty; the next seed
+    run re-embeds it (``text_hash`` includes the dimension, so nothing stale is
+    reused).
+    """
+    if use_local_backend():
+        return
     client = get_qdrant_client()
-    for collection_name in COLLECTIONS:
-        if not client.collection_exists(collection_name):
-            client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE),
+    dimension = embedding_config()["dimension"]
+    for collection_name in map(physical_name, COLLECTIONS):
+        if client.collection_exists(collection_name):
+            vectors = client.get_collection(collection_name).config.params.vectors
+            if vectors.size == dimension:
+                client.update_collection(
+                    collection_name=collection_name,
+                    vectors_config={"": VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK)},
+                    quantization_config=quantization_config() or Disabled.DISABLED,
+                )
+                continue
+            logger.warning(
+                f"[RAG] {collection_name} has {vectors.size}-dim vectors, expected {dimension}; recreating"
             )
+            client.delete_collection(collection_name)
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=dimension, distance=Distance.COSINE, on_disk=settings.QDRANT_ON_DISK),
+            quantization_config=quantization_config(),
+        )
+    create_payload_indexes(client)
 
 
-def upsert_record(collection_name: str, record_id: int, text_to_embed: str, payload: dict):
-    client = get_qdrant_client()
-    embedding = get_embedding(text_to_embed)
-    point = PointStruct(
-        id=record_id,
-        vector=embedding,
-        payload=payload,
+def create_payload_indexes(client: QdrantClient):
+    """Index the filtered payload fields (a no-op for indexes that already exist)."""
+    for collection_name in COLLECTIONS:
+        existing = client.get_collection(physical_name(collection_name)).payload_schema
+        for field, schema in PAYLOAD_INDEXES.get(collection_name, {}).items():
+            if field not in existing:
+                client.create_payload_index(physical_name(collection_name), field_name=field, field_schema=schema, wait=True)
+
+
+def build_filter(filters: dict | None) -> Filter | None:
+    """Qdrant filter from the spec shared with the local index:
+    ``{"field": value}``, ``{"field": [a, b]}`` (any of) and
+    ``{"field": {"gt"|"gte"|"lt"|"lte": x}}``."""
+    if not filters:
+        return None
+    conditions = []
+    for field, condition in filters.items():
+        if isinstance(condition, dict):
+            conditions.append(FieldCondition(key=field, range=Range(**condition)))
+        elif isinstance(condition, (list, tuple, set)):
+            conditions.append(FieldCondition(key=field, match=MatchAny(any=list(condition))))
+        else:
+            conditions.append(FieldCondition(key=field, match=MatchValue(value=condition)))
+    return Filter(must=conditions)
+
+
+def stored_payloads(collection_name: str, record_ids: list[int]) -> dict[int, dict]:
+    """id → stored payload (including ``text_hash``) for the points that exist."""
+    if use_local_backend():
+        stored = get_local_index(collection_name).payloads_by_id()
+        return {record_id: stored[record_id] for record_id in record_ids if record_id in stored}
+    records = get_qdrant_client().retrieve(
+        collection_name=physical_name(collection_name), ids=list(record_ids), with_payload=True, with_vectors=False,
     )
-    client.upsert(collection_name=collection_name, points=[point])
+    return {record.id: record.payload or {} for record in records}
+
+
+def overwrite_payloads(collection_name: str, payloads: dict[int, dict]):
+    """Replace the payloads of existing points in one request, leaving vectors alone."""
+    if not payloads:
+        return
+    lexical_index.invalidate()
+    try:
+        if use_local_backend():
+            get_local_index(collection_name).set_payloads(payloads)
+            return
+        get_qdrant_client().batch_update_points(collection_name=physical_name(collection_name), update_operations=[
+            OverwritePayloadOperation(overwrite_payload=SetPayload(payload=payload, points=[point_id]))
+            for point_id, payload in payloads.items()
+        ])
+    finally:
+        search_cache.bump(collection_name)
+
+
+def upsert_documents(collection_name: str, documents: list[dict]) -> dict:
+    """Write documents (see ``backend.rag.documents``), embedding only what changed.
+
+    Documents whose ``text_hash`` matches the stored point only had payload
+    fields change (stock, price, ...): those are sent as one batched payload
+    overwrite with no embedding call, and identical ones are skipped. The rest
+    are embedded in one batch. Returns ``{"embedded", "payload_updated", "unchanged"}``.
+    """
+    counts = {"embedded": 0, "payload_updated": 0, "unchanged": 0}
+    if not documents:
+        return counts
+    stored = stored_payloads(collection_name, [doc["id"] for doc in documents])
+
+    to_embed, to_overwrite = [], {}
+    for doc in documents:
+        payload = {**doc["payload"], "text_hash": text_hash(doc["text"])}
+        previous = stored.get(doc["id"])
+        if previous is None or previous.get("text_hash") != payload["text_hash"]:
+            to_embed.append((doc, payload))
+        elif previous != payload:
+            to_overwrite[doc["id"]] = payload
+        else:
+            counts["unchanged"] += 1
+
+    overwrite_payloads(collection_name, to_overwrite)
+    counts["payload_updated"] = len(to_overwrite)
+    if not to_embed:
+        return counts
+
+    lexical_index.invalidate()
+    embeddings = get_embeddings([doc["text"] for doc, _ in to_embed])
+    try:
+        if use_local_backend():
+            get_local_index(collection_name).upsert([
+                (doc["id"], embedding, payload) for (doc, payload), embedding in zip(to_embed, embeddings)
+            ])
+        else:
+            get_qdrant_client().upsert(collection_name=physical_name(collection_name), points=[
+                PointStruct(id=doc["id"], vector=embedding, payload=payload)
+                for (doc, payload), embedding in zip(to_embed, embeddings)
+            ])
+    finally:
+        search_cache.bump(collection_name)
+    counts["embedded"] = len(to_embed)
+    return counts
+
+
+def delete_records(collection_name: str, record_ids: list[int]):
+    if not record_ids:
+        return
+    lexical_index.invalidate()
+    try:
+        if use_local_backend():
+            get_local_index(collection_name).delete(record_ids)
+            return
+        get_qdrant_client().delete(collection_name=physical_name(collection_name), points_selector=list(record_ids))
+    finally:
+        search_cache.bump(collection_name)
+
+
+def upsert_record(collection_name: str, record_id: int, text_to_embed: str, payload: dict) -> dict:
+    return upsert_documents(collection_name, [{"id": record_id, "text": text_to_embed, "payload": payload}])
 
 
 def delete_record(collection_name: str, record_id: int):
-    client = get_qdrant_client()
-    client.delete(collection_name=collection_name, points_selector=[record_id])
+    delete_records(collection_name, [record_id])
 
 
-def search_collection(collection_name: str, query: str, limit: int = 5) -> list[dict]:
-    client = get_qdrant_client()
+def search_collection(collection_name: str, query: str, limit: int = 5, filters: dict = None,
+                      score_threshold: float = None) -> list[dict]:
+    """Top ``limit`` hits, with ``filters`` (see ``build_filter``) and the score
+    threshold applied by the vector store rather than afterwards."""
+    tag = active_tag()  # before embedding, so a version switch can't pair the wrong model and collection
+    key = make_key(tag, collection_name, query, filters, limit, score_threshold)
+    search_cache.refresh([collection_name])
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+    version = search_cache.version(collection_name)
     query_vector = get_query_embedding(query)
-    results = client.search(
-        collection_name=collection_name,
-        query_vector=query_vector,
-        limit=limit,
-    )
+    if use_local_backend():
+        hits = get_local_index(collection_name).search(query_vector, limit, filters, score_threshold)
+    else:
+        hits = _hits_to_dicts(get_qdrant_client().search(
+            collection_name=physical_name(collection_name, tag),
+            query_vector=query_vector,
+            limit=limit,
+            query_filter=build_filter(filters),
+            score_threshold=score_threshold,
+            search_params=search_params(),
+        ))
+    search_cache.put(key, version, hits)
+    return hits
+
+
+def _hits_to_dicts(hits) -> list[dict]:
     return [
         {
             "id": hit.id,
             "score": hit.score,
             "payload": hit.payload,
         }
-        for hit in results
+        for hit in hits
     ]
 
 
-def search_all_collections(query: str, limit: int = 5) -> dict[str, list[dict]]:
-    results = {}
-    for collection_name in COLLECTIONS:
+class _BatchPlan:
+    """Which (query, collection) searches of a batch the result cache already answers."""
+
+    def __init__(self, queries: list[str], collections: list[str], limit: int, filters: dict[str, dict],
+                 score_threshold: float | None, tag: str):
+        self.results = [{} for _ in queries]
+        self.keys: dict[str, list[tuple]] = {}
+        self.versions: dict[str, int] = {}
+        self.pending: dict[str, list[int]] = {}  # collection → indexes of queries still to search
+        for collection_name in collections:
+            # Read (after the batch's refresh) before searching: a write that lands mid-search makes put() drop the result
+            self.versions[collection_name] = search_cache.version(collection_name)
+            self.keys[collection_name] = [
+                make_key(tag, collection_name, q, filters.get(collection_name), limit, score_threshold)
+                for q in queries
+            ]
+            for i, key in enumerate(self.keys[collection_name]):
+                hits = search_cache.get(key)
+                if hits is None:
+                    self.pending.setdefault(collection_name, []).append(i)
+                else:
+                    self.results[i][collection_name] = hits
+        # Queries that miss in at least one collection; only these are embedded
+        self.to_embed = sorted({i for indexes in self.pending.values() for i in indexes})
+        self.cache_hits = sum(len(r) for r in self.results)
+
+
+def _search_local(collection_name: str, vectors: list[list[float]], limit: int, filters: dict = None,
+                  score_threshold: float = None) -> tuple[str, list[list[dict]], float, bool]:
+    t0 = time.perf_counter()
+    index = get_local_index(collection_name)
+    try:
+        hits, ok = [index.search(v, limit, filters, score_threshold) for v in vectors], True
+    except Exception as e:
+        logger.warning(f"[RAG] Local search failed for {collection_name}: {e}")
+        hits, ok = [[] for _ in vectors], False
+    return collection_name, hits, (time.perf_counter() - t0) * 1000, ok
+
+
+def _requests(vectors: list[list[float]], limit: int, query_filter: Filter | None, score_threshold: float | None,
+              params: SearchParams | None) -> list[SearchRequest]:
+    return [
+        SearchRequest(vector=v, limit=limit, with_payload=True, filter=query_filter,
+                      score_threshold=score_threshold, params=params)
+        for v in vectors
+    ]
+
+
+def search_collections_batch(queries: list[str], limit: int = 5, collections: list[str] = None,
+                             filters: dict[str, dict] = None, score_threshold: float = None) -> dict:
+    """Embed every query once and search all collections concurrently.
+
+    Each collection gets a single batch request covering all queries, so this
+    also serves offline evaluation runs. ``filters`` maps collection name to a
+    filter spec (see ``build_filter``); it and ``score_threshold`` are applied
+    by the vector store. (query, collection) pairs answered by the result cache
+    (``backend.rag.search_cache``) are not searched, and queries answered in
+    every collection are not embedded. Returns::
+
+        {
+            "results": [{collection: [hits]} for each query],
+            "timings": {"embed_ms": ..., "collections_ms": {collection: ...}, "cache_hits": ..., "total_ms": ...},
+        }
+    """
+    collections = collections or COLLECTIONS
+    filters = filters or {}
+    start = time.perf_counter()
+    tag = active_tag()
+    search_cache.refresh(collections)
+    plan = _BatchPlan(queries, collections, limit, filters, score_threshold, tag)
+    vectors = dict(zip(plan.to_embed, get_query_embeddings([queries[i] for i in plan.to_embed]))) if plan.to_embed else {}
+    embed_ms = (time.perf_counter() - start) * 1000
+    if use_local_backend():
+        searched = [
+            _search_local(c, [vectors[i] for i in indexes], limit, filters.get(c), score_threshold)
+            for c, indexes in plan.pending.items()
+        ]
+        return _collect(plan, searched, start, embed_ms)
+    client = get_qdrant_client()
+    params = search_params()
+
+    def search_one(collection_name: str) -> tuple[str, list[list[dict]], float, bool]:
+        t0 = time.perf_counter()
+        query_vectors = [vectors[i] for i in plan.pending[collection_name]]
+        try:
+            batch = client.search_batch(
+                collection_name=physical_name(collection_name, tag),
+                requests=_requests(query_vectors, limit, build_filter(filters.get(collection_name)),
+                                   score_threshold, params),
+            )
+            hits, ok = [_hits_to_dicts(h) for h in batch], True
+        except Exception as e:
+            logger.warning(f"[RAG] Search failed for {collection_name}: {e}")
+            hits, ok = [[] for _ in query_vectors], False
+        return collection_name, hits, (time.perf_counter() - t0) * 1000, ok
+
+    return _collect(plan, _search_pool.map(search_one, plan.pending), start, embed_ms)
+
+
+async def asearch_collections_batch(queries: list[str], limit: int = 5, collections: list[str] = None,
+                                    filters: dict[str, dict] = None, score_threshold: float = None) -> dict:
+    """Async variant of search_collections_batch using the shared async client."""
+    collections = collections or COLLECTIONS
+    filters = filters or {}
+    start = time.perf_counter()
+    tag = active_tag()
+    await search_cache.arefresh(collections)
+    plan = _BatchPlan(queries, collections, limit, filters, score_threshold, tag)
+    vectors = (
+        dict(zip(plan.to_embed, await aget_query_embeddings([queries[i] for i in plan.to_embed])))
+        if plan.to_embed else {}
+    )
+    embed_ms = (time.perf_counter() - start) * 1000
+    if use_local_backend():
+        # Brute force over a small in-memory matrix is a few ms; not worth a thread hop
+        searched = [
+            _search_local(c, [vectors[i] for i in indexes], limit, filters.get(c), score_threshold)
+            for c, indexes in plan.pending.items()
+        ]
+        return _collect(plan, searched, start, embed_ms)
+    client = get_async_qdrant_client()
+    params = search_params()
+
+    async def search_one(collection_name: str) -> tuple[str, list[list[dict]], float, bool]:
+        t0 = time.perf_counter()
+        query_vectors = [vectors[i] for i in plan.pending[collection_name]]
         try:
-            results[collection_name] = search_collection(collection_name, query, limit)
-        except Exception:
-            results[collection_name] = []
-    return results
+            batch = await client.search_batch(
+                collection_name=physical_name(collection_name, tag),
+                requests=_requests(query_vectors, limit, build_filter(filters.get(collection_name)),
+                                   score_threshold, params),
+            )
+            hits, ok = [_hits_to_dicts(h) for h in batch], True
+        except Exception as e:
+            logger.warning(f"[RAG] Search failed for {collection_name}: {e}")
+            hits, ok = [[] for _ in query_vectors], False
+        return collection_name, hits, (time.perf_counter() - t0) * 1000, ok
+
+    searched = await asyncio.gather(*[search_one(c) for c in plan.pending])
+    return _collect(plan, searched, start, embed_ms)
+
+
+def _collect(plan: _BatchPlan, searched, start: float, embed_ms: float) -> dict:
+    collections_ms = {collection_name: 0.0 for collection_name in plan.keys}
+    for collection_name, hits, ms, ok in searched:
+        collections_ms[collection_name] = round(ms, 1)
+        for i, query_hits in zip(plan.pending[collection_name], hits):
+            plan.results[i][collection_name] = query_hits
+            if ok:  # never cache the empty stand-in for a failed search
+                search_cache.put(plan.keys[collection_name][i], plan.versions[collection_name], query_hits)
+
+    return {
+        "results": plan.results,
+        "timings": {
+            "embed_ms": round(embed_ms, 1),
+            "collections_ms": collections_ms,
+            "cache_hits": plan.cache_hits,
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        },
+    }
+
+
+def search_all_collections(query: str, limit: int = 5) -> dict[str, list[dict]]:
+    try:
+        return search_collections_batch([query], limit)["results"][0]
+    except Exception as e:
+        logger.warning(f"[RAG] Search failed: {e}")
+        return {collection_name: [] for collection_name in COLLECTIONS}
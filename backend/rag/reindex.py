@@ -0,0 +1,348 @@
+"""Blue/green re-embedding with Qdrant aliases.
+
+Build a new index version next to the live one, check its recall, then switch
+the ``{collection}_live`` aliases to it in one atomic request. The API picks up
+the switch within ``VECTOR_VERSION_POLL_SECONDS`` (see ``backend.rag.versions``)
+and reports the version it uses in ``vector_index_followers``;
+the previous version is kept, so rolling back is another alias switch::
+
+    python -m backend.rag.reindex build --tag v2 --model models/gemini-embedding-001 --dimension 768
+    python -m backend.rag.reindex validate --tag v2
+    python -m backend.rag.reindex switch --tag v2
+    python -m backend.rag.reindex rollback   # alias flip only
+    python -m backend.rag.reindex sync       # then catch the live version up
+    python -m backend.rag.reindex status
+    python -m backend.rag.reindex drop --tag v1
+
+Catalog edits keep flowing to the live version while a new one is built;
+``switch`` catches the new version up (only changed records are embedded)
+right before flipping the aliases, and again once every running API process
+reports that it follows the new version.
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.benchmarks.embedding_storage import QUERIES
+from backend.config import get_settings
+from backend.database import Base
+from backend.models.vector_version import VectorIndexFollower, VectorIndexVersion
+from backend.rag.documents import load_documents
+from backend.rag.indexer import sync_collection
+from backend.rag.qdrant_client import (
+    COLLECTIONS, alias_name, get_qdrant_client, init_collections, physical_name, search_collections_batch,
+    use_local_backend,
+)
+from backend.rag.versions import activate, live_tag, version_config
+
+settings = get_settings()
+
+TAG_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,40}$")
+# API processes that haven't reported for this many polls are assumed gone
+FOLLOWER_STALE_POLLS = 3
+# How many polls ``switch`` waits for every API process to follow
+FOLLOW_TIMEOUT_POLLS = 10
+
+
+def _print_progress(collection_name: str, done: int, total: int):
+    print(f"  {collection_name}: {done}/{total}", flush=True)
+
+
+def _activate(db: Session, tag: str):
+    config = version_config(tag, db.get(VectorIndexVersion, tag) if tag else None)
+    if config is None:
+        raise SystemExit(f"Unknown version '{tag}'")
+    activate(tag, *config)
+
+
+def _sync_all(db: Session, progress=_print_progress) -> int:
+    """Bring the active version up to date with Postgres. Returns the document count."""
+    documents = load_documents(db)
+    for collection_name, docs in documents.items():
+        result = sync_collection(collection_name, docs, progress=progress)
+        print(f"  {physical_name(collection_name)}: embedded {result['embedded']}, "
+              f"payload-updated {result['payload_updated']}, deleted {result['deleted']}"
+              + (f", {result['failed']} FAILED" if result["failed"] else ""))
+        if result["failed"]:
+            raise RuntimeError(f"{result['failed']} {collection_name} documents could not be embedded")
+    return sum(len(docs) for docs in documents.values())
+
+
+def build(db: Session, tag: str, model: str, dimension: int):
+    if not TAG_RE.match(tag):
+        raise SystemExit("Tags are lowercase letters, digits, '-' and '_'")
+    if tag == live_tag():
+        raise SystemExit(f"'{tag}' is live; build a new tag instead")
+    row = db.get(VectorIndexVersion, tag) or VectorIndexVersion(tag=tag)
+    row.embedding_model, row.dimension, row.status, row.validation = model, dimension, "building", None
+    db.add(row)
+    db.commit()
+
+    activate(tag, model, dimension)
+    print(f"Building '{tag}' ({model}, {dimension} dims)...")
+    start = time.perf_counter()
+    try:
+        init_collections()
+        row.documents = _sync_all(db)
+    except BaseException:
+        row.status = "failed"
+        db.commit()
+        raise
+    row.status = "ready"
+    db.commit()
+    print(f"Built '{tag}': {row.documents} documents in {time.perf_counter() - start:.1f}s. Next: validate --tag {tag}")
+
+
+def _normalise_query(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9/]+", " ", text.lower()).split())
+
+
+def validate(db: Session, tag: str, sample: int, limit: int, min_recall: float) -> dict:
+    """Self-retrieval recall@limit on sampled catalog records (each record's text,
+    lowercased and without punctuation, must find the record) plus overlap@limit
+    with the live version on typical customer queries."""
+    row = db.get(VectorIndexVersion, tag)
+    if row is None or row.status not in ("ready", "validated", "live", "retired"):
+        raise SystemExit(f"'{tag}' is not built")
+    documents = load_documents(db)
+    rng = random.Random(0)
+
+    _activate(db, tag)
+    recall = {}
+    for collection_name, docs in documents.items():
+        picked = rng.sample(docs, min(sample, len(docs)))
+        if not picked:
+            continue
+        batch = search_collections_batch([_normalise_query(d["text"]) for d in picked], limit=limit,
+                                         collections=[collection_name])
+        found = [d["id"] in {h["id"] for h in hits[collection_name]} for d, hits in zip(picked, batch["results"])]
+        recall[collection_name] = round(sum(found) / len(found), 3)
+    candidate = search_collections_batch(QUERIES, limit=limit)["results"]
+
+    live = live_tag()
+    overlap = {}
+    if live != tag:
+        _activate(db, live)
+        baseline = search_collections_batch(QUERIES, limit=limit)["results"]
+        for collection_name in COLLECTIONS:
+            scores = []
+            for new, old in zip(candidate, baseline):
+                old_ids = {h["id"] for h in old[collection_name]}
+                if old_ids:
+                    scores.append(len(old_ids & {h["id"] for h in new[collection_name]}) / len(old_ids))
+            overlap[collection_name] = round(sum(scores) / len(scores), 3) if scores else None
+
+    passed = bool(recall) and min(recall.values()) >= min_recall
+    result = {"recall": recall, "overlap_with_live": overlap, "limit": limit, "min_recall": min_recall,
+              "passed": passed, "live": live}
+    row.validation = result
+    if row.status == "ready" and passed:
+        row.status = "validated"
+    db.commit()
+
+    print(f"\n{'collection':<12} {'recall@' + str(limit):>10} {'overlap w/ live':>16}")
+    for collection_name in COLLECTIONS:
+        print(f"{collection_name:<12} {str(recall.get(collection_name, '-')):>10} "
+              f"{str(overlap.get(collection_name, '-')):>16}")
+    print(f"\n{'PASSED' if passed else 'FAILED'} (min recall {min_recall})")
+    return result
+
+
+def _point_aliases(tag: str):
+    """Move every alias to ``tag``'s collections in a single atomic request."""
+    client = get_qdrant_client()
+    existing = {a.alias_name for a in client.get_aliases().aliases}
+    operations = []
+    for collection_name in COLLECTIONS:
+        alias = alias_name(collection_name)
+        if alias in existing:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(
+            collection_name=physical_name(collection_name, tag), alias_name=alias,
+        )))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def _lagging_followers(db: Session, tag: str) -> list[str]:
+    """Running API processes (recent report) that still use another version."""
+    db.expire_all()
+    recent = datetime.now(timezone.utc) - timedelta(seconds=settings.VECTOR_VERSION_POLL_SECONDS * FOLLOWER_STALE_POLLS)
+    rows = db.query(VectorIndexFollower).filter(VectorIndexFollower.seen_at >= recent)
+    return [f"{row.process_id} ({row.tag or 'unversioned'})" for row in rows if row.tag != tag]
+
+
+def _wait_for_followers(db: Session, tag: str) -> list[str]:
+    """Poll until every running API process reports ``tag``. Returns the laggards on timeout."""
+    poll = settings.VECTOR_VERSION_POLL_SECONDS
+    deadline = time.monotonic() + poll * FOLLOW_TIMEOUT_POLLS
+    lagging = _lagging_followers(db, tag)
+    while lagging and time.monotonic() < deadline:
+        print(f"  waiting for {len(lagging)} API process(es): {', '.join(lagging)}", flush=True)
+        time.sleep(min(poll / 2, 5))
+        lagging = _lagging_followers(db, tag)
+    return lagging
+
+
+def _check_collections(tag: str):
+    client = get_qdrant_client()
+    missing = [c for c in COLLECTIONS if not client.collection_exists(physical_name(c, tag))]
+    if missing:
+        raise SystemExit(f"'{tag}' has no collections for {', '.join(missing)}")
+
+
+def _flip(db: Session, tag: str, live: str, row: VectorIndexVersion | None, rollback: bool = False):
+    """Point the aliases at ``tag`` and record it as live; ``live`` is retired."""
+    _point_aliases(tag)
+    if row is not None:
+        row.status, row.switched_at = "live", datetime.now(timezone.utc)
+        if not rollback:
+            row.previous_tag = live
+    old = db.get(VectorIndexVersion, live) if live else None
+    if old is not None:
+        old.status = "retired"
+    db.commit()
+    print(f"Aliases now point at '{tag}' (was '{live}').")
+
+
+def switch(db: Session, tag: str, force: bool = False):
+    live = live_tag()
+    if tag == live:
+        raise SystemExit(f"'{tag}' is already live")
+    row = db.get(VectorIndexVersion, tag) if tag else None
+    if tag and row is None:
+        raise SystemExit(f"Unknown version '{tag}'")
+    if row is not None and row.status not in ("validated", "retired") and not force:
+        raise SystemExit(f"'{tag}' is {row.status}, not validated (use --force to switch anyway)")
+
+    _activate(db, tag)
+    _check_collections(tag)
+
+    print(f"Catching '{tag}' up with Postgres...")
+    _sync_all(db)
+    _flip(db, tag, live, row)
+
+    # API processes keep writing to the old version until their next poll; the
+    # catch-up only covers those writes once every process has moved over
+    print("Waiting for every API process to follow...")
+    lagging = _wait_for_followers(db, tag)
+    print("Catching up again...")
+    _sync_all(db)
+    if lagging:
+        raise SystemExit(f"{len(lagging)} API process(es) did not follow '{tag}' within "
+                         f"{settings.VECTOR_VERSION_POLL_SECONDS * FOLLOW_TIMEOUT_POLLS:.0f}s: {', '.join(lagging)}. "
+                         f"Their writes may be missing from '{tag}'; restart them and run "
+                         f"'python -m backend.rag.reindex sync' to catch up.")
+    print("Done.")
+
+
+def rollback(db: Session):
+    """Flip straight back to the previous version: no catch-up before or after,
+    so it takes one alias request. Catalog edits made since the switch reach the
+    previous version with ``reindex sync``."""
+    live = live_tag()
+    row = db.get(VectorIndexVersion, live) if live else None
+    if row is None or row.previous_tag is None:
+        raise SystemExit("Nothing to roll back to")
+    previous = row.previous_tag
+    if previous and db.get(VectorIndexVersion, previous) is None:
+        raise SystemExit(f"Unknown version '{previous}'")
+    _check_collections(previous)
+    print(f"Rolling back '{live}' → '{previous}'")
+    _flip(db, previous, live, db.get(VectorIndexVersion, previous) if previous else None, rollback=True)
+    print("API processes follow within VECTOR_VERSION_POLL_SECONDS. Then run "
+          "'python -m backend.rag.reindex sync' to apply catalog edits made since the switch.")
+
+
+def sync(db: Session):
+    """Catch the live version up with Postgres (after a rollback, or a switch that
+    timed out), once every running API process follows it."""
+    live = live_tag()
+    _activate(db, live)
+    lagging = _wait_for_followers(db, live)
+    if lagging:
+        print(f"Still not following '{live or '(unversioned)'}': {', '.join(lagging)}; "
+              f"their later writes may be missing")
+    print(f"Catching '{live or '(unversioned)'}' up with Postgres...")
+    _sync_all(db)
+    print("Done.")
+
+
+def drop(db: Session, tag: str):
+    if not tag or tag == live_tag():
+        raise SystemExit("Refusing to drop the live or unversioned collections")
+    client = get_qdrant_client()
+    for collection_name in COLLECTIONS:
+        if client.collection_exists(physical_name(collection_name, tag)):
+            client.delete_collection(physical_name(collection_name, tag))
+    row = db.get(VectorIndexVersion, tag)
+    if row is not None:
+        db.delete(row)
+        db.commit()
+    print(f"Dropped '{tag}'.")
+
+
+def status(db: Session):
+    live = live_tag()
+    client = get_qdrant_client()
+    rows = {row.tag: row for row in db.query(VectorIndexVersion).order_by(VectorIndexVersion.created_at)}
+    tags = ([""] if client.collection_exists(COLLECTIONS[0]) else []) + list(rows)
+    print(f"{'tag':<20} {'status':<10} {'model':<32} {'dim':>5} {'points':>8}  validation")
+    for tag in tags:
+        row = rows.get(tag)
+        model, dimension = version_config(tag, row)
+        points = sum(
+            client.count(physical_name(c, tag)).count
+            for c in COLLECTIONS if client.collection_exists(physical_name(c, tag))
+        )
+        state = "live" if tag == live else (row.status if row else "-")
+        recall = (row.validation or {}).get("recall") if row else None
+        print(f"{tag or '(unversioned)':<20} {state:<10} {model:<32} {dimension:>5} {points:>8}  {recall or ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build")
+    p.add_argument("--tag", required=True)
+    p.add_argument("--model", default=settings.GEMINI_EMBEDDING_MODEL)
+    p.add_argument("--dimension", type=int, default=settings.EMBEDDING_DIMENSION)
+    p = sub.add_parser("validate")
+    p.add_argument("--tag", required=True)
+    p.add_argument("--sample", type=int, default=50, help="records sampled per collection")
+    p.add_argument("--limit", type=int, default=5)
+    p.add_argument("--min-recall", type=float, default=0.9)
+    p = sub.add_parser("switch")
+    p.add_argument("--tag", required=True)
+    p.add_argument("--force", action="store_true", help="switch even if not validated")
+    sub.add_parser("rollback")
+    sub.add_parser("sync")
+    sub.add_parser("status")
+    p = sub.add_parser("drop")
+    p.add_argument("--tag", required=True)
+    args = parser.parse_args()
+
+    if use_local_backend():
+        raise SystemExit("Blue/green versions need VECTOR_BACKEND=qdrant")
+
+    engine = create_engine(settings.DATABASE_URL_SYNC)
+    Base.metadata.create_all(engine, tables=[VectorIndexVersion.__table__, VectorIndexFollower.__table__])
+    with Session(engine) as db:
+        if args.command == "build":
+            build(db, args.tag, args.model, args.dimension)
+        elif args.command == "validate":
+            validate(db, args.tag, args.sample, args.limit, args.min_recall)
+        elif args.command == "switch":
+            switch(db, args.tag, args.force)
+        elif args.command == "rollback":
+            rollback(db)
+        elif args.command == "sync":
+            sync(db)
+        elif args.command == "drop":
+            drop(db, args.tag)
+        else:
+            status(db)
+    engine.dispose()
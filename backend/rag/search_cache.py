@@ -0,0 +1,178 @@
+"""LRU cache of vector search results.
+
+Entries are keyed on the index version tag, collection, normalized query,
+filters, limit and score threshold, and remember the collection's version
+counter at the time of the search. Every write path in ``qdrant_client``,
+``indexer`` and ``snapshot`` calls ``bump(collection)`` once the write is done,
+so an entry is served only while nothing has been written to its collection
+since; there is no TTL.
+
+The counters live in Postgres (``vector_collection_versions``), so writes from
+any process (API workers, ``seed.py``, ``backend.rag.reindex``,
+``backend.snapshot``) invalidate every process's cache. Searches call
+``refresh``/``arefresh`` once per batch to read them; if that read fails the
+batch bypasses the cache.
+
+Hits are the un-hydrated payloads, so live stock and price (see
+``backend.rag.hydration``) are never served from here.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, text
+from backend.config import get_settings
+from backend.rag.embedding_cache import normalize_text
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+BUMP_SQL = text(
+    "INSERT INTO vector_collection_versions (collection, version) VALUES (:collection, 1) "
+    "ON CONFLICT (collection) DO UPDATE SET version = vector_collection_versions.version + 1 "
+    "RETURNING version"
+)
+
+
+def make_key(tag: str, collection_name: str, query: str, filters: dict | None, limit: int,
+             score_threshold: float | None) -> tuple:
+    return (
+        tag,
+        collection_name,
+        normalize_text(query),
+        json.dumps(filters, sort_keys=True, default=sorted) if filters else "",
+        limit,
+        score_threshold,
+    )
+
+
+class SearchResultCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[int, list[dict]]] = OrderedDict()
+        # Last shared counter seen per collection; None while it couldn't be read
+        self._versions: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+        self._engine = None
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0, "version_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def version(self, collection_name: str) -> int | None:
+        return self._versions.get(collection_name, 0)
+
+    def _sync_engine(self):
+        # Writers are sync code (CLI scripts, or the outbox worker's blocking thread)
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            from backend.models.vector_version import VectorCollectionVersion
+
+            engine = create_engine(settings.DATABASE_URL_SYNC, pool_pre_ping=True)
+            VectorCollectionVersion.__table__.create(engine, checkfirst=True)
+            self._engine = engine
+        return self._engine
+
+    def bump(self, collection_name: str):
+        """Invalidate every cached search of a collection, in every process (call after writing to it)."""
+        with self._sync_engine().begin() as conn:
+            version = conn.execute(BUMP_SQL, {"collection": collection_name}).scalar_one()
+        with self._lock:
+            self._versions[collection_name] = version
+            self.stats["invalidations"] += 1
+
+    def _install(self, collections: list[str], versions: dict[str, int] | None):
+        with self._lock:
+            if versions is None:
+                self.stats["version_errors"] += 1
+                for collection_name in collections:
+                    self._versions[collection_name] = None
+                return
+            for collection_name in collections:
+                self._versions[collection_name] = versions.get(collection_name, 0)
+
+    def refresh(self, collections: list[str]):
+        """Read the shared counters of ``collections`` (once per search batch)."""
+        if not self.enabled:
+            return
+        from backend.models.vector_version import VectorCollectionVersion
+
+        table = VectorCollectionVersion.__table__
+        query = select(table.c.collection, table.c.version).where(table.c.collection.in_(collections))
+        try:
+            with self._sync_engine().connect() as conn:
+                versions = dict(conn.execute(query).all())
+        except Exception as e:
+            logger.warning(f"[SEARCH CACHE] Could not read collection versions, bypassing the cache: {e}")
+            versions = None
+        self._install(collections, versions)
+
+    async def arefresh(self, collections: list[str]):
+        """Async ``refresh`` for the API's request path."""
+        if not self.enabled:
+            return
+        from backend.database import async_session
+        from backend.models.vector_version import VectorCollectionVersion
+
+        table = VectorCollectionVersion.__table__
+        query = select(table.c.collection, table.c.version).where(table.c.collection.in_(collections))
+        try:
+            async with async_session() as db:
+                versions = dict((await db.execute(query)).all())
+        except Exception as e:
+            logger.warning(f"[SEARCH CACHE] Could not read collection versions, bypassing the cache: {e}")
+            versions = None
+        self._install(collections, versions)
+
+    def get(self, key: tuple) -> list[dict] | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            version, hits = entry
+            if version is None or version != self.version(key[1]):
+                del self._entries[key]
+                self.stats["stale"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(hits)
+
+    def put(self, key: tuple, version: int | None, hits: list[dict]):
+        """Store hits searched at collection ``version``; dropped if the
+        collection was written to while the search was running, or if its
+        version couldn't be read."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is None or version != self.version(key[1]):
+                return
+            self._entries[key] = (version, list(hits))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+search_cache = SearchResultCache(
+    max_entries=settings.SEARCH_CACHE_ENTRIES if settings.SEARCH_CACHE_ENABLED else 0,
+)
@@ -0,0 +1,8 @@
+"""Text patterns shared by the agents and the retrieval layer."""
+import re
+
+TYRE_SIZE_RE = re.compile(r'\b(\d{3})\s*/\s*(\d{2})\s*Z?R\s*(\d{2})\b', re.IGNORECASE)
+
+
+def normalize_size(width: str, profile: str, rim: str) -> str:
+    return f"{width}/{profile}R{rim}"
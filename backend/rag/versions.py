@@ -0,0 +1,137 @@
+"""Which blue/green index version a process reads and writes.
+
+The ``{collection}_live`` aliases in Qdrant point at the live version's
+collections; ``vector_index_versions`` records the embedding model and
+dimension each version was built with. A process always uses the collections
+and the embedding config of one version together, so queries are never
+embedded for one model and searched against vectors of another. Without any
+alias the unversioned collections and the configured model are live.
+
+The API follows switches made by ``python -m backend.rag.reindex`` through
+``version_watcher``, which also reports the version each process uses in
+``vector_index_followers``; scripts call ``activate_live_version`` once.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from backend.config import get_settings
+from backend.database import async_session
+from backend.models.vector_version import VectorIndexFollower, VectorIndexVersion
+from backend.rag.embeddings import embedding_config, set_embedding_config
+from backend.rag.qdrant_client import (
+    COLLECTIONS, active_tag, alias_name, get_async_qdrant_client, get_qdrant_client, set_active_tag, tag_of,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def activate(tag: str, model: str, dimension: int):
+    """Point this process at a version's collections and embedding config."""
+    set_active_tag(tag)
+    set_embedding_config(model, dimension)
+
+
+def version_config(tag: str, row: VectorIndexVersion | None) -> tuple[str, int] | None:
+    """(model, dimension) of a version; the unversioned collections use the settings."""
+    if not tag:
+        return settings.GEMINI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION
+    return (row.embedding_model, row.dimension) if row else None
+
+
+def _tag_from_aliases(aliases) -> str:
+    # All aliases are switched in one atomic request, so one is enough
+    targets = {a.alias_name: a.collection_name for a in aliases}
+    target = targets.get(alias_name(COLLECTIONS[0]))
+    return tag_of(target) if target else ""
+
+
+def live_tag() -> str:
+    return _tag_from_aliases(get_qdrant_client().get_aliases().aliases)
+
+
+def activate_live_version(db: Session) -> str:
+    """Activate whatever version is live in Qdrant (sync; for seed and CLI scripts). Returns its tag."""
+    tag = live_tag()
+    config = version_config(tag, db.get(VectorIndexVersion, tag) if tag else None)
+    if config is None:
+        raise RuntimeError(f"Live index version '{tag}' is not in vector_index_versions")
+    activate(tag, *config)
+    return tag
+
+
+class VersionWatcher:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"switches": 0, "last_error": None}
+
+    async def refresh(self):
+        """Activate the live version if it changed since the last check."""
+        aliases = (await get_async_qdrant_client().get_aliases()).aliases
+        tag = _tag_from_aliases(aliases)
+        if tag == active_tag():
+            return
+        row = None
+        if tag:
+            async with async_session() as db:
+                row = await db.get(VectorIndexVersion, tag)
+        config = version_config(tag, row)
+        if config is None:
+            raise RuntimeError(f"Live index version '{tag}' is not in vector_index_versions")
+        previous = active_tag()
+        activate(tag, *config)
+        self.stats["switches"] += 1
+        logger.info(f"[VERSIONS] Live index version '{previous}' → '{tag}' ({config[0]}, {config[1]} dims)")
+
+    async def report(self):
+        """Record the version this process reads and writes, for ``reindex switch``."""
+        async with async_session() as db:
+            await db.merge(VectorIndexFollower(
+                process_id=self.process_id, tag=active_tag(), seen_at=datetime.now(timezone.utc),
+            ))
+            await db.commit()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                async with async_session() as db:
+                    row = await db.get(VectorIndexFollower, self.process_id)
+                    if row is not None:
+                        await db.delete(row)
+                        await db.commit()
+            except Exception as e:
+                logger.warning(f"[VERSIONS] Could not remove this process from vector_index_followers: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.report()
+            except Exception as e:
+                logger.warning(f"[VERSIONS] Could not report the active index version: {e}")
+            await asyncio.sleep(settings.VECTOR_VERSION_POLL_SECONDS)
+            try:
+                await self.refresh()
+                self.stats["last_error"] = None
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                logger.warning(f"[VERSIONS] Could not check the live index version: {e}")
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "process_id": self.process_id, "tag": active_tag(), **embedding_config()}
+
+
+version_watcher = VersionWatcher()
@@ -14,7 +14,11 @@ from backend.models.tyre_brand import TyreBrand
 from backend.models.tyre import Tyre
 from backend.models.order import Order, OrderItem
 from backend.models.chat import ChatSession, ChatMessage
-from backend.rag.qdrant_client import init_collections, upsert_record
+from backend.rag.qdrant_client import init_collections, use_local_backend
+from backend.rag.documents import load_documents
+from backend.rag.indexer import sync_collection
+from backend.rag.versions import activate_live_version
+from backend.snapshot import import_snapshot, index_is_empty
 
 settings = get_settings()
 
@@ -173,65 +177,40 @@ def seed_database():
     engine.dispose()
 
 
+def _print_progress(collection_name: str, done: int, total: int):
+    print(f"  {collection_name}: {done}/{total}", flush=True)
+
+
 def seed_qdrant(engine):
-    print("\nStarting Qdrant seed...")
+    print(f"\nStarting vector index seed ({settings.VECTOR_BACKEND})...")
     try:
+        if not use_local_backend():
+            with Session(engine) as db:
+                tag = activate_live_version(db)
+            if tag:
+                print(f"Seeding live index version '{tag}'.")
         init_collections()
         print("Qdrant collections initialized.")
     except Exception as e:
         print(f"Error initializing Qdrant collections: {e}")
         return
 
+    snapshot = settings.VECTOR_SNAPSHOT_PATH
+    if snapshot and os.path.exists(snapshot) and index_is_empty():
+        try:
+            print(f"Loaded snapshot {snapshot}: {import_snapshot(snapshot)}")
+        except Exception as e:
+            print(f"Could not load snapshot {snapshot}, embedding instead: {e}")
+
     with Session(engine) as db:
-        car_brands = db.execute(text("SELECT id, name, country FROM car_brands")).fetchall()
-        for row in car_brands:
-            try:
-                upsert_record("car_brands", row[0], row[1], {
-                    "id": row[0], "name": row[1], "country": row[2],
-                })
-            except Exception as e:
-                print(f"Error embedding car brand {row[1]}: {e}")
-        print(f"Embedded {len(car_brands)} car brands.")
-
-        car_models = db.execute(text(
-            "SELECT cm.id, cb.name as brand_name, cm.name, cm.year, cm.tyre_sizes, cm.brand_id "
-            "FROM car_models cm JOIN car_brands cb ON cm.brand_id = cb.id"
-        )).fetchall()
-        for row in car_models:
-            try:
-                upsert_record("car_models", row[0], f"{row[1]} {row[2]} {row[3]}", {
-                    "id": row[0], "brand_id": row[5], "brand_name": row[1],
-                    "name": row[2], "year": row[3],
-                    "tyre_sizes": list(row[4]) if row[4] else [],
-                })
-            except Exception as e:
-                print(f"Error embedding car model {row[1]} {row[2]}: {e}")
-        print(f"Embedded {len(car_models)} car models.")
-
-        tyre_brands = db.execute(text("SELECT id, name, country FROM tyre_brands")).fetchall()
-        for row in tyre_brands:
-            try:
-                upsert_record("tyre_brands", row[0], row[1], {
-                    "id": row[0], "name": row[1], "country": row[2],
-                })
-            except Exception as e:
-                print(f"Error embedding tyre brand {row[1]}: {e}")
-        print(f"Embedded {len(tyre_brands)} tyre brands.")
-
-        tyres = db.execute(text(
-            "SELECT t.id, tb.name as brand_name, t.model, t.size, t.type, t.price, t.stock, t.brand_id "
-            "FROM tyres t JOIN tyre_brands tb ON t.brand_id = tb.id"
-        )).fetchall()
-        for row in tyres:
-            try:
-                upsert_record("tyres", row[0], f"{row[1]} {row[2]} {row[3]}", {
-                    "id": row[0], "brand_id": row[7], "brand_name": row[1],
-                    "model": row[2], "size": row[3], "type": row[4],
-                    "price": float(row[5]), "stock": row[6],
-                })
-            except Exception as e:
-                print(f"Error embedding tyre {row[1]} {row[2]}: {e}")
-        print(f"Embedded {len(tyres)} tyres.")
+        documents = load_documents(db)
+
+    # Only new or changed records are embedded; see rag/indexer.sync_collection
+    for collection_name, docs in documents.items():
+        result = sync_collection(collection_name, docs, progress=_print_progress)
+        print(f"{collection_name}: embedded {result['embedded']}, payload-updated {result['payload_updated']}, "
+              f"deleted {result['deleted']}, unchanged {result['unchanged']} in {result['seconds']}s"
+              + (f" ({result['failed']} failed)" if result["failed"] else "") + ".")
 
     print("Qdrant seed complete!")
 
@@ -0,0 +1,189 @@
+"""Export and import the vector index without calling Gemini.
+
+A snapshot is one compressed ``.npz`` file holding, for every collection, the
+point ids, the vectors (float16 by default) and the payloads (which carry each
+point's ``text_hash``), plus a manifest with the format version, embedding
+model and dimension. Importing bulk-loads it into Qdrant or the local index;
+a following ``seed.py`` run then only embeds records that changed since the
+snapshot was taken.
+
+    python -m backend.snapshot export --output vectors.npz
+    python -m backend.snapshot import vectors.npz
+
+``seed.py`` imports ``VECTOR_SNAPSHOT_PATH`` automatically when the index is empty.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from qdrant_client.models import PointStruct
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.config import get_settings
+from backend.rag.embeddings import embedding_config
+from backend.rag.indexer import with_retry
+from backend.rag.local_index import get_local_index
+from backend.rag.qdrant_client import COLLECTIONS, get_qdrant_client, init_collections, physical_name, use_local_backend
+from backend.rag.search_cache import search_cache
+from backend.rag.versions import activate_live_version
+
+settings = get_settings()
+
+FORMAT = "matrax-vector-snapshot"
+FORMAT_VERSION = 1
+UPSERT_BATCH_SIZE = 256
+
+
+def read_collection(collection_name: str) -> tuple[list[int], np.ndarray, list[dict]]:
+    """(ids, float32 vectors, payloads) currently stored for a collection."""
+    if use_local_backend():
+        index = get_local_index(collection_name)
+        vectors, payloads = index.vectors_by_id(), index.payloads_by_id()
+        ids = list(payloads)
+        matrix = np.asarray([vectors[i] for i in ids], dtype=np.float32).reshape(len(ids), index.dim)
+        return ids, matrix, [payloads[i] for i in ids]
+
+    client = get_qdrant_client()
+    ids, vectors, payloads = [], [], []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=physical_name(collection_name), limit=1000, offset=offset,
+            with_payload=True, with_vectors=True,
+        )
+        for record in records:
+            ids.append(record.id)
+            vectors.append(record.vector)
+            payloads.append(record.payload or {})
+        if offset is None:
+            break
+    dim = len(vectors[0]) if vectors else embedding_config()["dimension"]
+    return ids, np.asarray(vectors, dtype=np.float32).reshape(len(ids), dim), payloads
+
+
+def export_snapshot(path: str, dtype: str = "float16") -> dict:
+    config = embedding_config()
+    arrays, counts = {}, {}
+    for collection_name in COLLECTIONS:
+        ids, vectors, payloads = read_collection(collection_name)
+        arrays[f"{collection_name}.ids"] = np.asarray(ids, dtype=np.int64)
+        arrays[f"{collection_name}.vectors"] = vectors.astype(dtype)
+        arrays[f"{collection_name}.payloads"] = np.frombuffer(json.dumps(payloads).encode("utf-8"), dtype=np.uint8)
+        counts[collection_name] = len(ids)
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "embedding_model": config["model"],
+        "dimension": config["dimension"],
+        "dtype": dtype,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "collections": counts,
+    }
+    arrays["manifest"] = np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+    return manifest
+
+
+def load_snapshot(path: str) -> tuple[dict, dict[str, tuple[np.ndarray, np.ndarray, list[dict]]]]:
+    with np.load(path) as data:
+        manifest = json.loads(data["manifest"].tobytes())
+        if manifest.get("format") != FORMAT or manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} vector snapshot")
+        collections = {
+            name: (
+                data[f"{name}.ids"],
+                data[f"{name}.vectors"].astype(np.float32),
+                json.loads(data[f"{name}.payloads"].tobytes()),
+            )
+            for name in manifest["collections"]
+        }
+    return manifest, collections
+
+
+def import_snapshot(path: str, force: bool = False) -> dict:
+    """Load a snapshot into the active vector store. Refuses a snapshot made with
+    another embedding model or dimension unless ``force`` is set."""
+    manifest, collections = load_snapshot(path)
+    config = embedding_config()
+    if (manifest["embedding_model"], manifest["dimension"]) != (config["model"], config["dimension"]) and not force:
+        raise ValueError(
+            f"Snapshot was made with {manifest['embedding_model']} at {manifest['dimension']} dims, "
+            f"the index uses {config['model']} at {config['dimension']}"
+        )
+
+    init_collections()
+    client = None if use_local_backend() else get_qdrant_client()
+    loaded = {}
+    for collection_name, (ids, vectors, payloads) in collections.items():
+        if collection_name not in COLLECTIONS:
+            continue
+        if client is None:
+            get_local_index(collection_name).write([int(i) for i in ids], vectors, payloads)
+        else:
+            for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+                end = start + UPSERT_BATCH_SIZE
+                with_retry(
+                    client.upsert, collection_name=physical_name(collection_name), wait=True,
+                    points=[
+                        PointStruct(id=int(point_id), vector=vector.tolist(), payload=payload)
+                        for point_id, vector, payload in zip(ids[start:end], vectors[start:end], payloads[start:end])
+                    ],
+                    label=f"importing {collection_name}",
+                )
+        search_cache.bump(collection_name)
+        loaded[collection_name] = len(ids)
+    return loaded
+
+
+def index_is_empty() -> bool:
+    if use_local_backend():
+        return all(len(get_local_index(c)) == 0 for c in COLLECTIONS)
+    client = get_qdrant_client()
+    return all(
+        not client.collection_exists(physical_name(c)) or client.count(physical_name(c)).count == 0
+        for c in COLLECTIONS
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export")
+    p.add_argument("--output", default=settings.VECTOR_SNAPSHOT_PATH or "vectors.npz")
+    p.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    p = sub.add_parser("import")
+    p.add_argument("path", nargs="?", default=settings.VECTOR_SNAPSHOT_PATH)
+    p.add_argument("--force", action="store_true", help="import even if the embedding model or dimension differ")
+    args = parser.parse_args()
+
+    if not use_local_backend():
+        engine = create_engine(settings.DATABASE_URL_SYNC)
+        with Session(engine) as db:
+            activate_live_version(db)
+        engine.dispose()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        manifest = export_snapshot(args.output, args.dtype)
+        size_mb = os.path.getsize(args.output) / 1024 / 1024
+        print(f"Exported {manifest['collections']} to {args.output} ({size_mb:.1f} MB, "
+              f"{manifest['embedding_model']} {manifest['dimension']}d {manifest['dtype']}) "
+              f"in {time.perf_counter() - start:.1f}s")
+    else:
+        if not args.path:
+            parser.error("no snapshot path (argument or VECTOR_SNAPSHOT_PATH)")
+        try:
+            loaded = import_snapshot(args.path, args.force)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Imported {loaded} from {args.path} in {time.perf_counter() - start:.1f}s")
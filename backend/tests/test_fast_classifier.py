@@ -0,0 +1,80 @@
+from backend.agents.fast_classifier import FastIntentClassifier
+
+SIZES_REPLY = {"sender": "agent", "text": "Your Civic takes **225/45R17** or **215/55R16**. Which size do you need?"}
+
+
+def classify(message, history=None):
+    return FastIntentClassifier().classify(message, history or [])
+
+
+def test_greetings():
+    for message in ("hi", "Hello there!", "hey all", "good morning", "Good evening everyone"):
+        intent = classify(message)
+        assert intent is not None, message
+        assert intent["state"] == "greeting"
+        assert intent["rule"] == "greeting"
+
+
+def test_filler_words_alone_are_not_greetings():
+    for message in ("all good", "good", "there", "all", "good stuff", "morning"):
+        assert classify(message) is None, message
+
+
+def test_greeting_with_content_goes_to_llm():
+    assert classify("hi, I drive a Honda Civic") is None
+
+
+def test_later_greeting_has_lower_confidence():
+    history = [{"sender": "user", "text": "hi"}, {"sender": "agent", "text": "Hello! What car do you drive?"}]
+    assert classify("hello")["confidence"] == 0.9
+    assert classify("hello", history)["confidence"] == 0.8
+
+
+def test_bare_size():
+    for message in ("225/45R17", "225/45 R17 please", "size is 225/45ZR17", "I need 225/45r17 tyres"):
+        intent = classify(message)
+        assert intent is not None, message
+        assert intent["state"] == "size_selection"
+        assert intent["selected_size"] == "225/45R17"
+
+
+def test_size_with_order_details_goes_to_llm():
+    for message in (
+        "225/45R17, I'd like 4 Michelin please",
+        "order 4 of 225/45R17",
+        "225/45R17 for my Civic 2019",
+        "buy 225/45R17",
+    ):
+        assert classify(message) is None, message
+
+
+def test_two_sizes_go_to_llm():
+    assert classify("225/45R17 or 215/55R16?") is None
+
+
+def test_order_code():
+    intent = classify("where is my order mtx 42?")
+    assert intent["state"] == "order_status"
+    assert intent["selected_tyre_model"] == "MTX-00042"
+
+
+def test_size_ordinal_after_size_list():
+    intent = classify("the second one", [SIZES_REPLY])
+    assert intent["state"] == "size_selection"
+    assert intent["selected_size"] == "215/55R16"
+    assert classify("first please", [SIZES_REPLY])["selected_size"] == "225/45R17"
+
+
+def test_size_ordinal_needs_a_size_list():
+    assert classify("the second one", [{"sender": "agent", "text": "What car do you drive?"}]) is None
+    assert classify("second one, 4 of them", [SIZES_REPLY]) is None
+
+
+def test_stats_count_hits_by_rule():
+    classifier = FastIntentClassifier()
+    classifier.classify("hi", [])
+    classifier.classify("all good", [])
+    stats = classifier.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hits_by_rule"] == {"greeting": 1}
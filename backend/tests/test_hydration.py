@@ -0,0 +1,26 @@
+import asyncio
+
+from backend.rag import hydration
+from backend.rag.hydration import hydrate, unconfirmed
+
+
+def _hit(id, **payload):
+    return {"id": id, "score": 0.9, "payload": {"id": id, **payload}}
+
+
+def test_hydrate_merges_live_values_and_drops_deleted(monkeypatch):
+    async def live(ids):
+        return {1: {"price": 99.0, "stock": 3}}
+    monkeypatch.setattr(hydration, "_live_tyres", live)
+
+    results = asyncio.run(hydrate({"tyres": [_hit(1, model="A"), _hit(2, model="B")]}))
+    assert [h["payload"] for h in results["tyres"]] == [{"id": 1, "model": "A", "price": 99.0, "stock": 3, "live": True}]
+
+
+def test_unconfirmed_keeps_every_hit_without_price_or_stock():
+    hits = [_hit(1, model="A"), _hit(2, model="B")]
+    results = unconfirmed({"tyres": hits, "car_brands": []})
+    assert [h["id"] for h in results["tyres"]] == [1, 2]
+    assert all(h["payload"]["live"] is False for h in results["tyres"])
+    assert all(h["payload"]["price"] is None and h["payload"]["stock"] is None for h in results["tyres"])
+    assert "live" not in hits[0]["payload"]
@@ -0,0 +1,79 @@
+from backend.agents.offers import bare_number, make_offers, resolve_offer
+
+OFFERS = make_offers([
+    {"tyre_id": 11, "brand": "Michelin", "model": "Pilot Sport 5", "size": "225/45R17", "price": 120.0},
+    {"tyre_id": 12, "brand": "Bridgestone", "model": "Turanza T005", "size": "225/45R17", "price": 105.0},
+    {"tyre_id": 13, "brand": "Toyo", "model": "Proxes Sport", "size": "225/45R17", "price": 89.0},
+    {"tyre_id": 14, "brand": "Continental", "model": "PremiumContact 6", "size": "225/45R17", "price": 110.0},
+])
+NO_INTENT = {"selected_tyre_brand": None, "selected_tyre_model": None}
+
+
+def resolve(message, selected=None, just_offered=False, intent=NO_INTENT):
+    offer = resolve_offer(message, intent, OFFERS, selected, just_offered=just_offered)
+    return offer["tyre_id"] if offer else None
+
+
+def test_make_offers_numbers_from_one():
+    assert [o["n"] for o in OFFERS] == [1, 2, 3, 4]
+    assert OFFERS[0] == {"n": 1, "tyre_id": 11, "brand": "Michelin", "model": "Pilot Sport 5",
+                         "size": "225/45R17", "price": 120.0}
+
+
+def test_bare_number_and_ordinal_pick_right_after_the_list():
+    assert resolve("2", just_offered=True) == 12
+    assert resolve("the first one", just_offered=True) == 11
+    assert resolve("last please", just_offered=True) == 14
+
+
+def test_bare_number_and_ordinal_ignored_when_list_is_old():
+    assert resolve("2") is None
+    assert resolve("the first one") is None
+
+
+def test_bare_number_keeps_existing_pick():
+    assert resolve("4", selected=1) == 11
+    assert resolve("4", selected=1, just_offered=True) == 11
+
+
+def test_ordinal_words_that_are_not_picks():
+    assert resolve("my name is John, last name Smith", selected=1) == 11
+    assert resolve("my name is John, last name Smith", just_offered=True) is None
+
+
+def test_name_beats_ordinal():
+    assert resolve("first time buying tyres, I want the Toyo", just_offered=True) == 13
+    assert resolve("first time buying tyres, I want the Toyo", selected=1) == 13
+
+
+def test_explicit_number_replaces_pick():
+    assert resolve("actually option 2", selected=1) == 12
+    assert resolve("make it #3", selected=1) == 13
+    assert resolve("number two please", selected=1) == 12
+
+
+def test_name_from_message_or_intent():
+    assert resolve("the turanza please") == 12
+    assert resolve("I'll go with the Michelin") == 11
+    assert resolve("yes", intent={"selected_tyre_brand": "Toyo", "selected_tyre_model": None}) == 13
+
+
+def test_ambiguous_names_keep_pick():
+    assert resolve("is the Michelin better than the Toyo?", selected=2) == 12
+
+
+def test_no_offers():
+    assert resolve_offer("option 1", NO_INTENT, [], None) is None
+    assert resolve_offer("option 1", NO_INTENT, None, None) is None
+
+
+def test_out_of_range_number():
+    assert resolve("option 7", selected=1) == 11
+    assert resolve("9", just_offered=True) is None
+
+
+def test_bare_number():
+    assert bare_number("4") == 4
+    assert bare_number(" 12. ") == 12
+    assert bare_number("4 please") is None
+    assert bare_number("") is None
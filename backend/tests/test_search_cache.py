@@ -0,0 +1,54 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from backend.models.vector_version import VectorCollectionVersion
+from backend.rag.search_cache import SearchResultCache, make_key
+
+
+def _caches():
+    """Two caches (two processes) sharing one counters table."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    VectorCollectionVersion.__table__.create(engine)
+    caches = SearchResultCache(16), SearchResultCache(16)
+    for cache in caches:
+        cache._engine = engine
+    return caches
+
+
+def _search(cache, key, hits):
+    cache.refresh([key[1]])
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    cache.put(key, cache.version(key[1]), hits)
+    return hits
+
+
+def test_write_in_another_process_invalidates():
+    reader, writer = _caches()
+    key = make_key("", "tyres", "Michelin 205/55R16", None, 5, None)
+    assert _search(reader, key, ["old"]) == ["old"]
+    assert _search(reader, key, ["new"]) == ["old"]
+
+    writer.bump("tyres")
+    assert _search(reader, key, ["new"]) == ["new"]
+    assert reader.stats["stale"] == 1
+
+
+def test_write_to_another_collection_keeps_entries():
+    reader, writer = _caches()
+    key = make_key("", "tyres", "Michelin", None, 5, None)
+    _search(reader, key, ["hit"])
+    writer.bump("car_brands")
+    assert _search(reader, key, ["other"]) == ["hit"]
+
+
+def test_unreadable_versions_bypass_the_cache():
+    cache, _ = _caches()
+    key = make_key("", "tyres", "Michelin", None, 5, None)
+    _search(cache, key, ["hit"])
+    cache._engine.dispose()
+    cache._engine = create_engine("sqlite:////nonexistent/dir/db")
+    assert _search(cache, key, ["fresh"]) == ["fresh"]
+    assert cache.get(key) is None
+    assert cache.stats["version_errors"] == 1
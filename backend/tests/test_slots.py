@@ -0,0 +1,69 @@
+from backend.agents.slots import after_turn, empty_slots, merge_slots, with_slots
+
+
+def test_merge_keeps_slots_the_turn_does_not_mention():
+    slots = merge_slots({"car_brand": "Honda", "car_model": "Civic"}, {"state": "general", "quantity": 4})
+    assert slots["car_brand"] == "Honda"
+    assert slots["car_model"] == "Civic"
+    assert slots["quantity"] == 4
+
+
+def test_merge_ignores_null_like_values():
+    slots = merge_slots({"car_brand": "Honda"}, {"car_brand": "null", "car_model": " none ", "car_year": ""})
+    assert slots["car_brand"] == "Honda"
+    assert slots["car_model"] is None
+    assert slots["car_year"] is None
+
+
+def test_changing_a_slot_clears_its_dependents():
+    stored = {**empty_slots(), "car_brand": "Honda", "car_model": "Civic", "selected_size": "225/45R17",
+              "selected_tyre_brand": "Michelin", "selected_offer": 1, "quantity": 4}
+    slots = merge_slots(stored, {"car_brand": "Toyota"})
+    assert slots["car_brand"] == "Toyota"
+    assert slots["car_model"] is None
+    assert slots["selected_size"] is None
+    assert slots["selected_tyre_brand"] is None
+    assert slots["selected_offer"] is None
+    assert slots["quantity"] == 4
+
+
+def test_same_turn_dependents_survive():
+    stored = {"car_brand": "Honda", "car_model": "Civic"}
+    slots = merge_slots(stored, {"car_brand": "Toyota", "car_model": "Corolla"})
+    assert (slots["car_brand"], slots["car_model"]) == ("Toyota", "Corolla")
+
+
+def test_same_value_in_other_case_is_not_a_change():
+    stored = {"car_brand": "Honda", "car_model": "Civic"}
+    assert merge_slots(stored, {"car_brand": "honda"})["car_model"] == "Civic"
+
+
+def test_order_status_code_is_not_a_tyre_model():
+    stored = {"selected_tyre_model": "Pilot Sport 5", "selected_offer": 1}
+    intent = {"state": "order_status", "selected_tyre_model": "MTX-00001"}
+    slots = merge_slots(stored, intent)
+    assert slots["selected_tyre_model"] == "Pilot Sport 5"
+    assert slots["selected_offer"] == 1
+    assert with_slots(intent, slots)["selected_tyre_model"] == "MTX-00001"
+
+
+def test_with_slots_fills_intent():
+    filled = with_slots({"state": "order_intent", "quantity": None}, {"quantity": 4, "customer_name": "Ann"})
+    assert filled == {"state": "order_intent", "quantity": 4, "customer_name": "Ann"}
+
+
+def test_after_turn_clears_order_slots_once_ordered():
+    slots = {**empty_slots(), "car_brand": "Honda", "selected_tyre_brand": "Michelin", "selected_offer": 1,
+             "quantity": 4, "customer_name": "Ann"}
+    after = after_turn(slots, {"order_code": "MTX-00001"})
+    assert after["selected_tyre_brand"] is None
+    assert after["selected_offer"] is None
+    assert after["quantity"] is None
+    assert after["car_brand"] == "Honda"
+    assert after["customer_name"] == "Ann"
+
+
+def test_after_turn_new_offers_reset_pick():
+    slots = {**empty_slots(), "selected_offer": 2}
+    assert after_turn(slots, {"offers": []})["selected_offer"] is None
+    assert after_turn(slots, {"response": "ok"}) == slots
@@ -3,7 +3,7 @@
 import { useState, useRef, useEffect } from 'react';
 import { Button } from '@/components/ui/button';
 import { Send, Loader2, MessageSquarePlus, History } from 'lucide-react';
-import { sendChatMessage, ChatMessage, getChatSessions, getSessionMessages, ChatSession } from '@/lib/api';
+import { streamChatMessage, ChatMessage, getChatSessions, getSessionMessages, ChatSession } from '@/lib/api';
 import { MarkdownMessage } from './markdown-message';
 
 export function AgentChat() {
@@ -65,14 +65,31 @@ export function AgentChat() {
     setInput('');
     setLoading(true);
 
+    // Placeholder agent bubble that fills in as tokens arrive
+    const draftId = Date.now() + 1;
+    let draftAdded = false;
+
     try {
-      const response = await sendChatMessage(input, sessionId);
+      const response = await streamChatMessage(input, sessionId, {
+        onSession: setSessionId,
+        onToken: (text) => {
+          setLoading(false);
+          if (!draftAdded) {
+            draftAdded = true;
+            setMessages(prev => [...prev, { id: draftId, sender: 'agent', text, timestamp: '' }]);
+          } else {
+            setMessages(prev => prev.map(m => (m.id === draftId ? { ...m, text: m.text + text } : m)));
+          }
+        },
+      });
       setSessionId(response.session_id);
-      setMessages(prev => [...prev, response.agent_response]);
+      setMessages(prev => draftAdded
+        ? prev.map(m => (m.id === draftId ? response.agent_response : m))
+        : [...prev, response.agent_response]);
       loadSessions();
     } catch (e: any) {
-      setMessages(prev => [...prev, {
-        id: Date.now() + 1,
+      setMessages(prev => [...prev.filter(m => m.id !== draftId), {
+        id: Date.now() + 2,
         sender: 'agent',
         text: `Sorry, I encountered an error. Please try again. ${e.message || ''}`,
         timestamp: new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
@@ -214,6 +214,69 @@ export async function sendChatMessage(message: string, sessionId?: number): Prom
   });
 }
 
+export interface ChatStreamHandlers {
+  onSession?: (sessionId: number) => void;
+  onMeta?: (meta: { state: string; agent: string }) => void;
+  onToken?: (text: string) => void;
+}
+
+export interface ChatStreamResult {
+  session_id: number;
+  agent: string;
+  agent_response: ChatMessage;
+}
+
+// Streams POST /chat/stream (Server-Sent Events) and resolves with the persisted agent message.
+export async function streamChatMessage(
+  message: string,
+  sessionId: number | undefined,
+  handlers: ChatStreamHandlers = {},
+): Promise<ChatStreamResult> {
+  const res = await fetch(`${API_URL}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ message, session_id: sessionId }),
+  });
+  if (!res.ok || !res.body) {
+    const error = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(error.detail || `API error: ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result: ChatStreamResult | null = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+      const payload = JSON.parse(data);
+
+      if (event === 'session') handlers.onSession?.(payload.session_id);
+      else if (event === 'meta') handlers.onMeta?.(payload);
+      else if (event === 'token') handlers.onToken?.(payload.text);
+      else if (event === 'done') result = payload;
+    }
+  }
+
+  if (!result) throw new Error('Chat stream ended unexpectedly');
+  return result;
+}
+
 export interface ChatSession {
   id: number;
   title: string;